@@ -0,0 +1,187 @@
+"""
+Выгрузка products, offers и offer_price_history в секционированный
+Parquet-набор для аналитики:
+
+    <ANALYTICS_DIR>/<таблица>/day=YYYY-MM-DD/part.parquet
+
+offers и история цен выгружаются по дням date_parsed / changed_at,
+начиная с последнего выгруженного дня (он перевыгружается целиком -
+на момент прошлой выгрузки день мог быть неполным). Объявление, снова
+увиденное в другой день, попадает и в его секцию: набор offers - журнал
+наблюдений, актуальное состояние - последняя строка по id.
+products - снимок на день выгрузки.
+
+Чтение идет с реплики, если она есть и не отстает (см. ReplicaRouter).
+"""
+
+import json
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database.database import engine, read_engines, replica_router
+
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "analytics_data")
+STATE_FILE = "export_state.json"
+CHUNK_ROWS = 50_000
+
+OFFERS_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("product_id", pa.int64()),
+    ("external_id", pa.string()),
+    ("website_name", pa.string()),
+    ("title", pa.string()),
+    ("price", pa.int64()),
+    ("url", pa.string()),
+    ("address", pa.string()),
+    ("district", pa.string()),
+    ("area", pa.float64()),
+    ("rooms", pa.int32()),
+    ("property_type", pa.string()),
+    ("attrs", pa.string()),
+    ("date_parsed", pa.timestamp("us")),
+])
+
+HISTORY_SCHEMA = pa.schema([
+    ("offer_id", pa.int64()),
+    ("price", pa.int64()),
+    ("old_price", pa.int64()),
+    ("changed_at", pa.timestamp("us")),
+])
+
+PRODUCTS_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("canonical_title", pa.string()),
+    ("canonical_address", pa.string()),
+    ("district", pa.string()),
+    ("rooms", pa.int32()),
+    ("area", pa.float64()),
+    ("property_type", pa.string()),
+    ("min_price", pa.int64()),
+    ("offers_count", pa.int32()),
+    ("sources", pa.list_(pa.string())),
+    ("last_seen", pa.timestamp("us")),
+    ("created_at", pa.timestamp("us")),
+    ("attrs", pa.string()),
+])
+
+# Таблица -> (колонка дня, запрос за полуинтервал [:start, :end), схема)
+DAILY_TABLES = {
+    "offers": ("date_parsed", """
+        SELECT id, product_id, external_id, website_name, title, price, url, address,
+               district, area, rooms, property_type, attrs::text AS attrs, date_parsed
+        FROM offers
+        WHERE date_parsed >= :start AND date_parsed < :end
+    """, OFFERS_SCHEMA),
+    "offer_price_history": ("changed_at", """
+        SELECT offer_id, price, old_price, changed_at
+        FROM offer_price_history
+        WHERE changed_at >= :start AND changed_at < :end
+    """, HISTORY_SCHEMA),
+}
+
+PRODUCTS_SQL = """
+SELECT id, canonical_title, canonical_address, district, rooms, area, property_type,
+       min_price, offers_count, sources, last_seen, created_at, attrs::text AS attrs
+FROM products
+"""
+
+
+def partition_path(data_dir: str, table: str, day: date) -> Path:
+    return Path(data_dir) / table / f"day={day.isoformat()}"
+
+
+def load_state(data_dir: str) -> Dict[str, str]:
+    path = Path(data_dir) / STATE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_state(data_dir: str, state: Dict[str, str]) -> None:
+    path = Path(data_dir) / STATE_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+async def _pick_engine() -> AsyncEngine:
+    await replica_router.refresh()
+    index = await replica_router.pick()
+    await replica_router.stop()
+    if index is None:
+        if read_engines:
+            print("[Аналитика] Реплики недоступны или отстают, выгрузка с primary")
+        return engine
+    return read_engines[index]
+
+
+async def _write_partition(bind: AsyncEngine, sql: str, params: dict, schema: pa.Schema, target: Path) -> int:
+    """Потоково пишет результат запроса в target/part.parquet, заменяя секцию."""
+    tmp = target.with_name(target.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    rows = 0
+    writer: Optional[pq.ParquetWriter] = None
+    async with bind.connect() as conn:
+        result = await conn.stream(text(sql), params)
+        async for chunk in result.partitions(CHUNK_ROWS):
+            if writer is None:
+                tmp.mkdir(parents=True)
+                writer = pq.ParquetWriter(tmp / "part.parquet", schema, compression="zstd")
+            writer.write_table(pa.Table.from_pylist([dict(row._mapping) for row in chunk], schema=schema))
+            rows += len(chunk)
+    if writer is not None:
+        writer.close()
+    shutil.rmtree(target, ignore_errors=True)
+    if writer is not None:
+        tmp.rename(target)
+    return rows
+
+
+async def export(data_dir: str = ANALYTICS_DIR, since: Optional[date] = None) -> Dict[str, int]:
+    """
+    Args:
+        since: выгрузить дни начиная с этой даты, игнорируя сохраненное состояние
+
+    Returns:
+        {таблица: выгружено строк}
+    """
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    state = load_state(data_dir)
+    bind = await _pick_engine()
+    today = date.today()
+    totals = {}
+
+    for table, (column, sql, schema) in DAILY_TABLES.items():
+        start = since or (date.fromisoformat(state[table]) if table in state else None)
+        if start is None:
+            async with bind.connect() as conn:
+                first = (await conn.execute(text(f"SELECT min({column})::date FROM {table}"))).scalar_one()
+            start = first or today
+
+        totals[table] = 0
+        day = start
+        while day <= today:
+            day_start = datetime.combine(day, datetime.min.time())
+            rows = await _write_partition(
+                bind, sql, {"start": day_start, "end": day_start + timedelta(days=1)}, schema,
+                partition_path(data_dir, table, day),
+            )
+            if rows:
+                print(f"[Аналитика] {table} {day}: {rows}")
+            totals[table] += rows
+            day += timedelta(days=1)
+        state[table] = today.isoformat()
+        save_state(data_dir, state)
+
+    totals["products"] = await _write_partition(
+        bind, PRODUCTS_SQL, {}, PRODUCTS_SCHEMA, partition_path(data_dir, "products", today)
+    )
+    return totals
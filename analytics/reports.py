@@ -0,0 +1,108 @@
+"""
+SQL по Parquet-снимкам (analytics/export.py) во встроенном DuckDB -
+тяжелые GROUP BY не нагружают Postgres, который обслуживает API.
+
+Представления:
+    offers               - журнал наблюдений объявлений по дням
+    offers_latest        - последнее наблюдение каждого объявления
+    offer_price_history  - изменения цен
+    products             - последний снимок продуктов
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import duckdb
+
+from analytics.export import ANALYTICS_DIR
+
+REPORTS: Dict[str, str] = {
+    # Медианная цена аренды по району и числу комнат
+    "median_rent": """
+        SELECT
+            coalesce(district, '(не указан)') AS district,
+            rooms,
+            count(*) AS offers,
+            median(price)::BIGINT AS median_price,
+            quantile_cont(price, 0.25)::BIGINT AS p25,
+            quantile_cont(price, 0.75)::BIGINT AS p75
+        FROM offers_latest
+        WHERE price > 0
+        GROUP BY ALL
+        HAVING count(*) >= 3
+        ORDER BY district, rooms
+    """,
+    # Охват источников: объявления, доля сопоставленных с продуктами и
+    # продукты, которые источник делит с другими площадками
+    "source_coverage": """
+        SELECT
+            o.website_name,
+            count(*) AS offers,
+            count(o.product_id) AS matched,
+            round(100.0 * count(o.product_id) / count(*), 1) AS matched_pct,
+            count(DISTINCT o.product_id) AS products,
+            count(DISTINCT o.product_id) FILTER (WHERE len(p.sources) > 1) AS shared_products,
+            max(o.date_parsed) AS last_seen
+        FROM offers_latest o
+        LEFT JOIN products p ON p.id = o.product_id
+        GROUP BY o.website_name
+        ORDER BY offers DESC
+    """,
+    # Время на рынке: от первой записи в истории цен до последнего
+    # наблюдения объявления, в днях
+    "time_on_market": """
+        WITH spans AS (
+            SELECT
+                o.website_name,
+                o.rooms,
+                date_diff('day', min(h.changed_at), max(o.date_parsed)) AS days
+            FROM offers_latest o
+            JOIN offer_price_history h ON h.offer_id = o.id
+            GROUP BY o.id, o.website_name, o.rooms
+        )
+        SELECT
+            website_name,
+            rooms,
+            count(*) AS offers,
+            median(days) AS median_days,
+            quantile_cont(days, 0.9) AS p90_days
+        FROM spans
+        GROUP BY ALL
+        ORDER BY website_name, rooms
+    """,
+}
+
+
+class AnalyticsDB:
+    """Соединение DuckDB в памяти с представлениями над Parquet-набором."""
+
+    def __init__(self, data_dir: str = ANALYTICS_DIR):
+        self.data_dir = Path(data_dir)
+        self.conn = duckdb.connect()
+        for table in ("offers", "offer_price_history", "products"):
+            if not any((self.data_dir / table).glob("day=*/*.parquet")):
+                raise RuntimeError(f"Нет выгрузки {table} в {self.data_dir}: выполните export")
+            pattern = (self.data_dir / table / "day=*" / "*.parquet").as_posix().replace("'", "''")
+            source = f"read_parquet('{pattern}', hive_partitioning = true)"
+            if table == "products":
+                self.conn.execute(
+                    f"CREATE VIEW products AS SELECT * FROM {source} "
+                    f"WHERE day = (SELECT max(day) FROM {source})"
+                )
+            else:
+                self.conn.execute(f"CREATE VIEW {table} AS SELECT * FROM {source}")
+        self.conn.execute("""
+            CREATE VIEW offers_latest AS
+            SELECT * FROM offers
+            QUALIFY row_number() OVER (PARTITION BY website_name, id ORDER BY date_parsed DESC) = 1
+        """)
+
+    def query(self, sql: str) -> Tuple[List[str], List[tuple]]:
+        result = self.conn.execute(sql)
+        return [column[0] for column in result.description], result.fetchall()
+
+    def report(self, name: str) -> Tuple[List[str], List[tuple]]:
+        return self.query(REPORTS[name])
+
+    def close(self) -> None:
+        self.conn.close()
@@ -11,13 +11,16 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from contextlib import asynccontextmanager
 
-from database.database import init_db
+from database.database import startup_db, pool_status, replica_router
 from api.routes import router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    await startup_db()
+    await replica_router.refresh()
+    replica_router.start()
     yield
+    await replica_router.stop()
 
 app = FastAPI(
     title="Real Estate Aggregator API",
@@ -50,6 +53,11 @@ if os.path.exists("frontend"):
 async def health_check():
     return {"status": "ok", "message": "API работает"}
 
+@app.get("/health/db")
+async def db_health_check():
+    """Пулы соединений primary и реплик, отставание реплик."""
+    return pool_status()
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,39 @@
+"""
+Непрозрачные курсоры keyset-пагинации: значения ключей сортировки
+последней строки страницы в base64url(JSON).
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: Optional[str], types: Sequence[type]) -> Optional[tuple]:
+    """
+    Разбирает курсор в кортеж значений указанных типов.
+    Некорректный курсор - ошибка клиента (400).
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values: List[Any] = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if len(values) != len(types):
+            raise ValueError(token)
+        return tuple(
+            datetime.fromisoformat(v) if t is datetime else t(v)
+            for v, t in zip(values, types)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
@@ -1,15 +1,19 @@
+from datetime import datetime, timedelta
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database.database import get_db
-from database.crud import CRUDProduct, CRUDOffer
+from database.database import get_read_db
+from database.crud import CRUDProduct, CRUDPriceHistory, CRUDStats
+from api.pagination import encode_cursor, decode_cursor
+from utils.attributes import attribute_filter
 from api.schemas import (
     ProductResponse,
     ProductDetailResponse,
     SearchResponse,
     StatsResponse,
-    OfferResponse
+    OfferResponse,
+    PricePointResponse
 )
 
 router = APIRouter()
@@ -24,12 +28,25 @@ async def search_listings(
     rooms: Optional[int] = Query(None, description="Количество комнат"),
     property_type: Optional[str] = Query(None, description="Тип недвижимости"),
     district: Optional[str] = Query(None, description="Район (например, 'Фрунзенский')"),
+    floor: Optional[int] = Query(None, description="Этаж"),
+    not_first_floor: Optional[bool] = Query(None, description="Не первый этаж"),
+    not_last_floor: Optional[bool] = Query(None, description="Не последний этаж"),
+    furniture: Optional[bool] = Query(None, description="С мебелью"),
+    pets_allowed: Optional[bool] = Query(None, description="Можно с животными"),
+    children_allowed: Optional[bool] = Query(None, description="Можно с детьми"),
+    balcony: Optional[bool] = Query(None, description="Есть балкон или лоджия"),
+    include_inactive: bool = Query(False, description="Включая продукты без активных объявлений"),
     limit: int = Query(50, ge=1, le=200, description="Количество результатов"),
     offset: int = Query(0, ge=0, description="Смещение для пагинации"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (next_cursor), вместо offset"),
+    total_mode: str = Query(
+        "exact", pattern="^(exact|estimate|capped)$",
+        description="Подсчет total: exact - точно, estimate - оценка планировщика, capped - не больше 1000"
+    ),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    products = await CRUDProduct.search(
-        db,
+    keyset = decode_cursor(cursor, (float, int, int) if q else (int, int))
+    filters = dict(
         query=q,
         min_price=min_price,
         max_price=max_price,
@@ -38,32 +55,64 @@ async def search_listings(
         rooms=rooms,
         property_type=property_type,
         district=district,
+        attrs=attribute_filter(
+            floor=floor,
+            first_floor=False if not_first_floor else None,
+            last_floor=False if not_last_floor else None,
+            furniture=furniture,
+            pets_allowed=pets_allowed,
+            children_allowed=children_allowed,
+            balcony=balcony,
+        ),
+        active_only=not include_inactive,
+    )
+    products = await CRUDProduct.search(
+        db,
+        **filters,
         limit=limit,
-        offset=offset
+        offset=0 if keyset else offset,
+        cursor=keyset
     )
 
-    total = await CRUDProduct.count(db)
+    total, total_capped = await CRUDProduct.count_filtered(db, mode=total_mode, **filters)
+
+    next_cursor = None
+    if len(products) == limit:
+        last = products[-1]
+        key = [last.min_price, last.id]
+        next_cursor = encode_cursor([last.search_rank] + key if q else key)
 
     return SearchResponse(
         results=[ProductResponse.from_orm(p) for p in products],
         total=total,
+        total_mode=total_mode,
+        total_capped=total_capped,
         limit=limit,
-        offset=offset
+        offset=offset,
+        next_cursor=next_cursor
     )
 
 @router.get("/listings", response_model=List[ProductResponse])
 async def get_all_listings(
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor, вместо offset"),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    products = await CRUDProduct.get_all(db, limit=limit, offset=offset)
+    keyset = decode_cursor(cursor, (datetime, int))
+    products = await CRUDProduct.get_all(
+        db, limit=limit, offset=0 if keyset else offset, cursor=keyset
+    )
+    if len(products) == limit:
+        last = products[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor([last.created_at, last.id])
     return [ProductResponse.from_orm(p) for p in products]
 
 @router.get("/listing/{product_id}", response_model=ProductDetailResponse)
 async def get_listing_detail(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     product = await CRUDProduct.get_by_id(db, product_id)
 
@@ -75,7 +124,7 @@ async def get_listing_detail(
 @router.get("/product/{product_id}", response_model=ProductDetailResponse)
 async def get_product(
     product_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Получение детальной информации о продукте и всех предложениях на него.
@@ -92,13 +141,38 @@ async def get_product(
 
     return ProductDetailResponse.from_orm(product)
 
+@router.get("/product/{product_id}/price-history", response_model=List[PricePointResponse])
+async def get_product_price_history(
+    product_id: int,
+    days: int = Query(365, ge=1, le=3650, description="Глубина истории в днях"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    История цен продукта по всем его предложениям, по возрастанию даты.
+    """
+    since = datetime.now() - timedelta(days=days)
+    points = await CRUDPriceHistory.get_product_timeline(db, product_id, since=since)
+
+    return [
+        PricePointResponse(
+            offer_id=point.offer_id,
+            website_name=website_name,
+            price=point.price,
+            old_price=point.old_price,
+            changed_at=point.changed_at
+        )
+        for point, website_name in points
+    ]
+
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats(db: AsyncSession = Depends(get_db)):
-    total_products = await CRUDProduct.count(db)
-    offers_by_source = await CRUDOffer.count_by_source(db)
+async def get_stats(db: AsyncSession = Depends(get_read_db)):
+    """
+    Сводная статистика из stats_counters - счетчики обновляются
+    загрузкой и дедупликацией, здесь только чтение.
+    """
+    stats = await CRUDStats.snapshot(db)
 
     return StatsResponse(
-        total_products=total_products,
-        total_offers=sum(offers_by_source.values()),
-        offers_by_source=offers_by_source
+        total_offers=sum(stats["offers_by_source"].values()),
+        **stats
     )
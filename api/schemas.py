@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from pydantic import BaseModel, ConfigDict
 
 class OfferResponse(BaseModel):
@@ -14,12 +14,9 @@ class OfferResponse(BaseModel):
     rooms: int
     property_type: str
     date_parsed: datetime
-
-    model_config = ConfigDict(from_attributes=True)
-
-class AttributeResponse(BaseModel):
-    attribute_name: str
-    attribute_value: str
+    is_active: bool = True
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -34,6 +31,9 @@ class ProductResponse(BaseModel):
     min_price: int
     image_url: Optional[str] = None
     offers_count: int = 0
+    sources: List[str] = []
+    last_seen: Optional[datetime] = None
+    attributes: Dict[str, Any] = {}
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -49,7 +49,10 @@ class ProductResponse(BaseModel):
             property_type=product.property_type,
             min_price=product.min_price or 0,
             image_url=product.image_url,
-            offers_count=len(product.offers) if hasattr(product, 'offers') else 0
+            offers_count=product.offers_count or 0,
+            sources=list(product.sources or []),
+            last_seen=product.last_seen,
+            attributes=dict(product.attrs or {})
         )
 
 class ProductDetailResponse(BaseModel):
@@ -65,7 +68,7 @@ class ProductDetailResponse(BaseModel):
     image_url: Optional[str] = None
     created_at: datetime
     offers: List[OfferResponse] = []
-    attributes: List[AttributeResponse] = []
+    attributes: Dict[str, Any] = {}
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -84,16 +87,32 @@ class ProductDetailResponse(BaseModel):
             image_url=product.image_url,
             created_at=product.created_at,
             offers=[OfferResponse.from_orm(o) for o in product.offers],
-            attributes=[AttributeResponse.from_orm(a) for a in product.attributes]
+            attributes=dict(product.attrs or {})
         )
 
+class PricePointResponse(BaseModel):
+    offer_id: int
+    website_name: str
+    price: int
+    old_price: Optional[int] = None
+    changed_at: datetime
+
 class SearchResponse(BaseModel):
     results: List[ProductResponse]
     total: int
+    # exact | estimate | capped; total_capped - результатов больше total ("1000+")
+    total_mode: str = "exact"
+    total_capped: bool = False
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 class StatsResponse(BaseModel):
     total_products: int
     total_offers: int
     offers_by_source: Dict[str, int]
+    products_by_district: Dict[str, int] = {}
+    products_by_rooms: Dict[str, int] = {}
+    price_percentiles: Dict[str, int] = {}
+    new_today: int = 0
+    removed_today: int = 0
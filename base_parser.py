@@ -3,8 +3,10 @@ import random
 import sys
 import warnings
 import os
+import re
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 os.environ["PYTHONWARNINGS"] = "ignore"
 warnings.filterwarnings("ignore")
@@ -24,17 +26,65 @@ from utils.proxy_manager import ProxyManager
 from utils.user_agent_manager import UserAgentManager
 from utils.validator import Validator
 from utils.captcha_solver import CaptchaSolver
+from utils.session_store import SessionStore
+from utils.selector_stats import SelectorRegistry
+
+
+BROWSER_ARGS = [
+    "--disable-blink-features=AutomationControlled",  # Скрывает автоматизацию
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-web-security",  # Отключает некоторые проверки безопасности
+    "--disable-features=IsolateOrigins,site-per-process",  # Улучшает совместимость
+    "--disable-site-isolation-trials",  # Дополнительная маскировка
+]
+
+
+class PageLoadError(Exception):
+    """
+    Страница выдачи не загружена или не похожа на выдачу (блокировка,
+    капча, таймаут). Обход с такой страницей не считается полным.
+    """
 
 
 class BaseParser(ABC):
 
-    def __init__(self, config: Config, source_name: str):
+    # Параметры поисковой выдачи для шардирования: фильтр -> параметр URL.
+    # Шаблон с "{}" подставляет значение в имя параметра (room2=1)
+    filter_params: Dict[str, str] = {}
+    page_size: int = 50
+    page_cap: int = 100
+    results_count_pattern = r"(\d[\d\s\u00a0]*)\s+(?:объявлени|предложени)"
+
+    def __init__(
+        self,
+        config: Config,
+        source_name: str,
+        filters: Optional[Dict[str, int]] = None,
+        profile_name: Optional[str] = None,
+        base_url: Optional[str] = None,
+    ):
         self.config = config
         self.source_name = source_name
+        self.filters = filters or {}
+        self.base_url = base_url
+        self.crawl_stats = {"pages": 0, "raw": 0, "exhausted": False, "errors": 0}
+        # Вызывается с валидными объявлениями каждой страницы (потоковая запись)
+        self.on_page: Optional[Callable[[List[Listing]], None]] = None
         self.proxy_manager = ProxyManager(config.proxies, config.proxy_rotation)
         self.user_agent_manager = UserAgentManager(config.user_agents, config.user_agent_rotation)
         self.validator = Validator(config)
         self.captcha_solver = CaptchaSolver(config)
+        self.selectors = SelectorRegistry(config.stats_dir, source_name)
+        self.session_store: Optional[SessionStore] = None
+        if config.session_persistence:
+            self.session_store = SessionStore(
+                config.profiles_dir,
+                profile_name or source_name,
+                ttl_hours=config.session_ttl_hours,
+                max_blocks=config.session_max_blocks,
+            )
         self.playwright = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
@@ -43,8 +93,12 @@ class BaseParser(ABC):
         try:
             print(f"[{self.source_name}] Инициализация Playwright...")
             self.playwright = await async_playwright().start()
-            print(f"[{self.source_name}] Запуск браузера...")
-            self.browser = await self._create_browser()
+            if self.config.browser_endpoint:
+                print(f"[{self.source_name}] Подключение к браузер-серверу {self.config.browser_endpoint}...")
+                self.browser = await self._connect_browser()
+            else:
+                print(f"[{self.source_name}] Запуск браузера...")
+                self.browser = await self._create_browser()
             print(f"[{self.source_name}] Браузер готов")
             return self
         except Exception as e:
@@ -54,6 +108,16 @@ class BaseParser(ABC):
             raise
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.selectors.save()
+        except Exception as e:
+            print(f"[{self.source_name}] Не удалось сохранить статистику селекторов: {str(e)[:100]}")
+        await self._save_session()
+
+        if self.config.browser_endpoint:
+            await self._detach_browser()
+            return
+
         try:
             if self.context:
                 try:
@@ -109,19 +173,22 @@ class BaseParser(ABC):
         
         await asyncio.sleep(0.5)
 
-    async def _create_browser(self) -> Browser:
+    async def _save_session(self) -> None:
+        if not self.session_store or not self.context:
+            return
+        if not self.session_store.is_fresh():
+            return
+        try:
+            await asyncio.wait_for(
+                self.context.storage_state(path=self.session_store.state_path),
+                timeout=2.0
+            )
+        except Exception as e:
+            print(f"[{self.source_name}] Не удалось сохранить сессию: {str(e)[:100]}")
+
+    async def _create_browser(self) -> Optional[Browser]:
         user_agent = self.user_agent_manager.get_user_agent()
         
-        browser_args = [
-            "--disable-blink-features=AutomationControlled",  # Скрывает автоматизацию
-            "--disable-dev-shm-usage",
-            "--no-sandbox",
-            "--disable-setuid-sandbox",
-            "--disable-web-security",  # Отключает некоторые проверки безопасности
-            "--disable-features=IsolateOrigins,site-per-process",  # Улучшает совместимость
-            "--disable-site-isolation-trials",  # Дополнительная маскировка
-        ]
-        
         proxy_config = None
         
         USE_PROXY = False
@@ -147,14 +214,43 @@ class BaseParser(ABC):
             print(f"[{self.source_name}] ⚠ Прокси временно отключен для теста. Возможны блокировки.")
             proxy_config = None
         
-        browser = await self.playwright.chromium.launch(
-            headless=True,
-            args=browser_args,
-            proxy=proxy_config,
-            timeout=60000
-        )
+        context_options = self._context_options(user_agent)
         
-        self.context = await browser.new_context(
+        browser = None
+        if self.session_store:
+            # Постоянный профиль: cookies, localStorage и дисковый HTTP-кэш
+            # живут в user_data_dir между запусками
+            warm = self.session_store.prepare()
+            print(f"[{self.source_name}] Профиль сессии: {'теплый' if warm else 'новый'}")
+            self.context = await self.playwright.chromium.launch_persistent_context(
+                self.session_store.user_data_dir,
+                headless=True,
+                args=BROWSER_ARGS,
+                proxy=proxy_config,
+                timeout=60000,
+                **context_options
+            )
+            browser = self.context.browser
+            # Сессионные cookies (без срока жизни) Chromium не пишет на диск,
+            # поэтому восстанавливаем их из снимка storage_state
+            state_cookies = self.session_store.load_cookies()
+            if state_cookies:
+                await self.context.add_cookies(state_cookies)
+        else:
+            browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=BROWSER_ARGS,
+                proxy=proxy_config,
+                timeout=60000
+            )
+            self.context = await browser.new_context(**context_options)
+        
+        await self._apply_stealth(self.context)
+        
+        return browser
+
+    def _context_options(self, user_agent: str) -> dict:
+        return dict(
             user_agent=user_agent,
             viewport={"width": 1920, "height": 1080},
             locale="ru-RU",
@@ -167,9 +263,10 @@ class BaseParser(ABC):
                 "Upgrade-Insecure-Requests": "1",
             }
         )
-        
+
+    async def _apply_stealth(self, context: BrowserContext) -> None:
         # Расширенная маскировка автоматизации
-        await self.context.add_init_script("""
+        await context.add_init_script("""
             // Скрываем webdriver флаг
             Object.defineProperty(navigator, 'webdriver', {
                 get: () => undefined
@@ -203,9 +300,42 @@ class BaseParser(ABC):
                 navigator.getBattery = undefined;
             }
         """)
-        
+
+    async def _connect_browser(self) -> Browser:
+        """
+        Подключается к долгоживущему Chromium (scripts/browser_server.py)
+        вместо запуска собственного процесса браузера.
+        """
+        browser = await self.playwright.chromium.connect_over_cdp(
+            self.config.browser_endpoint,
+            timeout=10000
+        )
+        storage_state = None
+        if self.session_store:
+            self.session_store.prepare()
+            storage_state = self.session_store.get_state_path()
+        self.context = await browser.new_context(
+            storage_state=storage_state,
+            **self._context_options(self.user_agent_manager.get_user_agent())
+        )
+        await self._apply_stealth(self.context)
         return browser
 
+    async def _detach_browser(self) -> None:
+        # Браузер принадлежит серверу: закрываем только свой контекст
+        # и отключаемся, без пауз на завершение процессов
+        for closable in (self.context, self.browser):
+            if closable:
+                try:
+                    await asyncio.wait_for(closable.close(), timeout=2.0)
+                except Exception:
+                    pass
+        if self.playwright:
+            try:
+                await asyncio.wait_for(self.playwright.stop(), timeout=3.0)
+            except Exception:
+                pass
+
     async def _human_delay(self) -> None:
         if self.config.request_delay:
             low, high = self.config.request_delay
@@ -254,6 +384,8 @@ class BaseParser(ABC):
                     print(f"[{self.source_name}] Статус ответа: {status}")
                     if status >= 400:
                         print(f"[{self.source_name}] ⚠ Ошибка HTTP: {status}")
+                        if status in (403, 429) and self.session_store:
+                            self.session_store.mark_blocked()
                         if page and not page.is_closed():
                             try:
                                 await page.close()
@@ -299,7 +431,11 @@ class BaseParser(ABC):
                 captcha_solved = await self._solve_captcha_if_present(page)
                 if captcha_solved or has_captcha:
                     print(f"[{self.source_name}] Ожидание решения капчи...")
+                    if self.session_store:
+                        self.session_store.mark_blocked()
                     await asyncio.sleep(5)
+                elif self.session_store:
+                    self.session_store.mark_ok()
                 
                 return page
                 
@@ -345,8 +481,59 @@ class BaseParser(ABC):
     def get_base_url(self) -> str:
         pass
 
+    def get_search_url(self) -> str:
+        url = self.base_url or self.get_base_url()
+        params = []
+        for name, value in self.filters.items():
+            param = self.filter_params.get(name)
+            if not param:
+                continue
+            if "{}" in param:
+                params.append((param.format(value), "1"))
+            else:
+                params.append((param, str(value)))
+        if not params:
+            return url
+        parts = urlsplit(url)
+        query = parse_qsl(parts.query) + params
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    async def _ensure_results_page(self, page: Page, page_num: int) -> None:
+        """
+        Страница без карточек - конец выдачи, только если это страница
+        выдачи (есть счетчик объявлений). Иначе PageLoadError: капча или
+        заглушка с кодом 200 не должны считаться концом выдачи.
+        """
+        try:
+            text = await page.inner_text("body")
+        except Exception as e:
+            raise PageLoadError(f"страница {page_num}: не удалось прочитать содержимое: {str(e)[:100]}")
+        if not re.search(self.results_count_pattern, text, re.IGNORECASE):
+            raise PageLoadError(f"страница {page_num}: карточки не найдены, страница не похожа на выдачу")
+
+    async def count_results(self) -> Optional[int]:
+        """Число объявлений в выдаче по счетчику на первой странице."""
+        page = await self._fetch(self.get_search_url())
+        if not page:
+            return None
+        try:
+            text = await page.inner_text("body")
+            match = re.search(self.results_count_pattern, text, re.IGNORECASE)
+            if not match:
+                return None
+            return int(re.sub(r"\D", "", match.group(1)) or 0)
+        except Exception:
+            return None
+        finally:
+            try:
+                if not page.is_closed():
+                    await page.close()
+            except Exception:
+                pass
+
     async def parse_all(self, max_pages: int = 10) -> List[Listing]:
         all_listings = []
+        self.crawl_stats = {"pages": 0, "raw": 0, "exhausted": False, "errors": 0}
         
         try:
             for page_num in range(1, max_pages + 1):
@@ -354,7 +541,11 @@ class BaseParser(ABC):
                     print(f"[{self.source_name}] Страница {page_num}/{max_pages}...", end=" ", flush=True)
                     listings = await self.parse_listings_page(page_num)
                     
+                    # Пустой список - только с загруженной страницы выдачи без
+                    # объявлений; сбой загрузки и нераспознанная страница -
+                    # PageLoadError, обход не считается дошедшим до конца
                     if not listings:
+                        self.crawl_stats["exhausted"] = True
                         print(f"объявлений не найдено")
                         if page_num == 1:
                             print(f"[{self.source_name}] Предупреждение: первая страница пустая, возможно проблема с парсингом")
@@ -389,7 +580,11 @@ class BaseParser(ABC):
                                 print(f"  Комнаты: {listing.rooms} (диапазон: {self.config.min_rooms}-{self.config.max_rooms})")
                                 print(f"  Заголовок: {listing.title[:60]}...")
                     
+                    self.crawl_stats["pages"] = page_num
+                    self.crawl_stats["raw"] += len(listings)
                     all_listings.extend(valid_listings)
+                    if self.on_page and valid_listings:
+                        self.on_page(valid_listings)
                     print(f"найдено {len(listings)} объявлений, валидных: {len(valid_listings)}")
                     if invalid_count > 0:
                         print(f"  Отклонено: {invalid_reasons}")
@@ -398,6 +593,7 @@ class BaseParser(ABC):
                     
                 except Exception as e:
                     import traceback
+                    self.crawl_stats["errors"] += 1
                     print(f"ошибка: {str(e)[:100]}")
                     print(f"[{self.source_name}] Детали ошибки на странице {page_num}:")
                     traceback.print_exc()
@@ -407,6 +603,7 @@ class BaseParser(ABC):
             return all_listings
         except Exception as e:
             import traceback
+            self.crawl_stats["errors"] += 1
             print(f"[{self.source_name}] Критическая ошибка в parse_all: {e}")
             traceback.print_exc()
             return []
@@ -47,12 +47,32 @@ class Config:
     )
 
     output_dir: str = "output"
+    stats_dir: str = "stats"
     save_json: bool = True
     save_csv: bool = True
+    # Потоковая запись по страницам: NDJSON (None, "gzip", "zstd") и Parquet
+    save_ndjson: bool = False
+    ndjson_compression: Optional[str] = "gzip"
+    save_parquet: bool = False
+    # Дисковый спул для run_parser.py: объявления пишутся на диск и
+    # грузятся в БД отдельно от обхода (utils/spool.py)
+    spool_dir: Optional[str] = None
 
     enabled_sources: List[str] = field(default_factory=lambda: ["avito", "farpost"])
+    enabled_cities: List[str] = field(default_factory=lambda: ["vladivostok"])
+    enabled_categories: List[str] = field(default_factory=lambda: ["rent_long"])
 
     max_concurrent_requests: int = 5
+    shard_search: bool = False
+
+    session_persistence: bool = True
+    profiles_dir: str = "profiles"
+    session_ttl_hours: int = 24
+    session_max_blocks: int = 3
+
+    browser_endpoint: Optional[str] = None
+    browser_server_host: str = "127.0.0.1"
+    browser_server_port: int = 9222
 
     log_level: str = "INFO"
     log_file: Optional[str] = "parser.log"
@@ -82,6 +102,67 @@ class Config:
         if output_dir:
             config.output_dir = output_dir
 
+        save_ndjson = os.getenv("SAVE_NDJSON")
+        if save_ndjson:
+            config.save_ndjson = save_ndjson.lower() in ("1", "true", "yes")
+
+        ndjson_compression = os.getenv("NDJSON_COMPRESSION")
+        if ndjson_compression:
+            config.ndjson_compression = None if ndjson_compression.lower() == "none" else ndjson_compression.lower()
+
+        save_parquet = os.getenv("SAVE_PARQUET")
+        if save_parquet:
+            config.save_parquet = save_parquet.lower() in ("1", "true", "yes")
+
+        spool_dir = os.getenv("SPOOL_DIR")
+        if spool_dir:
+            config.spool_dir = spool_dir
+
+        session_persistence = os.getenv("SESSION_PERSISTENCE")
+        if session_persistence:
+            config.session_persistence = session_persistence.lower() in ("1", "true", "yes")
+
+        profiles_dir = os.getenv("PROFILES_DIR")
+        if profiles_dir:
+            config.profiles_dir = profiles_dir
+
+        session_ttl = os.getenv("SESSION_TTL_HOURS")
+        if session_ttl:
+            config.session_ttl_hours = int(session_ttl)
+
+        session_max_blocks = os.getenv("SESSION_MAX_BLOCKS")
+        if session_max_blocks:
+            config.session_max_blocks = int(session_max_blocks)
+
+        browser_endpoint = os.getenv("BROWSER_ENDPOINT")
+        if browser_endpoint:
+            config.browser_endpoint = browser_endpoint
+
+        browser_server_port = os.getenv("BROWSER_SERVER_PORT")
+        if browser_server_port:
+            config.browser_server_port = int(browser_server_port)
+
+        for attr, env_name in (
+            ("enabled_sources", "ENABLED_SOURCES"),
+            ("enabled_cities", "ENABLED_CITIES"),
+            ("enabled_categories", "ENABLED_CATEGORIES"),
+        ):
+            values = os.getenv(env_name)
+            if values:
+                setattr(config, attr, [v.strip() for v in values.split(",") if v.strip()])
+
+        shard_search = os.getenv("SHARD_SEARCH")
+        if shard_search:
+            config.shard_search = shard_search.lower() in ("1", "true", "yes")
+
+        crawl_workers = os.getenv("CRAWL_WORKERS")
+        if crawl_workers:
+            config.max_concurrent_requests = int(crawl_workers)
+
+        stats_dir = os.getenv("STATS_DIR")
+        if stats_dir:
+            config.stats_dir = stats_dir
+
         bright_data_key = os.getenv("BRIGHT_DATA_API_KEY")
         if bright_data_key:
             config.bright_data_api_key = bright_data_key
@@ -0,0 +1,43 @@
+"""
+Окружение Alembic. Миграции выполняются синхронно через psycopg2:
+asyncpg не выполняет несколько SQL-команд одним запросом, а ревизии
+накатывают SQL-файлы из database/migrations целиком.
+"""
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from database.database import DATABASE_URL
+from database.models import Base
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def sync_url() -> str:
+    return DATABASE_URL.replace("+asyncpg", "+psycopg2")
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=sync_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(sync_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
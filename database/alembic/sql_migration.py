@@ -0,0 +1,25 @@
+"""
+Выполнение SQL-файла из database/migrations внутри ревизии Alembic.
+"""
+
+from pathlib import Path
+
+from alembic import op
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def run_sql_file(name: str) -> None:
+    """
+    Выполняет файл целиком курсором psycopg2 без параметров - так
+    DO-блоки, функции и format('%I') передаются в PostgreSQL как есть.
+    """
+    sql = (MIGRATIONS_DIR / name).read_text(encoding="utf-8")
+    with op.get_bind().connection.cursor() as cursor:
+        cursor.execute(sql)
+
+
+def irreversible(revision: str) -> None:
+    raise NotImplementedError(
+        f"Миграция {revision} необратима - восстановите базу из резервной копии"
+    )
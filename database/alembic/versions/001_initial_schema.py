@@ -0,0 +1,20 @@
+"""Initial schema: products, offers, attributes
+
+Revision ID: 001
+Revises: 
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("001_initial_schema.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Add district column
+
+Revision ID: 002
+Revises: 001
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("002_add_district_column.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
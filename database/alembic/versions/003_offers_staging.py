@@ -0,0 +1,20 @@
+"""Offers staging table for COPY loads
+
+Revision ID: 003
+Revises: 002
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("003_offers_staging.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Month-partitioned offer price history
+
+Revision ID: 004
+Revises: 003
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("004_offer_price_history.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
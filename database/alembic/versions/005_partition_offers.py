@@ -0,0 +1,20 @@
+"""Partition offers by source and month
+
+Revision ID: 005
+Revises: 004
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("005_partition_offers.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
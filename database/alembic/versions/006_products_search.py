@@ -0,0 +1,20 @@
+"""Full-text and trigram search on products
+
+Revision ID: 006
+Revises: 005
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("006_products_search.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
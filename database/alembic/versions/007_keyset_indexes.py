@@ -0,0 +1,20 @@
+"""Keyset pagination indexes
+
+Revision ID: 007
+Revises: 006
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("007_keyset_indexes.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
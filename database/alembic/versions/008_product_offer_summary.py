@@ -0,0 +1,20 @@
+"""Offer summary columns on products
+
+Revision ID: 008
+Revises: 007
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("008_product_offer_summary.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Statistics counters
+
+Revision ID: 009
+Revises: 008
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("009_stats_counters.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
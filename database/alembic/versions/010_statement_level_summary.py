@@ -0,0 +1,20 @@
+"""Statement-level product summary triggers
+
+Revision ID: 010
+Revises: 009
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("010_statement_level_summary.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Consolidate indexes
+
+Revision ID: 011
+Revises: 010
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("011_consolidate_indexes.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""JSONB attributes
+
+Revision ID: 012
+Revises: 011
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("012_jsonb_attributes.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Spool segments
+
+Revision ID: 013
+Revises: 012
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("013_spool_segments.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
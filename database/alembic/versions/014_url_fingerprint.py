@@ -0,0 +1,20 @@
+"""URL fingerprint
+
+Revision ID: 014
+Revises: 013
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "014"
+down_revision = "013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("014_url_fingerprint.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
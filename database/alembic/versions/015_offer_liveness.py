@@ -0,0 +1,20 @@
+"""Offer liveness
+
+Revision ID: 015
+Revises: 014
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "015"
+down_revision = "014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("015_offer_liveness.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
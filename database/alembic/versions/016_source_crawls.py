@@ -0,0 +1,20 @@
+"""Source crawls
+
+Revision ID: 016
+Revises: 015
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "016"
+down_revision = "015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("016_source_crawls.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,20 @@
+"""Partition offers by first_seen
+
+Revision ID: 017
+Revises: 016
+"""
+
+from database.alembic.sql_migration import irreversible, run_sql_file
+
+revision = "017"
+down_revision = "016"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    run_sql_file("017_partition_by_first_seen.sql")
+
+
+def downgrade() -> None:
+    irreversible(revision)
@@ -0,0 +1,248 @@
+"""
+Загрузка больших объемов объявлений через COPY в staging-таблицу
+и одно множественное слияние в offers.
+"""
+
+import json
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.database import AsyncSessionLocal
+from database.crud import CRUDOffer, CRUDPriceHistory, CRUDStats
+from database.models import URL_FP_SQL
+from models import Listing
+from utils.attributes import extract_attributes
+
+STAGING_TABLE = "offers_staging"
+
+STAGING_COLUMNS = (
+    "external_id",
+    "website_name",
+    "title",
+    "price",
+    "url",
+    "address",
+    "district",
+    "area",
+    "rooms",
+    "property_type",
+    "description",
+    "image_url",
+    "attrs",
+    "date_parsed",
+)
+
+CREATE_STAGING_SQL = f"""
+CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE} (
+    external_id VARCHAR(100),
+    website_name VARCHAR(50),
+    title VARCHAR(500),
+    price INTEGER,
+    url VARCHAR(1000),
+    address VARCHAR(500),
+    district VARCHAR(100),
+    area FLOAT,
+    rooms INTEGER,
+    property_type VARCHAR(100),
+    description TEXT,
+    image_url VARCHAR(1000),
+    attrs JSONB,
+    date_parsed TIMESTAMP
+)
+"""
+
+_columns = ", ".join(STAGING_COLUMNS)
+_columns_insert = _columns.replace("attrs", "coalesce(attrs, '{}')")
+
+_bucket = CRUDStats.PRICE_BUCKET
+
+# Последняя версия каждого URL из staging обновляет offers или вставляется.
+# UNIQUE(url) на секционированной offers нет, поэтому вместо ON CONFLICT -
+# UPDATE существующих и INSERT отсутствующих в prev; источники заблокированы
+# advisory-блокировкой до commit. prev читает снимок offers до слияния,
+# новые объявления и изменения цены пишутся в offer_price_history, их
+# приращения - в stats_counters (см. CRUDStats). Увиденные объявления
+# получают last_seen, снятые с публикации снова становятся активными и
+# учитываются в счетчиках как вернувшиеся.
+MERGE_SQL = f"""
+WITH src AS (
+    SELECT DISTINCT ON (url) {_columns}, {URL_FP_SQL} AS url_fp
+    FROM {STAGING_TABLE}
+    ORDER BY url, date_parsed DESC
+),
+prev AS (
+    SELECT o.id, o.url, o.price, o.title, o.is_active
+    FROM offers o
+    JOIN src s ON s.website_name = o.website_name AND s.url_fp = o.url_fp AND s.url = o.url
+),
+updated AS (
+    UPDATE offers o SET
+        price = s.price,
+        title = s.title,
+        date_parsed = s.date_parsed,
+        last_seen = s.date_parsed,
+        is_active = true,
+        attrs = o.attrs || coalesce(s.attrs, '{{}}')
+    FROM src s
+    WHERE s.website_name = o.website_name AND s.url_fp = o.url_fp AND s.url = o.url
+    RETURNING o.id, o.url, o.price, o.title, o.date_parsed, o.website_name
+),
+inserted AS (
+    INSERT INTO offers ({_columns}, first_seen, last_seen)
+    SELECT {_columns_insert}, date_parsed, date_parsed FROM src
+    WHERE NOT EXISTS (SELECT 1 FROM prev WHERE prev.url = src.url)
+    RETURNING offers.id, offers.url, offers.price, offers.title, offers.date_parsed, offers.website_name
+),
+merged AS (
+    SELECT *, true AS inserted FROM inserted
+    UNION ALL
+    SELECT *, false AS inserted FROM updated
+),
+history AS (
+    INSERT INTO offer_price_history (offer_id, price, old_price, changed_at)
+    SELECT m.id, m.price, p.price, m.date_parsed
+    FROM merged m
+    LEFT JOIN prev p USING (url)
+    WHERE m.inserted OR p.price IS DISTINCT FROM m.price
+    ON CONFLICT DO NOTHING
+),
+counters AS (
+    INSERT INTO stats_counters (metric, key, value, updated_at)
+    SELECT metric, key, sum(delta), now()
+    FROM (
+        SELECT 'offers_by_source' AS metric, m.website_name AS key, 1 AS delta
+        FROM merged m LEFT JOIN prev p USING (url)
+        WHERE m.inserted OR NOT p.is_active
+        UNION ALL
+        SELECT 'offers_new', to_char(current_date, 'YYYY-MM-DD'), 1
+        FROM merged m WHERE m.inserted
+        UNION ALL
+        SELECT 'offer_price_bucket', (m.price / {_bucket} * {_bucket})::text, 1
+        FROM merged m LEFT JOIN prev p USING (url)
+        WHERE m.inserted OR NOT p.is_active OR p.price <> m.price
+        UNION ALL
+        SELECT 'offer_price_bucket', (p.price / {_bucket} * {_bucket})::text, -1
+        FROM merged m JOIN prev p USING (url)
+        WHERE NOT m.inserted AND p.is_active AND p.price <> m.price
+    ) d
+    GROUP BY metric, key
+    ON CONFLICT (metric, key) DO UPDATE SET
+        value = stats_counters.value + EXCLUDED.value,
+        updated_at = EXCLUDED.updated_at
+)
+SELECT
+    count(*) FILTER (WHERE m.inserted) AS inserted,
+    count(*) FILTER (
+        WHERE NOT m.inserted
+          AND (p.price IS DISTINCT FROM m.price OR p.title IS DISTINCT FROM m.title)
+    ) AS changed,
+    count(*) FILTER (
+        WHERE NOT m.inserted
+          AND p.price IS NOT DISTINCT FROM m.price
+          AND p.title IS NOT DISTINCT FROM m.title
+    ) AS unchanged
+FROM merged m
+LEFT JOIN prev p USING (url)
+"""
+
+def listing_to_record(listing: Listing) -> tuple:
+    return (
+        listing.external_id,
+        listing.source,
+        listing.title,
+        listing.price,
+        listing.url,
+        listing.address,
+        listing.district,
+        listing.area,
+        listing.rooms,
+        listing.property_type,
+        listing.description,
+        listing.images[0] if listing.images else None,
+        json.dumps(extract_attributes(listing), ensure_ascii=False),
+        listing.parsed_at,
+    )
+
+
+async def aiter_listings(listings: Iterable[Listing]) -> AsyncIterator[Listing]:
+    for listing in listings:
+        yield listing
+
+
+class BulkLoader:
+    """
+    Потоково копирует объявления в UNLOGGED-таблицу offers_staging
+    (asyncpg copy_records_to_table) и переносит их в offers одним
+    слиянием (UPDATE + INSERT ... SELECT) в той же транзакции.
+
+    TRUNCATE staging-таблицы держит эксклюзивную блокировку до commit,
+    поэтому параллельные загрузки выполняются по очереди.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 50_000):
+        self.db = db
+        self.batch_size = batch_size
+
+    async def _driver_connection(self):
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        return raw_connection.driver_connection
+
+    async def load(
+        self,
+        listings: AsyncIterable[Listing],
+        before_commit: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ) -> dict:
+        """
+        Args:
+            before_commit: вызывается со статистикой в транзакции слияния
+                перед commit - для записей, которые должны зафиксироваться
+                вместе с объявлениями; исключение откатывает загрузку
+
+        Returns:
+            {"staged": n, "inserted": n, "changed": n, "unchanged": n}
+        """
+        await self.db.execute(text(CREATE_STAGING_SQL))
+        await self.db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+        driver = await self._driver_connection()
+
+        staged = 0
+        buffer = []
+        async for listing in listings:
+            buffer.append(listing_to_record(listing))
+            if len(buffer) >= self.batch_size:
+                await driver.copy_records_to_table(STAGING_TABLE, records=buffer, columns=STAGING_COLUMNS)
+                staged += len(buffer)
+                buffer = []
+        if buffer:
+            await driver.copy_records_to_table(STAGING_TABLE, records=buffer, columns=STAGING_COLUMNS)
+            staged += len(buffer)
+
+        stats = {"staged": staged, "inserted": 0, "changed": 0, "unchanged": 0}
+        if staged:
+            # Секции нужны только новым строкам: их first_seen = date_parsed
+            keys = (await self.db.execute(text(
+                f"SELECT DISTINCT website_name, date_trunc('month', date_parsed) FROM {STAGING_TABLE}"
+            ))).all()
+            await CRUDOffer.lock_sources(self.db, (source for source, _ in keys))
+            await CRUDOffer.ensure_partitions(self.db, keys)
+            await CRUDPriceHistory.ensure_partitions(self.db, (month for _, month in keys))
+            row = (await self.db.execute(text(MERGE_SQL))).one()
+            stats.update(inserted=row.inserted, changed=row.changed, unchanged=row.unchanged)
+
+        if before_commit is not None:
+            await before_commit(stats)
+        await self.db.execute(text(f"TRUNCATE {STAGING_TABLE}"))
+        await self.db.commit()
+        return stats
+
+
+async def copy_load(
+    listings: AsyncIterable[Listing], db: Optional[AsyncSession] = None, batch_size: int = 50_000
+) -> dict:
+    if db is not None:
+        return await BulkLoader(db, batch_size).load(listings)
+    async with AsyncSessionLocal() as session:
+        return await BulkLoader(session, batch_size).load(listings)
@@ -1,15 +1,162 @@
-from typing import List, Optional
-from sqlalchemy import select, func, or_, and_
+import hashlib
+import json
+import re
+from datetime import date, datetime, timedelta
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import (
+    DateTime, Float, Integer, String, bindparam, cast, literal_column, select, func, or_, and_, text, tuple_,
+)
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from database.models import Product, Offer, Attribute
+from database.models import Product, Offer, PriceHistory, StatsCounter
 from models import Listing
+from utils.attributes import extract_attributes
+from utils.ttl_cache import TTLCache
+
+# total для повторяющихся комбинаций фильтров поиска
+COUNT_CACHE = TTLCache(ttl_seconds=60, max_size=2048)
+
+# Операторы горячих путей строятся один раз при импорте, значения
+# передаются bind-параметрами: на запрос не тратится построение выражения
+# и ключ кэша компиляции SQLAlchemy
+PRODUCT_BY_ID = (
+    select(Product)
+    .options(selectinload(Product.offers))
+    .where(Product.id == bindparam("product_id"))
+)
+PRODUCTS_LATEST = (
+    select(Product)
+    .order_by(Product.created_at.desc(), Product.id.desc())
+    .limit(bindparam("limit", type_=Integer))
+    .offset(bindparam("offset", type_=Integer))
+)
+PRODUCTS_LATEST_AFTER = PRODUCTS_LATEST.where(
+    tuple_(Product.created_at, Product.id) < tuple_(
+        bindparam("last_created", type_=DateTime), bindparam("last_id", type_=Integer)
+    )
+)
+PRODUCTS_COUNT = select(func.count(Product.id))
+OFFER_BY_URL = select(Offer).where(Offer.url_fp == bindparam("url_fp"), Offer.url == bindparam("url"))
+OFFER_BY_EXTERNAL_ID = (
+    select(Offer)
+    .where(Offer.website_name == bindparam("website_name"), Offer.external_id == bindparam("external_id"))
+    .order_by(Offer.date_parsed.desc())
+    .limit(1)
+)
+EXISTING_TABLES_SQL = text(
+    "SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NOT NULL"
+)
+OFFERS_UNASSIGNED = select(Offer).where(Offer.product_id.is_(None)).limit(bindparam("limit", type_=Integer))
+OFFERS_COUNT_BY_SOURCE = select(Offer.website_name, func.count(Offer.id)).group_by(Offer.website_name)
+
+# Обновление пакета объявлений одним оператором: триггеры offers уровня
+# оператора пересчитывают сводку продуктов один раз на пакет
+OFFERS_BATCH_UPDATE_SQL = text("""
+UPDATE offers o SET
+    price = v.price,
+    title = v.title,
+    date_parsed = v.date_parsed,
+    last_seen = v.date_parsed,
+    is_active = true,
+    attrs = o.attrs || v.attrs
+FROM unnest(
+    CAST(:ids AS integer[]),
+    CAST(:websites AS varchar[]),
+    CAST(:prices AS integer[]),
+    CAST(:titles AS varchar[]),
+    CAST(:dates AS timestamp[]),
+    CAST(:attrs AS jsonb[])
+) AS v(id, website_name, price, title, date_parsed, attrs)
+WHERE o.id = v.id AND o.website_name = v.website_name
+""")
+
+# Привязка объявлений к продуктам пакетом: один UPDATE - один запуск
+# триггера сводки на все затронутые продукты
+OFFERS_ASSIGN_SQL = text("""
+UPDATE offers o SET product_id = v.product_id
+FROM unnest(
+    CAST(:ids AS integer[]),
+    CAST(:websites AS varchar[]),
+    CAST(:product_ids AS integer[])
+) AS v(id, website_name, product_id)
+WHERE o.id = v.id AND o.website_name = v.website_name
+""")
+
+# Пропавшие объявления источника: не виденные ни в окне :cutoff, ни в
+# последнем полном обходе. Без полного обхода подзапрос дает NULL и
+# условие не выполняется - неполный обход ничего не снимает
+STALE_OFFERS_WHERE = """
+website_name = :source AND is_active
+AND last_seen < (SELECT least(:cutoff, started_at) FROM source_crawls WHERE source = :source)
+"""
+OFFERS_DEACTIVATE_SQL = text(f"""
+UPDATE offers SET is_active = false
+WHERE {STALE_OFFERS_WHERE}
+RETURNING website_name, price
+""")
+OFFERS_STALE_COUNT_SQL = text(f"SELECT count(*) FROM offers WHERE {STALE_OFFERS_WHERE}")
+SOURCE_CRAWL_UPSERT_SQL = text("""
+INSERT INTO source_crawls (source, started_at, completed_at)
+VALUES (:source, :started_at, now())
+ON CONFLICT (source) DO UPDATE SET
+    started_at = EXCLUDED.started_at,
+    completed_at = EXCLUDED.completed_at
+""")
+
+async def _existing_tables(db: AsyncSession, names: Iterable[str]) -> set:
+    """Какие из таблиц уже есть в каталоге (с учетом текущей транзакции)."""
+    result = await db.execute(EXISTING_TABLES_SQL, {"names": sorted(set(names))})
+    return set(result.scalars().all())
+
+async def _create_partition(
+    db: AsyncSession, parent: str, name: str, bounds: str, where: str, columns: List[str],
+    subpartition_by: Optional[str] = None,
+) -> None:
+    """
+    CREATE TABLE name PARTITION OF parent bounds; с subpartition_by секция
+    сама секционируется и получает DEFAULT-подсекцию. Если строки диапазона
+    (where) уже лежат в DEFAULT-секции parent - секцию создавала
+    откатившаяся транзакция, - DEFAULT на время отсоединяется и строки
+    переносятся в новую секцию: иначе CREATE падает на проверке DEFAULT
+    и загрузка этого ключа не проходит никогда.
+    """
+    default = f"{parent}_default"
+    misplaced = bool(await _existing_tables(db, [default])) and (await db.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {where})")
+    )).scalar_one()
+
+    async def create() -> None:
+        if subpartition_by is None:
+            await db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} {bounds}"))
+            return
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} {bounds} PARTITION BY {subpartition_by}"
+        ))
+        await db.execute(text(f"CREATE TABLE IF NOT EXISTS {name}_default PARTITION OF {name} DEFAULT"))
+
+    if not misplaced:
+        await create()
+        return
+
+    cols = ", ".join(columns)
+    await db.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {default}"))
+    await create()
+    await db.execute(text(f"INSERT INTO {name} ({cols}) SELECT {cols} FROM {default} WHERE {where}"))
+    await db.execute(text(f"DELETE FROM {default} WHERE {where}"))
+    await db.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT"))
+    print(f"[БД] Строки из {default} перенесены в секцию {name}")
 
 class CRUDProduct:
 
     @staticmethod
-    async def create(db: AsyncSession, title: str, address: str, district: str = None, **kwargs) -> Product:
+    async def create(
+        db: AsyncSession, title: str, address: str, district: str = None, commit: bool = True, **kwargs
+    ) -> Product:
+        """commit=False - только flush (id назначен), commit на вызывающем."""
         product = Product(
             canonical_title=title,
             canonical_address=address,
@@ -17,22 +164,20 @@ class CRUDProduct:
             **kwargs
         )
         db.add(product)
+        if not commit:
+            await db.flush()
+            return product
         await db.commit()
         await db.refresh(product)
         return product
 
     @staticmethod
     async def get_by_id(db: AsyncSession, product_id: int) -> Optional[Product]:
-        result = await db.execute(
-            select(Product)
-            .options(selectinload(Product.offers), selectinload(Product.attributes))
-            .where(Product.id == product_id)
-        )
+        result = await db.execute(PRODUCT_BY_ID, {"product_id": product_id})
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def search(
-        db: AsyncSession,
+    def search_params(
         query: str = "",
         min_price: Optional[int] = None,
         max_price: Optional[int] = None,
@@ -41,157 +186,708 @@ class CRUDProduct:
         rooms: Optional[int] = None,
         property_type: Optional[str] = None,
         district: Optional[str] = None,
-        limit: int = 100,
-        offset: int = 0
-    ) -> List[Product]:
-        # Важно: загружаем офферы через selectinload для доступа к ним
-        stmt = select(Product).options(selectinload(Product.offers))
-
+        attrs: Optional[dict] = None,
+        active_only: bool = True,
+    ) -> Tuple[tuple, dict]:
+        """
+        Значения фильтров поиска -> (форма, параметры). Форма - имена
+        заданных фильтров; операторы строятся и кэшируются по форме,
+        значения передаются bind-параметрами.
+        """
+        params = {}
         if query:
-            search_pattern = f"%{query.lower()}%"
-            stmt = stmt.where(
-                or_(
-                    func.lower(Product.canonical_title).like(search_pattern),
-                    func.lower(Product.canonical_address).like(search_pattern),
-                    func.lower(Product.description).like(search_pattern)
-                )
-            )
+            params["query"] = query
+            params["pattern"] = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+        for name, value in (
+            ("min_price", min_price), ("max_price", max_price),
+            ("min_area", min_area), ("max_area", max_area), ("rooms", rooms),
+        ):
+            if value is not None:
+                params[name] = value
+        if property_type:
+            params["property_type"] = property_type
+        if district:
+            params["district"] = f"%{district}%"
+        if attrs:
+            params["attrs"] = json.dumps(attrs, sort_keys=True, ensure_ascii=False)
+        shape = tuple(sorted(params))
+        if active_only:
+            shape += ("active",)
+        return shape, params
+
+    @staticmethod
+    def _ts_query():
+        return func.websearch_to_tsquery("russian", bindparam("query", type_=String))
 
-        if min_price is not None:
-            stmt = stmt.where(Product.min_price >= min_price)
-        if max_price is not None:
-            stmt = stmt.where(Product.min_price <= max_price)
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def filter_clauses(shape: tuple) -> tuple:
+        """Условия WHERE поиска для формы фильтров - общие для выдачи и подсчета total."""
+        clauses = []
+        if "query" in shape:
+            # Словоформы ищем по search_vector (GIN), часть названия улицы -
+            # по триграммному индексу адреса; планировщик объединяет оба
+            # индекса через BitmapOr
+            clauses.append(or_(
+                Product.search_vector.op("@@")(CRUDProduct._ts_query()),
+                Product.canonical_address.ilike(bindparam("pattern", type_=String), escape="\\"),
+            ))
 
-        if min_area is not None:
-            stmt = stmt.where(Product.area >= min_area)
-        if max_area is not None:
-            stmt = stmt.where(Product.area <= max_area)
+        if "min_price" in shape:
+            clauses.append(Product.min_price >= bindparam("min_price"))
+        if "max_price" in shape:
+            clauses.append(Product.min_price <= bindparam("max_price"))
 
-        if rooms is not None:
-            stmt = stmt.where(Product.rooms == rooms)
+        if "min_area" in shape:
+            clauses.append(Product.area >= bindparam("min_area"))
+        if "max_area" in shape:
+            clauses.append(Product.area <= bindparam("max_area"))
 
-        if property_type:
-            stmt = stmt.where(Product.property_type == property_type)
+        if "rooms" in shape:
+            clauses.append(Product.rooms == bindparam("rooms"))
 
-        if district:
-            stmt = stmt.where(Product.district.ilike(f"%{district}%"))
+        if "property_type" in shape:
+            clauses.append(Product.property_type == bindparam("property_type"))
 
-        stmt = stmt.order_by(Product.min_price.asc()).limit(limit).offset(offset)
+        if "district" in shape:
+            clauses.append(Product.district.ilike(bindparam("district")))
 
-        result = await db.execute(stmt)
-        return list(result.scalars().all())
+        if "attrs" in shape:
+            # Все атрибутные фильтры - одно условие включения по GIN-индексу
+            clauses.append(Product.attrs.contains(cast(bindparam("attrs", type_=String), JSONB)))
+
+        if "active" in shape:
+            # Константа, а не параметр: иначе общий план подготовленного
+            # оператора не сможет использовать частичный индекс
+            # ix_products_active_price (WHERE offers_count > 0)
+            clauses.append(Product.offers_count > literal_column("0"))
+
+        # Ключ сортировки и курсора (min_price, id): продукты без цены
+        # встали бы в конец, курсор на них не кодируется, а сравнение
+        # строк с NULL их пропускает - в поиск они не попадают
+        clauses.append(Product.min_price.isnot(None))
+        return tuple(clauses)
 
     @staticmethod
-    async def get_all(db: AsyncSession, limit: int = 100, offset: int = 0) -> List[Product]:
-        result = await db.execute(
-            select(Product)
-            .options(selectinload(Product.offers))
-            .order_by(Product.created_at.desc())
-            .limit(limit)
-            .offset(offset)
+    @lru_cache(maxsize=256)
+    def _count_statement(mode: str, shape: tuple):
+        clauses = CRUDProduct.filter_clauses(shape)
+        if mode == "estimate":
+            return select(Product.id).where(*clauses)
+        if mode == "capped":
+            limited = select(Product.id).where(*clauses).limit(bindparam("cap_rows", type_=Integer)).subquery()
+            return select(func.count()).select_from(limited)
+        return select(func.count(Product.id)).where(*clauses)
+
+    @staticmethod
+    async def count_filtered(
+        db: AsyncSession, mode: str = "exact", cap: int = 1000, **filters
+    ) -> Tuple[int, bool]:
+        """
+        Число продуктов под фильтрами поиска.
+
+        mode:
+            exact    - count(*) по условиям
+            estimate - оценка строк планировщика (EXPLAIN), без выполнения
+            capped   - считает не дальше cap + 1 строки
+
+        Результат кэшируется по режиму и набору фильтров на COUNT_CACHE.ttl_seconds.
+
+        Returns:
+            (total, capped) - capped=True, если строк больше cap
+        """
+        shape, params = CRUDProduct.search_params(**filters)
+        key = (mode, cap, shape, tuple(sorted(params.items())))
+        cached = COUNT_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        stmt = CRUDProduct._count_statement(mode, shape)
+        if mode == "estimate":
+            compiled = stmt.params(params).compile(
+                dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}
+            )
+            # Двоеточия в литералах не должны стать bind-параметрами text()
+            sql = str(compiled).replace(":", "\\:")
+            plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            result = (int(plan[0]["Plan"]["Plan Rows"]), False)
+        elif mode == "capped":
+            total = (await db.execute(stmt, dict(params, cap_rows=cap + 1))).scalar_one()
+            result = (min(total, cap), total > cap)
+        else:
+            total = (await db.execute(stmt, params)).scalar_one()
+            result = (total, False)
+
+        COUNT_CACHE.set(key, result)
+        return result
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _search_statement(shape: tuple, with_cursor: bool, load_offers: bool):
+        stmt = select(Product)
+        if load_offers:
+            stmt = stmt.options(selectinload(Product.offers))
+        stmt = stmt.where(*CRUDProduct.filter_clauses(shape))
+
+        rank = None
+        if "query" in shape:
+            rank = func.ts_rank_cd(Product.search_vector, CRUDProduct._ts_query())
+            stmt = stmt.add_columns(rank)
+
+        price_key = tuple_(Product.min_price, Product.id)
+        last_key = tuple_(bindparam("last_price", type_=Integer), bindparam("last_id", type_=Integer))
+        if with_cursor:
+            if rank is not None:
+                stmt = stmt.where(or_(
+                    rank < bindparam("last_rank", type_=Float),
+                    and_(rank == bindparam("last_rank", type_=Float), price_key > last_key),
+                ))
+            else:
+                stmt = stmt.where(price_key > last_key)
+
+        if rank is not None:
+            stmt = stmt.order_by(rank.desc(), Product.min_price.asc(), Product.id.asc())
+        else:
+            stmt = stmt.order_by(Product.min_price.asc(), Product.id.asc())
+        return stmt.limit(bindparam("limit", type_=Integer)).offset(bindparam("offset", type_=Integer))
+
+    @staticmethod
+    async def search(
+        db: AsyncSession,
+        query: str = "",
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_area: Optional[float] = None,
+        max_area: Optional[float] = None,
+        rooms: Optional[int] = None,
+        property_type: Optional[str] = None,
+        district: Optional[str] = None,
+        attrs: Optional[dict] = None,
+        active_only: bool = True,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: Optional[tuple] = None,
+        load_offers: bool = False
+    ) -> List[Product]:
+        """
+        cursor - ключ последней строки предыдущей страницы: (min_price, id),
+        а при поиске по тексту (rank, min_price, id). С курсором offset не
+        нужен и страница читается с позиции курсора по индексу. Продукты
+        без min_price в поиск не входят: NULL в ключе курсора недостижим.
+        attrs - атрибуты, которые должны быть у продукта (attrs @> ...).
+        active_only - только продукты с активными объявлениями.
+        При поиске по тексту у продуктов заполнен атрибут search_rank.
+
+        load_offers - загрузить объявления продуктов (нужно дедупликации);
+        для выдачи API достаточно сводки offers_count/sources/last_seen.
+        """
+        shape, params = CRUDProduct.search_params(
+            query, min_price, max_price, min_area, max_area, rooms, property_type, district, attrs,
+            active_only
         )
+        params.update(limit=limit, offset=offset)
+        if cursor is not None:
+            if query:
+                params["last_rank"], params["last_price"], params["last_id"] = cursor
+            else:
+                params["last_price"], params["last_id"] = cursor
+
+        stmt = CRUDProduct._search_statement(shape, cursor is not None, load_offers)
+        result = await db.execute(stmt, params)
+        if not query:
+            return list(result.scalars().all())
+
+        products = []
+        for product, product_rank in result.all():
+            product.search_rank = product_rank
+            products.append(product)
+        return products
+
+    @staticmethod
+    async def get_all(
+        db: AsyncSession, limit: int = 100, offset: int = 0, cursor: Optional[tuple] = None
+    ) -> List[Product]:
+        """cursor - (created_at, id) последней строки предыдущей страницы."""
+        params = {"limit": limit, "offset": offset}
+        if cursor is None:
+            stmt = PRODUCTS_LATEST
+        else:
+            stmt = PRODUCTS_LATEST_AFTER
+            params["last_created"], params["last_id"] = cursor
+        result = await db.execute(stmt, params)
         return list(result.scalars().all())
 
     @staticmethod
     async def count(db: AsyncSession) -> int:
-        result = await db.execute(select(func.count(Product.id)))
+        result = await db.execute(PRODUCTS_COUNT)
         return result.scalar_one()
 
+class CRUDOffer:
+
     @staticmethod
-    async def update_min_price(db: AsyncSession, product_id: int) -> None:
-        result = await db.execute(
-            select(func.min(Offer.price)).where(Offer.product_id == product_id)
-        )
-        min_price = result.scalar_one_or_none()
-        if min_price:
-            await db.execute(
-                select(Product).where(Product.id == product_id)
+    def listing_to_row(listing: Listing, product_id: Optional[int] = None) -> dict:
+        return {
+            "product_id": product_id,
+            "external_id": listing.external_id,
+            "website_name": listing.source,
+            "title": listing.title,
+            "price": listing.price,
+            "url": listing.url,
+            "address": listing.address,
+            "district": listing.district,
+            "area": listing.area,
+            "rooms": listing.rooms,
+            "property_type": listing.property_type,
+            "description": listing.description,
+            "image_url": listing.images[0] if listing.images else None,
+            "attrs": extract_attributes(listing),
+            "date_parsed": listing.parsed_at,
+            "first_seen": listing.parsed_at,
+            "last_seen": listing.parsed_at,
+        }
+
+    @staticmethod
+    def url_fingerprint(url: str) -> int:
+        """Первые 64 бита md5(url) как знаковое число - совпадает с offers.url_fp (URL_FP_SQL)."""
+        return int.from_bytes(hashlib.md5(url.encode("utf-8")).digest()[:8], "big", signed=True)
+
+    # Колонки для переноса строк между секциями (без генерируемых)
+    PARTITION_COLUMNS = [c.name for c in Offer.__table__.columns if c.computed is None]
+
+    @staticmethod
+    def partition_name(source: str, month: Optional[date] = None) -> str:
+        name = "offers_" + re.sub(r"[^a-z0-9_]", "_", source.lower())
+        return f"{name}_{month:%Y%m}" if month else name
+
+    @staticmethod
+    async def ensure_partitions(db: AsyncSession, keys: Iterable[tuple]) -> None:
+        """
+        Создает секции offers для пар (источник, first_seen): секцию источника
+        (LIST, со своей DEFAULT-подсекцией) и месячную подсекцию (RANGE).
+        Наличие проверяется по каталогу на каждый вызов: кэш в процессе
+        переживал бы откат транзакции, создавшей секцию, и строки месяца
+        уходили бы в DEFAULT.
+        """
+        wanted = {(source, date(m.year, m.month, 1)) for source, m in keys}
+        names = {(source, month): CRUDOffer.partition_name(source, month) for source, month in wanted}
+        existing = await _existing_tables(db, names.values())
+        for source, month in sorted(wanted):
+            if names[source, month] in existing:
+                continue
+            parent = CRUDOffer.partition_name(source)
+            next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            literal = source.replace("'", "''")
+            if not await _existing_tables(db, [parent]):
+                await _create_partition(
+                    db, "offers", parent, f"FOR VALUES IN ('{literal}')", f"website_name = '{literal}'",
+                    CRUDOffer.PARTITION_COLUMNS, subpartition_by="RANGE (first_seen)",
+                )
+            await _create_partition(
+                db, parent, names[source, month],
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')",
+                f"first_seen >= '{month.isoformat()}' AND first_seen < '{next_month.isoformat()}'",
+                CRUDOffer.PARTITION_COLUMNS,
             )
-            product = (await db.execute(select(Product).where(Product.id == product_id))).scalar_one()
-            product.min_price = min_price
-            await db.commit()
 
-class CRUDOffer:
+    @staticmethod
+    async def lock_sources(db: AsyncSession, sources: Iterable[str]) -> None:
+        """
+        Транзакционная advisory-блокировка источников. UNIQUE(url) на
+        секционированной offers не поддерживается, поэтому слияния одного
+        источника выполняются строго по очереди. Порядок фиксирован -
+        без взаимных блокировок.
+        """
+        for source in sorted(set(sources)):
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"offers:{source}"}
+            )
 
     @staticmethod
     async def create(db: AsyncSession, listing: Listing, product_id: Optional[int] = None) -> Offer:
-        offer = Offer(
-            product_id=product_id,
-            external_id=listing.external_id,
-            website_name=listing.source,
-            title=listing.title,
-            price=listing.price,
-            url=listing.url,
-            address=listing.address,
-            district=listing.district,
-            area=listing.area,
-            rooms=listing.rooms,
-            property_type=listing.property_type,
-            description=listing.description,
-            image_url=listing.images[0] if listing.images else None
-        )
+        """
+        Одно объявление. Как и пакетные загрузки - под блокировкой
+        источника: если url уже есть, возвращается существующее.
+        """
+        row = CRUDOffer.listing_to_row(listing, product_id)
+        await CRUDOffer.lock_sources(db, [row["website_name"]])
+        existing = (await db.execute(
+            OFFER_BY_URL, {"url_fp": CRUDOffer.url_fingerprint(row["url"]), "url": row["url"]}
+        )).scalars().first()
+        if existing is not None:
+            await db.commit()
+            return existing
+        await CRUDOffer.ensure_partitions(db, [(row["website_name"], row["first_seen"])])
+        offer = Offer(**row)
         db.add(offer)
+        await CRUDStats.add(db, CRUDStats.offer_deltas(inserted=[(offer.website_name, offer.price)]))
         await db.commit()
         await db.refresh(offer)
         return offer
 
+    @staticmethod
+    async def bulk_upsert(
+        db: AsyncSession, listings: List[Listing], batch_size: int = 1000
+    ) -> List[dict]:
+        """
+        Пакетное слияние по url. Ключ слияния - url (url_fp с проверкой
+        url), а не (website_name, external_id): ограничений уникальности
+        на offers нет (см. Offer), уникальность url держит блокировка
+        источника. Существующие объявления обновляются одним
+        UPDATE ... FROM unnest(...) (цена, заголовок, date_parsed и last_seen,
+        снятые с публикации снова активны, атрибуты дополняются; ключ
+        секционирования first_seen не меняется - строка остается в своей
+        секции), новые вставляются одним INSERT.
+        Пакет выполняется под блокировкой своих источников, один commit на пакет.
+
+        Returns:
+            Список {"inserted": n, "updated": m} по каждому пакету
+        """
+        batches = []
+        for start in range(0, len(listings), batch_size):
+            rows = list({
+                row["url"]: row
+                for row in (CRUDOffer.listing_to_row(l) for l in listings[start:start + batch_size])
+            }.values())
+            sources = {row["website_name"] for row in rows}
+
+            await CRUDOffer.lock_sources(db, sources)
+
+            # Поиск по отпечатку, url сверяется - коллизии md5 не склеят объявления
+            urls = {row["url"] for row in rows}
+            existing = {
+                url: (offer_id, price, is_active)
+                for offer_id, url, price, is_active in (await db.execute(
+                    select(Offer.id, Offer.url, Offer.price, Offer.is_active).where(
+                        Offer.website_name.in_(sources),
+                        Offer.url_fp.in_([CRUDOffer.url_fingerprint(url) for url in urls]),
+                    )
+                )).all()
+                if url in urls
+            }
+
+            updates = [row for row in rows if row["url"] in existing]
+            if updates:
+                await db.execute(OFFERS_BATCH_UPDATE_SQL, {
+                    "ids": [existing[row["url"]][0] for row in updates],
+                    "websites": [row["website_name"] for row in updates],
+                    "prices": [row["price"] for row in updates],
+                    "titles": [row["title"] for row in updates],
+                    "dates": [row["date_parsed"] for row in updates],
+                    "attrs": [json.dumps(row["attrs"], ensure_ascii=False) for row in updates],
+                })
+
+            inserts = [row for row in rows if row["url"] not in existing]
+            inserted = []
+            if inserts:
+                await CRUDOffer.ensure_partitions(db, ((row["website_name"], row["first_seen"]) for row in inserts))
+                inserted = (await db.execute(
+                    pg_insert(Offer).values(inserts).returning(
+                        Offer.id, Offer.website_name, Offer.price, Offer.date_parsed
+                    )
+                )).all()
+
+            history = [
+                {"offer_id": offer_id, "price": price, "old_price": None, "changed_at": date_parsed}
+                for offer_id, _, price, date_parsed in inserted
+            ] + [
+                {
+                    "offer_id": existing[row["url"]][0],
+                    "price": row["price"],
+                    "old_price": existing[row["url"]][1],
+                    "changed_at": row["date_parsed"],
+                }
+                for row in updates
+                if existing[row["url"]][1] != row["price"]
+            ]
+            await CRUDPriceHistory.bulk_add(db, history)
+            await CRUDStats.add(db, CRUDStats.offer_deltas(
+                inserted=((source, price) for _, source, price, _ in inserted),
+                repriced=(
+                    (existing[row["url"]][1], row["price"])
+                    for row in updates
+                    if existing[row["url"]][2] and existing[row["url"]][1] != row["price"]
+                ),
+                reactivated=(
+                    (row["website_name"], row["price"])
+                    for row in updates
+                    if not existing[row["url"]][2]
+                ),
+            ))
+            await db.commit()
+
+            batches.append({"inserted": len(inserted), "updated": len(updates)})
+        return batches
+
+    @staticmethod
+    async def assign_products(db: AsyncSession, assignments: List[Tuple[Offer, int]]) -> None:
+        """Привязывает объявления к продуктам одним UPDATE, без commit."""
+        if not assignments:
+            return
+        await db.execute(OFFERS_ASSIGN_SQL, {
+            "ids": [offer.id for offer, _ in assignments],
+            "websites": [offer.website_name for offer, _ in assignments],
+            "product_ids": [product_id for _, product_id in assignments],
+        })
+
+    @staticmethod
+    async def record_complete_crawl(db: AsyncSession, source: str, started_at: datetime) -> None:
+        """
+        Запоминает полный обход источника, начатый в started_at (все единицы
+        дошли до конца выдачи без ошибок, объявления уже в offers).
+        Commit - на вызывающем.
+        """
+        await db.execute(SOURCE_CRAWL_UPSERT_SQL, {"source": source, "started_at": started_at})
+
+    @staticmethod
+    async def count_stale(db: AsyncSession, source: str, window: timedelta) -> int:
+        result = await db.execute(OFFERS_STALE_COUNT_SQL, {"source": source, "cutoff": datetime.now() - window})
+        return result.scalar_one()
+
+    @staticmethod
+    async def deactivate_stale(db: AsyncSession, source: str, window: timedelta) -> int:
+        """
+        Снимает с публикации объявления источника, не виденные дольше
+        window (окно обхода источника) и в последнем полном обходе
+        (record_complete_crawl). Объявления источника снимаются во всех
+        городах и категориях, поэтому полным считается только обход всех
+        зарегистрированных (planner.sources.registered_scopes). Обход с
+        лимитом страниц или с ошибками не обновляет last_seen у части выдачи, поэтому без полного обхода
+        ничего не снимается. Сводку затронутых продуктов пересчитывает
+        триггер offers, счетчики - offers_removed. Commit - на вызывающем.
+
+        Returns:
+            Число снятых объявлений
+        """
+        await CRUDOffer.lock_sources(db, [source])
+        removed = (await db.execute(
+            OFFERS_DEACTIVATE_SQL, {"source": source, "cutoff": datetime.now() - window}
+        )).all()
+        await CRUDStats.add(db, CRUDStats.offer_deltas(removed=removed))
+        return len(removed)
+
     @staticmethod
     async def get_by_url(db: AsyncSession, url: str) -> Optional[Offer]:
-        result = await db.execute(select(Offer).where(Offer.url == url))
+        result = await db.execute(OFFER_BY_URL, {"url_fp": CRUDOffer.url_fingerprint(url), "url": url})
         return result.scalar_one_or_none()
 
     @staticmethod
     async def get_by_external_id(
         db: AsyncSession, external_id: str, website_name: str
     ) -> Optional[Offer]:
+        """
+        Объявление по естественному ключу. Уникальность (website_name,
+        external_id) не закреплена ограничением (см. Offer) - при дублях
+        возвращается последнее увиденное.
+        """
         result = await db.execute(
-            select(Offer).where(
-                and_(
-                    Offer.external_id == external_id,
-                    Offer.website_name == website_name
-                )
-            )
+            OFFER_BY_EXTERNAL_ID, {"website_name": website_name, "external_id": external_id}
         )
-        return result.scalar_one_or_none()
+        return result.scalars().first()
 
     @staticmethod
     async def get_unassigned(db: AsyncSession, limit: int = 100) -> List[Offer]:
-        result = await db.execute(
-            select(Offer).where(Offer.product_id.is_(None)).limit(limit)
-        )
+        result = await db.execute(OFFERS_UNASSIGNED, {"limit": limit})
         return list(result.scalars().all())
 
     @staticmethod
     async def count_by_source(db: AsyncSession) -> dict:
-        result = await db.execute(
-            select(Offer.website_name, func.count(Offer.id))
-            .group_by(Offer.website_name)
-        )
+        result = await db.execute(OFFERS_COUNT_BY_SOURCE)
         return {source: count for source, count in result.all()}
 
-class CRUDAttribute:
+class CRUDPriceHistory:
+
+    PARTITION_COLUMNS = [c.name for c in PriceHistory.__table__.columns]
 
     @staticmethod
-    async def create(
-        db: AsyncSession, product_id: int, name: str, value: str
-    ) -> Attribute:
-        attr = Attribute(
-            product_id=product_id,
-            attribute_name=name,
-            attribute_value=value
+    def partition_name(month: date) -> str:
+        return f"offer_price_history_{month:%Y%m}"
+
+    @staticmethod
+    async def ensure_partitions(db: AsyncSession, moments: Iterable[datetime]) -> None:
+        """
+        Создает месячные секции истории цен. Как и у offers, наличие
+        проверяется по каталогу, строки из DEFAULT переносятся в новую секцию.
+        """
+        months = {date(m.year, m.month, 1) for m in moments}
+        existing = await _existing_tables(db, (CRUDPriceHistory.partition_name(m) for m in months))
+        for month in sorted(months):
+            name = CRUDPriceHistory.partition_name(month)
+            if name in existing:
+                continue
+            next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+            await _create_partition(
+                db, "offer_price_history", name,
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')",
+                f"changed_at >= '{month.isoformat()}' AND changed_at < '{next_month.isoformat()}'",
+                CRUDPriceHistory.PARTITION_COLUMNS,
+            )
+
+    @staticmethod
+    async def bulk_add(db: AsyncSession, rows: List[dict]) -> None:
+        """Добавляет точки истории цен без commit - в транзакции вызывающего."""
+        if not rows:
+            return
+        await CRUDPriceHistory.ensure_partitions(db, (row["changed_at"] for row in rows))
+        await db.execute(
+            pg_insert(PriceHistory).values(rows).on_conflict_do_nothing()
         )
-        db.add(attr)
-        await db.commit()
-        await db.refresh(attr)
-        return attr
 
     @staticmethod
-    async def bulk_create(
-        db: AsyncSession, product_id: int, attributes: dict
-    ) -> None:
-        attrs = [
-            Attribute(product_id=product_id, attribute_name=k, attribute_value=str(v))
-            for k, v in attributes.items()
+    async def get_product_timeline(
+        db: AsyncSession, product_id: int, since: Optional[datetime] = None
+    ) -> List[tuple]:
+        stmt = (
+            select(PriceHistory, Offer.website_name)
+            .join(Offer, Offer.id == PriceHistory.offer_id)
+            .where(Offer.product_id == product_id)
+        )
+        if since is not None:
+            # Условие по ключу секционирования отсекает старые секции
+            stmt = stmt.where(PriceHistory.changed_at >= since)
+        result = await db.execute(stmt.order_by(PriceHistory.changed_at, PriceHistory.offer_id))
+        return list(result.all())
+
+class CRUDStats:
+    """
+    Счетчики stats_counters. Приращения считаются по пакету и пишутся
+    одним INSERT ... ON CONFLICT (value = value + delta).
+
+    Метрики (metric -> key):
+        products              total
+        products_by_district  район ("" - не указан)
+        products_by_rooms     число комнат ("" - не указано)
+        offers_by_source      сайт
+        offer_price_bucket    нижняя граница ценовой корзины (PRICE_BUCKET)
+        offers_new            дата, YYYY-MM-DD
+        offers_removed        дата, YYYY-MM-DD
+    """
+
+    PRICE_BUCKET = 1000
+    PERCENTILES = (25, 50, 75, 90)
+
+    @staticmethod
+    def price_bucket(price: int) -> str:
+        return str(price // CRUDStats.PRICE_BUCKET * CRUDStats.PRICE_BUCKET)
+
+    @staticmethod
+    def offer_deltas(
+        inserted: Iterable[Tuple[str, int]] = (),
+        repriced: Iterable[Tuple[int, int]] = (),
+        removed: Iterable[Tuple[str, int]] = (),
+        reactivated: Iterable[Tuple[str, int]] = (),
+    ) -> Counter:
+        """
+        inserted/removed - (сайт, цена) новых и удаленных (снятых с
+        публикации) объявлений, reactivated - (сайт, новая цена) снова
+        увиденных снятых, repriced - (старая цена, новая цена) изменившихся.
+        Счетчики offers_by_source и корзины цен учитывают только активные.
+        """
+        today = date.today().isoformat()
+        deltas = Counter()
+        for source, price in inserted:
+            deltas["offers_by_source", source] += 1
+            deltas["offer_price_bucket", CRUDStats.price_bucket(price)] += 1
+            deltas["offers_new", today] += 1
+        for source, price in removed:
+            deltas["offers_by_source", source] -= 1
+            deltas["offer_price_bucket", CRUDStats.price_bucket(price)] -= 1
+            deltas["offers_removed", today] += 1
+        for source, price in reactivated:
+            deltas["offers_by_source", source] += 1
+            deltas["offer_price_bucket", CRUDStats.price_bucket(price)] += 1
+        for old_price, new_price in repriced:
+            deltas["offer_price_bucket", CRUDStats.price_bucket(old_price)] -= 1
+            deltas["offer_price_bucket", CRUDStats.price_bucket(new_price)] += 1
+        return deltas
+
+    @staticmethod
+    def product_deltas(products: Iterable[Product], sign: int = 1) -> Counter:
+        deltas = Counter()
+        for product in products:
+            deltas["products", "total"] += sign
+            deltas["products_by_district", product.district or ""] += sign
+            deltas["products_by_rooms", "" if product.rooms is None else str(product.rooms)] += sign
+        return deltas
+
+    @staticmethod
+    async def add(db: AsyncSession, deltas: Dict[Tuple[str, str], int]) -> None:
+        """Применяет приращения без commit - в транзакции вызывающего."""
+        rows = [
+            {"metric": metric, "key": key, "value": value}
+            for (metric, key), value in sorted(deltas.items())
+            if value
         ]
-        db.add_all(attrs)
-        await db.commit()
+        if not rows:
+            return
+        stmt = pg_insert(StatsCounter).values(rows)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[StatsCounter.metric, StatsCounter.key],
+            set_={"value": StatsCounter.value + stmt.excluded.value, "updated_at": func.now()},
+        ))
+
+    @staticmethod
+    async def snapshot(db: AsyncSession) -> dict:
+        """Сводка для /api/stats: чтение счетчиков без агрегатов по offers."""
+        today = date.today().isoformat()
+        result = await db.execute(
+            select(StatsCounter.metric, StatsCounter.key, StatsCounter.value).where(
+                or_(
+                    StatsCounter.metric.in_([
+                        "products", "products_by_district", "products_by_rooms",
+                        "offers_by_source", "offer_price_bucket",
+                    ]),
+                    and_(StatsCounter.metric.in_(["offers_new", "offers_removed"]), StatsCounter.key == today),
+                )
+            )
+        )
+        counters: Dict[str, Dict[str, int]] = {}
+        for metric, key, value in result.all():
+            if value:
+                counters.setdefault(metric, {})[key] = value
+
+        return {
+            "total_products": counters.get("products", {}).get("total", 0),
+            "offers_by_source": counters.get("offers_by_source", {}),
+            "products_by_district": counters.get("products_by_district", {}),
+            "products_by_rooms": counters.get("products_by_rooms", {}),
+            "price_percentiles": CRUDStats.percentiles(counters.get("offer_price_bucket", {})),
+            "new_today": counters.get("offers_new", {}).get(today, 0),
+            "removed_today": counters.get("offers_removed", {}).get(today, 0),
+        }
+
+    @staticmethod
+    def percentiles(buckets: Dict[str, int]) -> Dict[str, int]:
+        """Перцентили цены по гистограмме корзин с интерполяцией внутри корзины."""
+        histogram = sorted((int(low), count) for low, count in buckets.items() if count > 0)
+        total = sum(count for _, count in histogram)
+        if not total:
+            return {}
+
+        result = {}
+        for percentile in CRUDStats.PERCENTILES:
+            target = total * percentile / 100
+            seen = 0
+            for low, count in histogram:
+                if seen + count >= target:
+                    result[f"p{percentile}"] = int(low + CRUDStats.PRICE_BUCKET * (target - seen) / count)
+                    break
+                seen += count
+        return result
+
+class CRUDAttribute:
+    """Атрибуты продукта хранятся в JSONB products.attrs."""
+
+    @staticmethod
+    async def merge(db: AsyncSession, product_id: int, attributes: dict) -> None:
+        """
+        Дополняет атрибуты продукта одним UPDATE; уже заданные у продукта
+        значения не перезаписываются. Commit - на вызывающем.
+        """
+        if not attributes:
+            return
+        await db.execute(
+            text("UPDATE products SET attrs = CAST(:attrs AS jsonb) || attrs WHERE id = :product_id"),
+            {"attrs": json.dumps(attributes, ensure_ascii=False), "product_id": product_id},
+        )
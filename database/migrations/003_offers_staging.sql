@@ -0,0 +1,32 @@
+
+
+
+
+
+
+
+CREATE UNLOGGED TABLE IF NOT EXISTS offers_staging (
+    external_id VARCHAR(100),
+    website_name VARCHAR(50),
+    title VARCHAR(500),
+    price INTEGER,
+    url VARCHAR(1000),
+    address VARCHAR(500),
+    district VARCHAR(100),
+    area FLOAT,
+    rooms INTEGER,
+    property_type VARCHAR(100),
+    description TEXT,
+    image_url VARCHAR(1000),
+    date_parsed TIMESTAMP
+);
+
+
+COMMENT ON TABLE offers_staging IS 'Промежуточная таблица для массовой загрузки объявлений через COPY (не журналируется)';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 003 завершена успешно';
+    RAISE NOTICE 'Создана таблица offers_staging';
+END $$;
@@ -0,0 +1,47 @@
+
+
+
+
+
+
+
+CREATE TABLE IF NOT EXISTS offer_price_history (
+    offer_id INTEGER NOT NULL,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    price INTEGER NOT NULL,
+    old_price INTEGER,
+    PRIMARY KEY (offer_id, changed_at)
+) PARTITION BY RANGE (changed_at);
+
+
+CREATE TABLE IF NOT EXISTS offer_price_history_default
+    PARTITION OF offer_price_history DEFAULT;
+
+
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR i IN 0..1 LOOP
+        month_start := (date_trunc('month', CURRENT_DATE) + make_interval(months => i))::date;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF offer_price_history FOR VALUES FROM (%L) TO (%L)',
+            'offer_price_history_' || to_char(month_start, 'YYYYMM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+
+COMMENT ON TABLE offer_price_history IS 'История цен объявлений (только добавление, секции по месяцам)';
+COMMENT ON COLUMN offer_price_history.price IS 'Новая цена';
+COMMENT ON COLUMN offer_price_history.old_price IS 'Предыдущая цена (NULL для первого наблюдения)';
+COMMENT ON COLUMN offer_price_history.changed_at IS 'Дата парсинга, на которой замечено изменение';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 004 завершена успешно';
+    RAISE NOTICE 'Создана секционированная таблица offer_price_history';
+END $$;
@@ -0,0 +1,124 @@
+
+
+
+
+
+
+
+
+CREATE TABLE offers_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('offers_id_seq'),
+    product_id INTEGER,
+    external_id VARCHAR(100) NOT NULL,
+    website_name VARCHAR(50) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    price INTEGER NOT NULL,
+    url VARCHAR(1000) NOT NULL,
+    address VARCHAR(500),
+    district VARCHAR(100),
+    area FLOAT,
+    rooms INTEGER,
+    property_type VARCHAR(100),
+    description TEXT,
+    image_url VARCHAR(1000),
+    date_parsed TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id, website_name, date_parsed),
+
+    CONSTRAINT fk_offers_product_part
+        FOREIGN KEY (product_id)
+        REFERENCES products(id)
+        ON DELETE CASCADE
+) PARTITION BY LIST (website_name);
+
+
+CREATE TABLE offers_default PARTITION OF offers_partitioned DEFAULT;
+
+
+
+
+DO $$
+DECLARE
+    part RECORD;
+    source_table TEXT;
+BEGIN
+    FOR part IN
+        SELECT DISTINCT
+            website_name,
+            date_trunc('month', COALESCE(date_parsed, CURRENT_TIMESTAMP))::date AS month_start
+        FROM offers
+        UNION
+        SELECT source, date_trunc('month', CURRENT_DATE)::date
+        FROM unnest(ARRAY['avito', 'farpost', 'cian']) AS source
+    LOOP
+        source_table := 'offers_' || regexp_replace(lower(part.website_name), '[^a-z0-9_]', '_', 'g');
+
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF offers_partitioned FOR VALUES IN (%L) PARTITION BY RANGE (date_parsed)',
+            source_table, part.website_name
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT',
+            source_table || '_default', source_table
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            source_table || '_' || to_char(part.month_start, 'YYYYMM'),
+            source_table,
+            part.month_start,
+            (part.month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+
+INSERT INTO offers_partitioned (
+    id, product_id, external_id, website_name, title, price, url, address, district,
+    area, rooms, property_type, description, image_url, date_parsed
+)
+SELECT
+    id, product_id, external_id, website_name, title, price, url, address, district,
+    area, rooms, property_type, description, image_url, COALESCE(date_parsed, CURRENT_TIMESTAMP)
+FROM offers;
+
+
+
+
+ALTER SEQUENCE offers_id_seq OWNED BY NONE;
+DROP TABLE offers CASCADE;
+ALTER TABLE offers_partitioned RENAME TO offers;
+ALTER TABLE offers RENAME CONSTRAINT fk_offers_product_part TO fk_offers_product;
+ALTER SEQUENCE offers_id_seq OWNED BY offers.id;
+
+
+CREATE INDEX idx_offers_product_id ON offers(product_id);
+CREATE INDEX idx_offers_external_id ON offers(external_id);
+CREATE INDEX idx_offers_website_name ON offers(website_name);
+CREATE INDEX idx_offers_price ON offers(price);
+CREATE INDEX idx_offers_date_parsed ON offers(date_parsed);
+CREATE INDEX idx_offers_url ON offers(url);
+CREATE INDEX idx_offers_district ON offers(district);
+
+
+CREATE INDEX ix_offers_website_external ON offers(website_name, external_id);
+
+
+CREATE INDEX ix_offers_product_website ON offers(product_id, website_name);
+
+
+CREATE TRIGGER update_min_price_on_offer_change
+    AFTER INSERT OR UPDATE OR DELETE ON offers
+    FOR EACH ROW
+    EXECUTE FUNCTION update_product_min_price();
+
+
+COMMENT ON TABLE offers IS 'Все объявления с различных сайтов (секции: сайт -> месяц date_parsed)';
+COMMENT ON COLUMN offers.url IS 'URL объявления (уникальность обеспечивает загрузка под advisory-блокировкой источника)';
+COMMENT ON COLUMN offers.date_parsed IS 'Дата и время последнего парсинга объявления (ключ секционирования)';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 005 завершена успешно';
+    RAISE NOTICE 'Таблица offers секционирована по website_name и месяцу date_parsed';
+END $$;
@@ -0,0 +1,24 @@
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('russian', coalesce(canonical_title, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce(canonical_address, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce(description, '')), 'C')
+) STORED;
+
+
+CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS ix_products_address_trgm ON products USING GIN (canonical_address gin_trgm_ops);
+
+
+COMMENT ON COLUMN products.search_vector IS 'Полнотекстовый индекс: заголовок (A), адрес (B), описание (C)';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 006 завершена успешно';
+    RAISE NOTICE 'Добавлен полнотекстовый и триграммный поиск по products';
+END $$;
@@ -0,0 +1,9 @@
+CREATE INDEX IF NOT EXISTS ix_products_price_id ON products(min_price, id);
+CREATE INDEX IF NOT EXISTS ix_products_created_id ON products(created_at, id);
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 007 завершена успешно';
+    RAISE NOTICE 'Добавлены индексы для keyset-пагинации products';
+END $$;
@@ -0,0 +1,33 @@
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS offers_count INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN IF NOT EXISTS sources VARCHAR(50)[] NOT NULL DEFAULT '{}',
+ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP;
+
+
+UPDATE products p SET
+    offers_count = s.offers_count,
+    sources = s.sources,
+    last_seen = s.last_seen
+FROM (
+    SELECT
+        product_id,
+        count(*) AS offers_count,
+        array_agg(DISTINCT website_name ORDER BY website_name) AS sources,
+        max(date_parsed) AS last_seen
+    FROM offers
+    WHERE product_id IS NOT NULL
+    GROUP BY product_id
+) s
+WHERE p.id = s.product_id;
+
+
+COMMENT ON COLUMN products.offers_count IS 'Число объявлений продукта';
+COMMENT ON COLUMN products.sources IS 'Сайты, на которых есть объявления продукта';
+COMMENT ON COLUMN products.last_seen IS 'Последний парсинг любого объявления продукта';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 008 завершена успешно';
+    RAISE NOTICE 'Добавлена сводка offers_count, sources, last_seen в products';
+END $$;
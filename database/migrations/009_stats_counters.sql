@@ -0,0 +1,30 @@
+CREATE TABLE IF NOT EXISTS stats_counters (
+    metric VARCHAR(50) NOT NULL,
+    key VARCHAR(100) NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (metric, key)
+);
+
+
+INSERT INTO stats_counters (metric, key, value)
+SELECT 'products', 'total', count(*) FROM products
+UNION ALL
+SELECT 'products_by_district', coalesce(district, ''), count(*) FROM products GROUP BY coalesce(district, '')
+UNION ALL
+SELECT 'products_by_rooms', coalesce(rooms::text, ''), count(*) FROM products GROUP BY coalesce(rooms::text, '')
+UNION ALL
+SELECT 'offers_by_source', website_name, count(*) FROM offers GROUP BY website_name
+UNION ALL
+SELECT 'offer_price_bucket', (price / 1000 * 1000)::text, count(*) FROM offers GROUP BY price / 1000
+ON CONFLICT (metric, key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP;
+
+
+COMMENT ON TABLE stats_counters IS 'Счетчики статистики, обновляются приращениями из загрузки и дедупликации';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 009 завершена успешно';
+    RAISE NOTICE 'Создана таблица stats_counters';
+END $$;
@@ -0,0 +1,101 @@
+DROP TRIGGER IF EXISTS update_min_price_on_offer_change ON offers;
+DROP FUNCTION IF EXISTS update_product_min_price();
+
+
+
+
+CREATE OR REPLACE FUNCTION refresh_product_summary(product_ids INTEGER[])
+RETURNS void AS $$
+BEGIN
+    IF product_ids IS NULL OR cardinality(product_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+
+    PERFORM 1 FROM products WHERE id = ANY(product_ids) ORDER BY id FOR UPDATE;
+
+    UPDATE products p SET
+        min_price = s.min_price,
+        offers_count = s.offers_count,
+        sources = s.sources,
+        last_seen = s.last_seen
+    FROM unnest(product_ids) AS t(id)
+    CROSS JOIN LATERAL (
+        SELECT
+            min(o.price) AS min_price,
+            count(*)::integer AS offers_count,
+            coalesce(array_agg(DISTINCT o.website_name ORDER BY o.website_name), '{}') AS sources,
+            max(o.date_parsed) AS last_seen
+        FROM offers o
+        WHERE o.product_id = t.id
+    ) s
+    WHERE p.id = t.id
+      AND (p.min_price, p.offers_count, p.sources, p.last_seen)
+          IS DISTINCT FROM (s.min_price, s.offers_count, s.sources, s.last_seen);
+END;
+$$ LANGUAGE plpgsql;
+
+
+
+
+CREATE OR REPLACE FUNCTION offers_summary_after_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_product_summary(ARRAY(
+        SELECT DISTINCT product_id FROM new_offers WHERE product_id IS NOT NULL
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION offers_summary_after_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_product_summary(ARRAY(
+        SELECT product_id FROM new_offers WHERE product_id IS NOT NULL
+        UNION
+        SELECT product_id FROM old_offers WHERE product_id IS NOT NULL
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION offers_summary_after_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_product_summary(ARRAY(
+        SELECT DISTINCT product_id FROM old_offers WHERE product_id IS NOT NULL
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE TRIGGER offers_summary_insert
+    AFTER INSERT ON offers
+    REFERENCING NEW TABLE AS new_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_insert();
+
+CREATE TRIGGER offers_summary_update
+    AFTER UPDATE ON offers
+    REFERENCING OLD TABLE AS old_offers NEW TABLE AS new_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_update();
+
+CREATE TRIGGER offers_summary_delete
+    AFTER DELETE ON offers
+    REFERENCING OLD TABLE AS old_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_delete();
+
+
+COMMENT ON FUNCTION refresh_product_summary(INTEGER[]) IS
+    'Пересчет min_price, offers_count, sources, last_seen - один агрегат на продукт';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 010 завершена успешно';
+    RAISE NOTICE 'Построчный триггер min_price заменен триггерами уровня оператора';
+END $$;
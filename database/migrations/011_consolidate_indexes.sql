@@ -0,0 +1,39 @@
+DROP INDEX IF EXISTS idx_products_canonical_title;
+DROP INDEX IF EXISTS idx_products_canonical_address;
+DROP INDEX IF EXISTS ix_products_search;
+DROP INDEX IF EXISTS idx_products_district;
+DROP INDEX IF EXISTS idx_products_area;
+DROP INDEX IF EXISTS idx_products_property_type;
+DROP INDEX IF EXISTS idx_products_rooms;
+DROP INDEX IF EXISTS idx_products_min_price;
+DROP INDEX IF EXISTS ix_products_price_area;
+DROP INDEX IF EXISTS idx_products_created_at;
+DROP INDEX IF EXISTS ix_products_id;
+
+
+CREATE INDEX IF NOT EXISTS ix_products_rooms_price ON products(rooms, min_price, id);
+
+
+
+
+DROP INDEX IF EXISTS idx_offers_product_id;
+DROP INDEX IF EXISTS idx_offers_external_id;
+DROP INDEX IF EXISTS idx_offers_website_name;
+DROP INDEX IF EXISTS idx_offers_price;
+DROP INDEX IF EXISTS idx_offers_date_parsed;
+DROP INDEX IF EXISTS idx_offers_district;
+DROP INDEX IF EXISTS ix_offers_id;
+
+
+
+
+DROP INDEX IF EXISTS idx_attributes_product_id;
+DROP INDEX IF EXISTS idx_attributes_name;
+DROP INDEX IF EXISTS ix_attributes_id;
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 011 завершена успешно';
+    RAISE NOTICE 'Удалены дублирующие и неиспользуемые индексы products, offers, attributes';
+END $$;
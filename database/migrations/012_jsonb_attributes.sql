@@ -0,0 +1,27 @@
+ALTER TABLE offers ADD COLUMN IF NOT EXISTS attrs JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE products ADD COLUMN IF NOT EXISTS attrs JSONB NOT NULL DEFAULT '{}';
+ALTER TABLE offers_staging ADD COLUMN IF NOT EXISTS attrs JSONB;
+
+
+
+
+UPDATE products p SET attrs = a.attrs
+FROM (
+    SELECT product_id, jsonb_object_agg(attribute_name, attribute_value) AS attrs
+    FROM attributes
+    GROUP BY product_id
+) a
+WHERE a.product_id = p.id;
+
+
+CREATE INDEX IF NOT EXISTS ix_products_attrs ON products USING GIN (attrs jsonb_path_ops);
+
+
+DROP TABLE IF EXISTS attributes;
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 012 завершена успешно';
+    RAISE NOTICE 'Атрибуты перенесены в products.attrs (JSONB), таблица attributes удалена';
+END $$;
@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS spool_segments (
+    name VARCHAR(100) PRIMARY KEY,
+    records INTEGER NOT NULL DEFAULT 0,
+    inserted INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+COMMENT ON TABLE spool_segments IS 'Загруженные сегменты дискового спула (utils/spool.py): сегмент загружается ровно один раз';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 013 завершена успешно';
+    RAISE NOTICE 'Создана таблица spool_segments';
+END $$;
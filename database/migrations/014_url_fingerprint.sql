@@ -0,0 +1,27 @@
+ALTER TABLE offers ADD COLUMN IF NOT EXISTS url_fp BIGINT
+    GENERATED ALWAYS AS (('x' || substr(md5(url), 1, 16))::bit(64)::bigint) STORED;
+
+
+CREATE INDEX IF NOT EXISTS ix_offers_url_fp ON offers(url_fp);
+
+
+DROP INDEX IF EXISTS idx_offers_url;
+DROP INDEX IF EXISTS ix_offers_url;
+
+
+COMMENT ON COLUMN offers.url_fp IS 'Первые 64 бита md5(url); поиск по url_fp с проверкой url';
+
+
+DO $$
+DECLARE
+    duplicate_keys BIGINT;
+BEGIN
+    SELECT count(*) INTO duplicate_keys
+    FROM (
+        SELECT 1 FROM offers GROUP BY website_name, external_id HAVING count(*) > 1
+    ) d;
+
+    RAISE NOTICE 'Миграция 014 завершена успешно';
+    RAISE NOTICE 'Добавлен offers.url_fp, индекс по url заменен на url_fp';
+    RAISE NOTICE 'Ключей (website_name, external_id) с несколькими объявлениями: %', duplicate_keys;
+END $$;
@@ -0,0 +1,75 @@
+ALTER TABLE offers ADD COLUMN IF NOT EXISTS first_seen TIMESTAMP;
+ALTER TABLE offers ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP;
+ALTER TABLE offers ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT true;
+
+
+
+
+ALTER TABLE offers DISABLE TRIGGER offers_summary_update;
+
+UPDATE offers o SET
+    last_seen = o.date_parsed,
+    first_seen = coalesce(
+        (SELECT min(h.changed_at) FROM offer_price_history h WHERE h.offer_id = o.id),
+        o.date_parsed
+    )
+WHERE o.last_seen IS NULL;
+
+ALTER TABLE offers ENABLE TRIGGER offers_summary_update;
+
+ALTER TABLE offers ALTER COLUMN first_seen SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE offers ALTER COLUMN last_seen SET DEFAULT CURRENT_TIMESTAMP;
+
+
+
+
+CREATE OR REPLACE FUNCTION refresh_product_summary(product_ids INTEGER[])
+RETURNS void AS $$
+BEGIN
+    IF product_ids IS NULL OR cardinality(product_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+
+    PERFORM 1 FROM products WHERE id = ANY(product_ids) ORDER BY id FOR UPDATE;
+
+    UPDATE products p SET
+        min_price = s.min_price,
+        offers_count = s.offers_count,
+        sources = s.sources,
+        last_seen = s.last_seen
+    FROM unnest(product_ids) AS t(id)
+    CROSS JOIN LATERAL (
+        SELECT
+            coalesce(min(o.price) FILTER (WHERE o.is_active), min(o.price)) AS min_price,
+            (count(*) FILTER (WHERE o.is_active))::integer AS offers_count,
+            coalesce(
+                array_agg(DISTINCT o.website_name ORDER BY o.website_name) FILTER (WHERE o.is_active),
+                '{}'
+            ) AS sources,
+            max(o.last_seen) AS last_seen
+        FROM offers o
+        WHERE o.product_id = t.id
+    ) s
+    WHERE p.id = t.id
+      AND (p.min_price, p.offers_count, p.sources, p.last_seen)
+          IS DISTINCT FROM (s.min_price, s.offers_count, s.sources, s.last_seen);
+END;
+$$ LANGUAGE plpgsql;
+
+
+COMMENT ON FUNCTION refresh_product_summary(INTEGER[]) IS
+    'Пересчет сводки продукта по активным объявлениям: min_price, offers_count, sources, last_seen';
+
+
+
+
+CREATE INDEX IF NOT EXISTS ix_offers_active_last_seen ON offers(website_name, last_seen) WHERE is_active;
+CREATE INDEX IF NOT EXISTS ix_products_active_price ON products(min_price, id) WHERE offers_count > 0;
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 015 завершена успешно';
+    RAISE NOTICE 'Добавлены offers.first_seen, last_seen, is_active; сводка продукта - по активным объявлениям';
+END $$;
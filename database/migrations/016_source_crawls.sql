@@ -0,0 +1,15 @@
+CREATE TABLE IF NOT EXISTS source_crawls (
+    source VARCHAR(50) PRIMARY KEY,
+    started_at TIMESTAMP NOT NULL,
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+
+COMMENT ON TABLE source_crawls IS 'Последний полный обход источника: граница снятия пропавших объявлений';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 016 завершена успешно';
+    RAISE NOTICE 'Создана таблица source_crawls';
+END $$;
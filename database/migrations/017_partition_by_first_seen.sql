@@ -0,0 +1,146 @@
+UPDATE offers SET first_seen = coalesce(first_seen, date_parsed) WHERE first_seen IS NULL;
+
+
+
+
+DO $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_partition_tree('offers') t
+        JOIN pg_class c ON c.oid = t.relid
+        WHERE t.level > 0
+    LOOP
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', part.relname, part.relname || '_old');
+    END LOOP;
+END $$;
+
+ALTER TABLE offers RENAME TO offers_old;
+
+
+CREATE TABLE offers (
+    id INTEGER NOT NULL DEFAULT nextval('offers_id_seq'),
+    product_id INTEGER,
+    external_id VARCHAR(100) NOT NULL,
+    website_name VARCHAR(50) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    price INTEGER NOT NULL,
+    url VARCHAR(1000) NOT NULL,
+    url_fp BIGINT GENERATED ALWAYS AS (('x' || substr(md5(url), 1, 16))::bit(64)::bigint) STORED,
+    address VARCHAR(500),
+    district VARCHAR(100),
+    area FLOAT,
+    rooms INTEGER,
+    property_type VARCHAR(100),
+    description TEXT,
+    image_url VARCHAR(1000),
+    attrs JSONB NOT NULL DEFAULT '{}',
+    date_parsed TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    first_seen TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_active BOOLEAN NOT NULL DEFAULT true,
+
+    CONSTRAINT offers_first_seen_pkey PRIMARY KEY (id, website_name, first_seen),
+
+    CONSTRAINT fk_offers_product_first_seen
+        FOREIGN KEY (product_id)
+        REFERENCES products(id)
+        ON DELETE CASCADE
+) PARTITION BY LIST (website_name);
+
+
+CREATE TABLE offers_default PARTITION OF offers DEFAULT;
+
+
+
+
+DO $$
+DECLARE
+    part RECORD;
+    source_table TEXT;
+BEGIN
+    FOR part IN
+        SELECT DISTINCT website_name, date_trunc('month', first_seen)::date AS month_start
+        FROM offers_old
+    LOOP
+        source_table := 'offers_' || regexp_replace(lower(part.website_name), '[^a-z0-9_]', '_', 'g');
+
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF offers FOR VALUES IN (%L) PARTITION BY RANGE (first_seen)',
+            source_table, part.website_name
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT',
+            source_table || '_default', source_table
+        );
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            source_table || '_' || to_char(part.month_start, 'YYYYMM'),
+            source_table,
+            part.month_start,
+            (part.month_start + INTERVAL '1 month')::date
+        );
+    END LOOP;
+END $$;
+
+
+INSERT INTO offers (
+    id, product_id, external_id, website_name, title, price, url, address, district,
+    area, rooms, property_type, description, image_url, attrs, date_parsed,
+    first_seen, last_seen, is_active
+)
+SELECT
+    id, product_id, external_id, website_name, title, price, url, address, district,
+    area, rooms, property_type, description, image_url, attrs, date_parsed,
+    first_seen, last_seen, is_active
+FROM offers_old;
+
+
+
+
+ALTER SEQUENCE offers_id_seq OWNED BY NONE;
+DROP TABLE offers_old CASCADE;
+ALTER TABLE offers RENAME CONSTRAINT fk_offers_product_first_seen TO fk_offers_product;
+ALTER SEQUENCE offers_id_seq OWNED BY offers.id;
+
+
+CREATE INDEX ix_offers_url_fp ON offers(url_fp);
+CREATE INDEX ix_offers_website_external ON offers(website_name, external_id);
+CREATE INDEX ix_offers_product_website ON offers(product_id, website_name);
+CREATE INDEX ix_offers_active_last_seen ON offers(website_name, last_seen) WHERE is_active;
+CREATE INDEX ix_offers_date_parsed ON offers(date_parsed);
+
+
+CREATE TRIGGER offers_summary_insert
+    AFTER INSERT ON offers
+    REFERENCING NEW TABLE AS new_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_insert();
+
+CREATE TRIGGER offers_summary_update
+    AFTER UPDATE ON offers
+    REFERENCING OLD TABLE AS old_offers NEW TABLE AS new_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_update();
+
+CREATE TRIGGER offers_summary_delete
+    AFTER DELETE ON offers
+    REFERENCING OLD TABLE AS old_offers
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION offers_summary_after_delete();
+
+
+COMMENT ON TABLE offers IS 'Все объявления с различных сайтов (секции: сайт -> месяц first_seen)';
+COMMENT ON COLUMN offers.url IS 'URL объявления (уникальность обеспечивает загрузка под advisory-блокировкой источника)';
+COMMENT ON COLUMN offers.url_fp IS 'Первые 64 бита md5(url); поиск по url_fp с проверкой url';
+COMMENT ON COLUMN offers.date_parsed IS 'Дата и время последнего парсинга объявления';
+COMMENT ON COLUMN offers.first_seen IS 'Первое появление объявления (ключ секционирования, не меняется)';
+
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Миграция 017 завершена успешно';
+    RAISE NOTICE 'Таблица offers пересекционирована по website_name и месяцу first_seen';
+END $$;
@@ -1,69 +1,171 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, Float, DateTime, ForeignKey, Text, Index, DDL, Computed, event
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
+# Отпечаток URL: первые 64 бита md5 как знаковый bigint. Та же функция в
+# Python - CRUDOffer.url_fingerprint
+URL_FP_SQL = "('x' || substr(md5(url), 1, 16))::bit(64)::bigint"
+
 class Product(Base):
     __tablename__ = "products"
 
-    id = Column(Integer, primary_key=True, index=True)
-    canonical_title = Column(String(500), nullable=False, index=True)
-    canonical_address = Column(String(500), index=True)
-    district = Column(String(100), index=True)
+    id = Column(Integer, primary_key=True)
+    canonical_title = Column(String(500), nullable=False)
+    canonical_address = Column(String(500))
+    district = Column(String(100))
     description = Column(Text)
-    rooms = Column(Integer, index=True)
-    area = Column(Float, index=True)
-    property_type = Column(String(100), index=True)
+    rooms = Column(Integer)
+    area = Column(Float)
+    property_type = Column(String(100))
     image_url = Column(String(1000))
-    min_price = Column(Integer, index=True)
+    min_price = Column(Integer)
+    # Сводка по объявлениям продукта - пересчитывают триггеры offers уровня
+    # оператора (миграция 010), списки не читают offers
+    offers_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sources = Column(ARRAY(String(50)), nullable=False, default=list, server_default="{}")
+    last_seen = Column(DateTime)
+    # Атрибуты (этаж, мебель, животные...) - см. utils/attributes.py
+    attrs = Column(JSONB, nullable=False, default=dict, server_default="{}")
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('russian', coalesce(canonical_title, '')), 'A') || "
+        "setweight(to_tsvector('russian', coalesce(canonical_address, '')), 'B') || "
+        "setweight(to_tsvector('russian', coalesce(description, '')), 'C')",
+        persisted=True,
+    ), deferred=True)
 
     offers = relationship("Offer", back_populates="product", cascade="all, delete-orphan")
-    attributes = relationship("Attribute", back_populates="product", cascade="all, delete-orphan")
 
     __table_args__ = (
-        Index('ix_products_search', 'canonical_title', 'canonical_address'),
-        Index('ix_products_price_area', 'min_price', 'area'),
+        Index('ix_products_price_id', 'min_price', 'id'),
+        # Поиск по умолчанию - только продукты с активными объявлениями
+        Index('ix_products_active_price', 'min_price', 'id', postgresql_where=offers_count > 0),
+        Index('ix_products_rooms_price', 'rooms', 'min_price', 'id'),
+        Index('ix_products_created_id', 'created_at', 'id'),
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        Index(
+            'ix_products_address_trgm', 'canonical_address',
+            postgresql_using='gin', postgresql_ops={'canonical_address': 'gin_trgm_ops'},
+        ),
+        Index('ix_products_attrs', 'attrs', postgresql_using='gin', postgresql_ops={'attrs': 'jsonb_path_ops'}),
     )
 
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
+
 class Offer(Base):
+    """
+    Объявление. Секции: website_name (LIST) -> месяц first_seen (RANGE).
+    Ключ секционирования не меняется: повторный обход обновляет
+    date_parsed/last_seen на месте, строка не переезжает между секциями.
+    Глобальный UNIQUE(url_fp) или UNIQUE(website_name, external_id) на
+    секционированной таблице невозможен (ключ уникальности должен
+    включать first_seen) - уникальность держит загрузка под
+    advisory-блокировкой источника (CRUDOffer.bulk_upsert, BulkLoader).
+    Ключ слияния - url: поиск по url_fp с проверкой url, секцию выбирает
+    website_name. (website_name, external_id) только проиндексирован и
+    ключом слияния не является - дубли по нему возможны.
+    last_seen обновляется при каждом обходе; не виденные дольше окна
+    обхода источника снимаются с публикации (is_active = false,
+    CRUDOffer.deactivate_stale) и не входят в сводку продукта.
+    """
     __tablename__ = "offers"
 
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True, index=True)
-    external_id = Column(String(100), nullable=False, index=True)
-    website_name = Column(String(50), nullable=False, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=True)
+    external_id = Column(String(100), nullable=False)
+    website_name = Column(String(50), primary_key=True)
     title = Column(String(500), nullable=False)
-    price = Column(Integer, nullable=False, index=True)
-    url = Column(String(1000), nullable=False, unique=True)
+    price = Column(Integer, nullable=False)
+    url = Column(String(1000), nullable=False)
+    url_fp = Column(BigInteger, Computed(URL_FP_SQL, persisted=True))
     address = Column(String(500))
-    district = Column(String(100), index=True)
+    district = Column(String(100))
     area = Column(Float)
     rooms = Column(Integer)
     property_type = Column(String(100))
     description = Column(Text)
     image_url = Column(String(1000))
-    date_parsed = Column(DateTime, default=datetime.now, index=True)
+    attrs = Column(JSONB, nullable=False, default=dict, server_default="{}")
+    date_parsed = Column(DateTime, nullable=False, default=datetime.now)
+    first_seen = Column(DateTime, primary_key=True, default=datetime.now)
+    last_seen = Column(DateTime, default=datetime.now)
+    is_active = Column(Boolean, nullable=False, default=True, server_default="true")
 
     product = relationship("Product", back_populates="offers")
 
     __table_args__ = (
+        Index('ix_offers_url_fp', 'url_fp'),
         Index('ix_offers_website_external', 'website_name', 'external_id'),
         Index('ix_offers_product_website', 'product_id', 'website_name'),
+        Index('ix_offers_active_last_seen', 'website_name', 'last_seen', postgresql_where=is_active),
+        # Дневные выгрузки analytics/export.py
+        Index('ix_offers_date_parsed', 'date_parsed'),
+        {"postgresql_partition_by": "LIST (website_name)"},
     )
 
-class Attribute(Base):
-    __tablename__ = "attributes"
+event.listen(
+    Offer.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS offers_default PARTITION OF offers DEFAULT"),
+)
 
-    id = Column(Integer, primary_key=True, index=True)
-    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
-    attribute_name = Column(String(200), nullable=False, index=True)
-    attribute_value = Column(String(500), nullable=False)
+class PriceHistory(Base):
+    """Изменения цены объявления. Только добавление, секции по месяцам changed_at."""
+    __tablename__ = "offer_price_history"
 
-    product = relationship("Product", back_populates="attributes")
+    offer_id = Column(Integer, primary_key=True)
+    changed_at = Column(DateTime, primary_key=True, default=datetime.now)
+    price = Column(Integer, nullable=False)
+    old_price = Column(Integer)
 
     __table_args__ = (
-        Index('ix_attributes_product_name', 'product_id', 'attribute_name'),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
     )
+
+event.listen(
+    PriceHistory.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS offer_price_history_default PARTITION OF offer_price_history DEFAULT"),
+)
+
+class StatsCounter(Base):
+    """
+    Счетчики статистики (metric, key) -> value. Обновляются приращениями
+    из пакетов загрузки и дедупликации, /api/stats читает их без агрегатов.
+    """
+    __tablename__ = "stats_counters"
+
+    metric = Column(String(50), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class SpoolSegment(Base):
+    """Сегмент дискового спула, загруженный в offers (см. utils/spool.py)."""
+    __tablename__ = "spool_segments"
+
+    name = Column(String(100), primary_key=True)
+    records = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    changed = Column(Integer, nullable=False, default=0)
+    loaded_at = Column(DateTime, default=datetime.now)
+
+class SourceCrawl(Base):
+    """
+    Последний полный обход источника: все единицы дошли до конца выдачи
+    без ошибок. Объявления, не виденные с started_at, пропали с сайта
+    (CRUDOffer.deactivate_stale).
+    """
+    __tablename__ = "source_crawls"
+
+    source = Column(String(50), primary_key=True)
+    started_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=False, default=datetime.now)
@@ -0,0 +1,165 @@
+"""
+Загрузка закрытых сегментов дискового спула (utils/spool.py) в offers
+через BulkLoader.
+
+Ровно один раз: имя сегмента записывается в spool_segments в той же
+транзакции, что и слияние объявлений. Если процесс упал после commit,
+но до удаления файла, сегмент при следующем проходе пропускается;
+параллельный загрузчик того же сегмента ждет на PRIMARY KEY и
+откатывается.
+
+Сегменты грузятся по одному. Пока БД недоступна, загрузчик ждет с
+экспоненциальной задержкой до max_backoff, а сегменты копятся на диске -
+краулер от этого не замедляется. Сегмент, который падает по другой
+причине (битый JSON, нарушение ограничения), не блокирует следующие:
+после max_attempts попыток он переносится в карантин <имя>.ndjson.bad.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+from database.bulk_loader import BulkLoader, aiter_listings
+from database.database import AsyncSessionLocal
+from utils.spool import SpoolReader, segment_name
+from utils.storage import iter_ndjson
+
+SEGMENT_LOADED_SQL = text("SELECT 1 FROM spool_segments WHERE name = :name")
+
+CLAIM_SEGMENT_SQL = text("""
+INSERT INTO spool_segments (name, records, inserted, changed, loaded_at)
+VALUES (:name, :records, :inserted, :changed, now())
+ON CONFLICT (name) DO NOTHING
+RETURNING name
+""")
+
+
+BAD_SUFFIX = ".bad"
+
+
+class SegmentAlreadyLoaded(Exception):
+    pass
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Ошибка связи с БД (повторить позже), а не данных сегмента."""
+    if isinstance(error, (OSError, asyncio.TimeoutError, OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class SpoolDrainer:
+
+    def __init__(
+        self, spool: SpoolReader, poll_seconds: float = 2.0, max_backoff: float = 60.0, max_attempts: int = 3
+    ):
+        self.spool = spool
+        self.poll_seconds = poll_seconds
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.stats = {
+            "segments": 0, "records": 0, "inserted": 0, "changed": 0, "skipped": 0, "errors": 0, "quarantined": 0,
+        }
+        # Неудачные попытки сегментов из-за данных, имя -> число
+        self._attempts: Dict[str, int] = {}
+
+    def quarantine(self, path: Path, error: Exception) -> None:
+        bad = path.with_name(path.name + BAD_SUFFIX)
+        os.replace(path, bad)
+        self._attempts.pop(path.name, None)
+        self.stats["quarantined"] += 1
+        print(f"[Спул] Сегмент {path.name} перенесен в карантин {bad.name}: {str(error)[:100]}")
+
+    async def load_segment(self, path: Path) -> Optional[dict]:
+        """Загружает сегмент и удаляет файл. None - сегмент уже был загружен."""
+        name = segment_name(path)
+        async with AsyncSessionLocal() as db:
+            if (await db.execute(SEGMENT_LOADED_SQL, {"name": name})).scalar_one_or_none():
+                await db.rollback()
+                path.unlink()
+                self.stats["skipped"] += 1
+                return None
+
+            async def claim(stats: dict) -> None:
+                claimed = (await db.execute(CLAIM_SEGMENT_SQL, {
+                    "name": name,
+                    "records": stats["staged"],
+                    "inserted": stats["inserted"],
+                    "changed": stats["changed"],
+                })).scalar_one_or_none()
+                if claimed is None:
+                    raise SegmentAlreadyLoaded(name)
+
+            try:
+                stats = await BulkLoader(db).load(aiter_listings(iter_ndjson(str(path))), before_commit=claim)
+            except SegmentAlreadyLoaded:
+                await db.rollback()
+                path.unlink()
+                self.stats["skipped"] += 1
+                return None
+            except Exception:
+                await db.rollback()
+                raise
+
+        path.unlink()
+        self.stats["segments"] += 1
+        self.stats["records"] += stats["staged"]
+        self.stats["inserted"] += stats["inserted"]
+        self.stats["changed"] += stats["changed"]
+        print(f"[Спул] {name}: {stats['staged']} строк, новых {stats['inserted']}, изменилось {stats['changed']}")
+        return stats
+
+    async def run(self, stop: Optional[asyncio.Event] = None, max_failures: Optional[int] = None) -> dict:
+        """
+        Грузит закрытые сегменты, пока они есть. Со stop - ждет новые
+        сегменты до установки события и затем догружает оставшиеся.
+        max_failures - сколько ошибок связи с БД подряд терпеть; после
+        этого сегменты остаются на диске до следующего запуска. Ошибки
+        данных не останавливают проход: сегмент повторяется в следующих
+        проходах и после max_attempts уходит в карантин.
+        """
+        backoff = 1.0
+        failures = 0
+        while True:
+            segments = self.spool.sealed_segments()
+            retry = False
+            for path in segments:
+                try:
+                    await self.load_segment(path)
+                    self._attempts.pop(path.name, None)
+                    backoff = 1.0
+                    failures = 0
+                except FileNotFoundError:
+                    # Сегмент уже забрал другой загрузчик
+                    continue
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    if not is_connection_error(e):
+                        attempts = self._attempts[path.name] = self._attempts.get(path.name, 0) + 1
+                        if attempts >= self.max_attempts:
+                            self.quarantine(path, e)
+                        else:
+                            print(f"[Спул] Ошибка данных в {path.name} (попытка {attempts}/{self.max_attempts}): {str(e)[:100]}")
+                            retry = True
+                        continue
+                    failures += 1
+                    if max_failures is not None and failures >= max_failures:
+                        print(f"[Спул] БД недоступна, в спуле осталось сегментов: {len(self.spool.sealed_segments())}")
+                        return self.stats
+                    print(f"[Спул] Ошибка загрузки {path.name}: {str(e)[:100]}, повтор через {backoff:.0f} с")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.max_backoff)
+                    retry = True
+                    break
+            if retry:
+                continue
+            if stop is None or (stop.is_set() and not self.spool.sealed_segments()):
+                return self.stats
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
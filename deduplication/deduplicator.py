@@ -1,9 +1,9 @@
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from rapidfuzz import fuzz
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Offer, Product
-from database.crud import CRUDProduct, CRUDOffer, CRUDAttribute
+from database.crud import CRUDProduct, CRUDOffer, CRUDAttribute, CRUDStats
 
 
 class Deduplicator:
@@ -80,8 +80,12 @@ class Deduplicator:
         return similarity >= self.title_threshold
 
     async def find_matching_product(
-        self, db: AsyncSession, offer: Offer
+        self, db: AsyncSession, offer: Offer, pending: Optional[Dict[int, List[Offer]]] = None
     ) -> Optional[Product]:
+        """
+        pending - объявления текущей пачки, уже распределенные по продуктам,
+        но еще не привязанные в БД (product_id -> объявления).
+        """
         
         search_queries = []
         
@@ -117,24 +121,27 @@ class Deduplicator:
                 rooms=offer.rooms,
                 min_area=offer.area * 0.85 if offer.area > 0 else None,  # Расширили диапазон до ±15%
                 max_area=offer.area * 1.15 if offer.area > 0 else None,
-                limit=100  
+                active_only=False,
+                limit=100,
+                load_offers=True
             )
 
             for product in products:
-                if not product.offers:
+                product_offers = list(product.offers) + (pending or {}).get(product.id, [])
+                if not product_offers:
                     continue
 
                 
                 has_same_website = any(
                     existing_offer.website_name == offer.website_name 
-                    for existing_offer in product.offers
+                    for existing_offer in product_offers
                 )
                 if has_same_website:
                     continue
 
                 
                 max_product_similarity = 0.0
-                for existing_offer in product.offers:
+                for existing_offer in product_offers:
                     similarity = self.calculate_similarity(offer, existing_offer)
                     if similarity > max_product_similarity:
                         max_product_similarity = similarity
@@ -153,6 +160,10 @@ class Deduplicator:
     async def create_product_from_offer(
         self, db: AsyncSession, offer: Offer
     ) -> Product:
+        """
+        Продукт по объявлению, без commit; привязку делает вызывающий.
+        Счетчики stats_counters - в той же транзакции, что и вставка.
+        """
         product = await CRUDProduct.create(
             db,
             title=offer.title,
@@ -163,26 +174,21 @@ class Deduplicator:
             area=offer.area,
             property_type=offer.property_type,
             image_url=offer.image_url,
-            min_price=offer.price
+            min_price=offer.price,
+            offers_count=1,
+            sources=[offer.website_name],
+            last_seen=offer.date_parsed,
+            attrs=dict(offer.attrs or {}),
+            commit=False
         )
-
-        offer.product_id = product.id
-        await db.commit()
-
+        await CRUDStats.add(db, CRUDStats.product_deltas([product]))
         return product
 
     async def assign_offer_to_product(
         self, db: AsyncSession, offer: Offer, product: Product
     ) -> None:
-        
-        offer.product_id = product.id
-        await db.flush()  
-        
-        
-        await CRUDProduct.update_min_price(db, product.id)
-        
-        
-        await db.commit()
+        """Дополняет атрибуты продукта, без commit; привязку делает вызывающий."""
+        await CRUDAttribute.merge(db, product.id, offer.attrs)
 
     async def deduplicate_offer(self, db: AsyncSession, offer: Offer) -> Product:
         product = await self.find_matching_product(db, offer)
@@ -192,6 +198,9 @@ class Deduplicator:
         else:
             product = await self.create_product_from_offer(db, offer)
 
+        # min_price и сводку продукта пересчитывает триггер offers
+        await CRUDOffer.assign_products(db, [(offer, product.id)])
+        await db.commit()
         return product
 
     async def deduplicate_all(self, db: AsyncSession, batch_size: int = 100) -> dict:
@@ -211,28 +220,40 @@ class Deduplicator:
 
             batch_num += 1
             print(f"[Дедупликация] Обработка пачки {batch_num} ({len(offers)} объявлений)...")
+            # Привязки пачки применяются одним UPDATE и одним commit:
+            # триггер сводки пересчитывает продукты один раз на пачку
+            assignments: List[Tuple[Offer, int]] = []
+            pending: Dict[int, List[Offer]] = {}
 
             for i, offer in enumerate(offers, 1):
                 try:
-                    product = await self.find_matching_product(db, offer)
-                    
-                    if product:
-                        await self.assign_offer_to_product(db, offer, product)
-                        stats["merged"] += 1
-                        
+                    # Точка сохранения: ошибка откатывает только это объявление
+                    async with db.begin_nested():
+                        product = await self.find_matching_product(db, offer, pending)
+                        created = product is None
                         
-                        if stats["merged"] <= 5:
-                            print(f"[Дедупликация] ✓ Объединено: {offer.website_name} -> продукт #{product.id}")
-                            print(f"  Заголовок: {offer.title[:60]}...")
-                            print(f"  Адрес: {offer.address[:60] if offer.address else '(нет)'}...")
-                    else:
-                        product = await self.create_product_from_offer(db, offer)
+                        if product:
+                            await self.assign_offer_to_product(db, offer, product)
+                        else:
+                            product = await self.create_product_from_offer(db, offer)
+
+                    assignments.append((offer, product.id))
+                    pending.setdefault(product.id, []).append(offer)
+                    if created:
                         stats["new_products"] += 1
                         
                         
                         if stats["new_products"] <= 5:
                             print(f"[Дедупликация] + Новый продукт #{product.id} из {offer.website_name}")
                             print(f"  Заголовок: {offer.title[:60]}...")
+                    else:
+                        stats["merged"] += 1
+                        
+                        
+                        if stats["merged"] <= 5:
+                            print(f"[Дедупликация] ✓ Объединено: {offer.website_name} -> продукт #{product.id}")
+                            print(f"  Заголовок: {offer.title[:60]}...")
+                            print(f"  Адрес: {offer.address[:60] if offer.address else '(нет)'}...")
                     
                     stats["processed"] += 1
                     
@@ -246,8 +267,15 @@ class Deduplicator:
                         print(f"[Дедупликация] ✗ Ошибка при обработке оффера {i}: {str(e)[:100]}")
                         if stats["errors"] == 1:
                             traceback.print_exc()
-                    await db.rollback()
                     continue
 
+            await CRUDOffer.assign_products(db, assignments)
+            await db.commit()
+
+            if not assignments:
+                # Ни одно объявление пачки не обработано - та же пачка
+                # вернулась бы снова
+                break
+
         return stats
 
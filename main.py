@@ -26,31 +26,35 @@ from config import Config
 from models import Listing
 from utils.storage import Storage
 
-from parsers.avito import AvitoParser
-from parsers.farpost import FarPostParser
-from parsers.cian import CianParser
-
-async def run_source(parser_cls, config: Config, max_pages: int) -> List[Listing]:
-    async with parser_cls(config) as parser:
-        return await parser.parse_all(max_pages=max_pages)
+from planner.partitioner import ShardPlanner
+from planner.scheduler import build_plan, run_units
 
 async def main_async(max_pages: int = 3) -> None:
     config = Config.from_env()
     storage = Storage(config.output_dir)
 
-    tasks = []
-    for src in config.enabled_sources:
-        if src == "avito":
-            tasks.append(run_source(AvitoParser, config, max_pages))
-        elif src == "farpost":
-            tasks.append(run_source(FarPostParser, config, max_pages))
-        elif src == "cian":
-            tasks.append(run_source(CianParser, config, max_pages))
-
-    results: List[List[Listing]] = await asyncio.gather(*tasks, return_exceptions=False)
-    listings: List[Listing] = [item for sub in results for item in sub]
-
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    writers = []
+    if config.save_ndjson:
+        writers.append(storage.open_ndjson(f"listings_{ts}.ndjson", config.ndjson_compression))
+    if config.save_parquet:
+        writers.append(storage.open_parquet(f"listings_{ts}.parquet"))
+
+    def write_page(page: List[Listing]) -> None:
+        for writer in writers:
+            writer.write(page)
+
+    planner = ShardPlanner(config) if config.shard_search else None
+    units = await build_plan(config, max_pages=max_pages, planner=planner)
+    try:
+        listings: List[Listing] = await run_units(
+            units, config, workers=config.max_concurrent_requests, planner=planner,
+            on_page=write_page if writers else None
+        )
+    finally:
+        for writer in writers:
+            writer.close()
+
     if config.save_json:
         json_path = storage.save_json(listings, f"listings_{ts}.json")
     if config.save_csv:
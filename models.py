@@ -37,4 +37,18 @@ class Listing:
             "floor": self.floor,
             "total_floors": self.total_floors,
             "images": self.images or [],
+            "district": self.district,
         }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Listing":
+        data = dict(data)
+        parsed_at = data.get("parsed_at")
+        if isinstance(parsed_at, str):
+            data["parsed_at"] = datetime.fromisoformat(parsed_at)
+        elif parsed_at is None:
+            data.pop("parsed_at", None)
+        images = data.get("images")
+        if isinstance(images, str):
+            data["images"] = [i for i in images.split(",") if i]
+        return cls(**data)
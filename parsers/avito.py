@@ -7,38 +7,52 @@ from playwright.async_api import Page
 
 from models import Listing
 from config import Config
-from base_parser import BaseParser
+from base_parser import BaseParser, PageLoadError
 from utils.address_parser import extract_district
 
 
 class AvitoParser(BaseParser):
-    def __init__(self, config: Config):
-        super().__init__(config, source_name="avito")
+    filter_params = {"min_price": "pmin", "max_price": "pmax"}
+    page_size = 50
+    page_cap = 100
+
+    def __init__(self, config: Config, **kwargs):
+        super().__init__(config, source_name="avito", **kwargs)
 
     def get_base_url(self) -> str:
         return "https://www.avito.ru/vladivostok/kvartiry/sdam/na_dlitelnyy_srok-ASgBAgICAkSSA8gQ8AeQUg"
 
     async def parse_listings_page(self, page: int = 1) -> List[Listing]:
-        url = self.get_base_url()
+        url = self.get_search_url()
         if page > 1:
-            url = f"{url}?p={page}"
+            separator = "&" if "?" in url else "?"
+            url = f"{url}{separator}p={page}"
         
         page_obj = await self._fetch(url)
         if not page_obj:
-            return []
+            raise PageLoadError(f"страница {page} не загружена")
         
         items = []
         try:
             await asyncio.sleep(3)
             
-            cards = await page_obj.query_selector_all("div[data-marker='item']")
-            if len(cards) == 0:
-                cards = await page_obj.query_selector_all("div[class*='iva-item']")
-            if len(cards) == 0:
-                cards = await page_obj.query_selector_all("article[data-marker='item']")
+            card_selectors = [
+                "div[data-marker='item']",
+                "div[class*='iva-item']",
+                "article[data-marker='item']",
+            ]
+            
+            cards = []
+            for selector in self.selectors.order("card", card_selectors):
+                cards = await page_obj.query_selector_all(selector)
+                if cards:
+                    self.selectors.hit("card", selector)
+                    break
             
             if len(cards) == 0:
+                self.selectors.miss("card")
                 print(f"[avito] Предупреждение: карточки не найдены на странице {page}")
+                await self._ensure_results_page(page_obj, page)
                 return []
             
             for card in cards:
@@ -56,14 +70,16 @@ class AvitoParser(BaseParser):
                     ]
                     
                     a = None
-                    for selector in link_selectors:
+                    for selector in self.selectors.order("link", link_selectors):
                         a = await card.query_selector(selector)
                         if a:
                             href = await a.get_attribute("href")
                             if href:
+                                self.selectors.hit("link", selector)
                                 break
                     
                     if not href:
+                        self.selectors.miss("link")
                         continue
                     
                     full_url = urljoin("https://www.avito.ru", href) if href else ""
@@ -76,13 +92,17 @@ class AvitoParser(BaseParser):
                         "span[itemprop='name']",
                     ]
                     
-                    for selector in title_selectors:
+                    for selector in self.selectors.order("title", title_selectors):
                         title_el = await card.query_selector(selector)
                         if title_el:
                             title = await title_el.inner_text()
                             if title:
+                                self.selectors.hit("title", selector)
                                 break
                     
+                    if not title:
+                        self.selectors.miss("title")
+                    
                     if not title and a:
                         title = await a.inner_text()
                     
@@ -96,22 +116,25 @@ class AvitoParser(BaseParser):
                         "span[class*='price-text']",
                     ]
                     
-                    for selector in price_selectors:
+                    for selector in self.selectors.order("price", price_selectors):
                         price_el = await card.query_selector(selector)
                         if price_el:
                             if selector.startswith("meta"):
                                 price_content = await price_el.get_attribute("content")
                                 if price_content:
                                     price = int(re.sub(r"\D", "", price_content) or 0)
+                                    self.selectors.hit("price", selector)
                                     break
                             else:
                                 price_text = await price_el.inner_text()
                                 if price_text:
                                     price = int(re.sub(r"\D", "", price_text) or 0)
                                     if price > 0:
+                                        self.selectors.hit("price", selector)
                                         break
                     
                     if price == 0:
+                        self.selectors.miss("price")
                         card_text = await card.inner_text()
                         price_match = re.search(r"(\d+[\s,.]?\d*)\s*₽", card_text)
                         if price_match:
@@ -159,30 +182,29 @@ class AvitoParser(BaseParser):
                     # Извлекаем адрес
                     address = ""
                     
-                    # Основной метод: используем data-marker="item-address" (найден в тестах)
-                    address_container = await card.query_selector('div[data-marker="item-address"]')
-                    if address_container:
-                        try:
-                            address_text = await address_container.inner_text()
-                            if address_text:
-                                # Очищаем от лишних пробелов и переносов строк
-                                address = " ".join(address_text.strip().split())
-                                # Заменяем множественные пробелы на один
-                                address = " ".join(address.split())
-                        except Exception:
-                            pass
+                    # Основной метод: data-marker="item-address" (найден в тестах),
+                    # резервный - itemprop="address"
+                    address_selectors = [
+                        'div[data-marker="item-address"]',
+                        'div[itemprop="address"]',
+                    ]
                     
-                    # Резервный метод: ищем через itemprop="address"
-                    if not address:
-                        address_container = await card.query_selector('div[itemprop="address"]')
+                    for selector in self.selectors.order("address", address_selectors):
+                        address_container = await card.query_selector(selector)
                         if address_container:
                             try:
                                 address_text = await address_container.inner_text()
                                 if address_text:
+                                    # Очищаем от лишних пробелов и переносов строк
                                     address = " ".join(address_text.strip().split())
+                                    self.selectors.hit("address", selector)
+                                    break
                             except Exception:
                                 pass
                     
+                    if not address:
+                        self.selectors.miss("address")
+                    
                     # Резервный метод 2: ищем span элементы с адресом (без классов)
                     if not address:
                         try:
@@ -267,6 +289,8 @@ class AvitoParser(BaseParser):
             except Exception:
                 pass
         
+        if cards and not items:
+            raise PageLoadError(f"страница {page}: ни одна из {len(cards)} карточек не распознана")
         return items
 
     async def parse_listing_page(self, url: str) -> Optional[Listing]:
@@ -7,27 +7,30 @@ from playwright.async_api import Page
 
 from models import Listing
 from config import Config
-from base_parser import BaseParser
+from base_parser import BaseParser, PageLoadError
 from utils.address_parser import extract_district
 
 
 class CianParser(BaseParser):
+    filter_params = {"min_price": "minprice", "max_price": "maxprice", "rooms": "room{}"}
+    page_size = 28
+    page_cap = 54
 
-    def __init__(self, config: Config):
-        super().__init__(config, source_name="cian")
+    def __init__(self, config: Config, **kwargs):
+        super().__init__(config, source_name="cian", **kwargs)
 
     def get_base_url(self) -> str:
         return "https://vladivostok.cian.ru/snyat-kvartiru/"
 
     async def parse_listings_page(self, page: int = 1) -> List[Listing]:
-        url = self.get_base_url()
+        url = self.get_search_url()
         if page > 1:
             separator = "&" if "?" in url else "?"
             url = f"{url}{separator}p={page}"
 
         page_obj = await self._fetch(url)
         if not page_obj:
-            return []
+            raise PageLoadError(f"страница {page} не загружена")
 
         items = []
 
@@ -35,11 +38,22 @@ class CianParser(BaseParser):
             await page_obj.evaluate("window.scrollTo(0, document.body.scrollHeight)")
             await asyncio.sleep(3)
             
-            cards = await page_obj.query_selector_all('article[data-name="CardComponent"]')
-            if len(cards) == 0:
-                cards = await page_obj.query_selector_all('div[data-name="LinkArea"]')
+            card_selectors = [
+                'article[data-name="CardComponent"]',
+                'div[data-name="LinkArea"]',
+                'div[class*="x31de4314"]',
+            ]
+            
+            cards = []
+            for selector in self.selectors.order("card", card_selectors):
+                cards = await page_obj.query_selector_all(selector)
+                if cards:
+                    self.selectors.hit("card", selector)
+                    break
             if len(cards) == 0:
-                cards = await page_obj.query_selector_all('div[class*="x31de4314"]')
+                self.selectors.miss("card")
+                await self._ensure_results_page(page_obj, page)
+                return []
 
             for card in cards:
                 try:
@@ -210,6 +224,8 @@ class CianParser(BaseParser):
             except Exception:
                 pass
 
+        if cards and not items:
+            raise PageLoadError(f"страница {page}: ни одна из {len(cards)} карточек не распознана")
         return items
 
     async def parse_listing_page(self, url: str) -> Optional[Listing]:
@@ -230,20 +246,24 @@ class CianParser(BaseParser):
                 'meta[itemprop="price"]',
             ]
             
-            for selector in price_selectors:
+            for selector in self.selectors.order("detail_price", price_selectors):
                 price_el = await page_obj.query_selector(selector)
                 if price_el:
                     if selector.startswith('meta'):
                         price_content = await price_el.get_attribute("content")
                         if price_content:
                             price = int(re.sub(r'\D', '', price_content) or 0)
+                            self.selectors.hit("detail_price", selector)
                             break
                     else:
                         price_text = await price_el.inner_text()
                         if price_text:
                             price = int(re.sub(r'\D', '', price_text) or 0)
                             if price > 0:
+                                self.selectors.hit("detail_price", selector)
                                 break
+            if price == 0:
+                self.selectors.miss("detail_price")
 
             address = ""
             address_selectors = [
@@ -253,13 +273,16 @@ class CianParser(BaseParser):
                 '.address',
             ]
             
-            for selector in address_selectors:
+            for selector in self.selectors.order("detail_address", address_selectors):
                 address_el = await page_obj.query_selector(selector)
                 if address_el:
                     address_text = await address_el.inner_text()
                     if address_text:
                         address = address_text.strip()
+                        self.selectors.hit("detail_address", selector)
                         break
+            if not address:
+                self.selectors.miss("detail_address")
             
             district = None
             if address:
@@ -7,19 +7,21 @@ from playwright.async_api import Page
 
 from models import Listing
 from config import Config
-from base_parser import BaseParser
+from base_parser import BaseParser, PageLoadError
 from utils.address_parser import extract_district
 
 
 class FarPostParser(BaseParser):
-    def __init__(self, config: Config):
-        super().__init__(config, source_name="farpost")
+    page_size = 50
+
+    def __init__(self, config: Config, **kwargs):
+        super().__init__(config, source_name="farpost", **kwargs)
 
     def get_base_url(self) -> str:
         return "https://www.farpost.ru/vladivostok/realty/rent_flats/#center=131.95720572019204%2C43.13726843144687&zoom=10.834896068990224"
 
     async def parse_listings_page(self, page: int = 1) -> List[Listing]:
-        url = self.get_base_url()
+        url = self.get_search_url()
         if page > 1:
             if "?" in url:
                 url = f"{url}&page={page}"
@@ -31,18 +33,29 @@ class FarPostParser(BaseParser):
         
         page_obj = await self._fetch(url)
         if not page_obj:
-            return []
+            raise PageLoadError(f"страница {page} не загружена")
         
         items = []
         try:
             await page_obj.evaluate("window.scrollTo(0, document.body.scrollHeight)")
             await asyncio.sleep(2)
             
-            rows = await page_obj.query_selector_all(".bull-item__cell")
-            if len(rows) == 0:
-                rows = await page_obj.query_selector_all("div[class*='bull-item__cell']")
+            card_selectors = [
+                ".bull-item__cell",
+                "div[class*='bull-item__cell']",
+                ".descriptionCell",
+            ]
+            
+            rows = []
+            for selector in self.selectors.order("card", card_selectors):
+                rows = await page_obj.query_selector_all(selector)
+                if rows:
+                    self.selectors.hit("card", selector)
+                    break
             if len(rows) == 0:
-                rows = await page_obj.query_selector_all(".descriptionCell")
+                self.selectors.miss("card")
+                await self._ensure_results_page(page_obj, page)
+                return []
             
             for row in rows:
                 try:
@@ -68,13 +81,14 @@ class FarPostParser(BaseParser):
                         'span[itemprop="price"]',
                     ]
                     
-                    for selector in price_selectors:
+                    for selector in self.selectors.order("price", price_selectors):
                         price_el = await row.query_selector(selector)
                         if price_el:
                             price_attr = await price_el.get_attribute("data-price")
                             if price_attr:
                                 price = int(re.sub(r"\D", "", price_attr) or 0)
                                 if price > 0:
+                                    self.selectors.hit("price", selector)
                                     break
                             
                             price_attr = await price_el.get_attribute("data-bulletin-price")
@@ -82,6 +96,7 @@ class FarPostParser(BaseParser):
                                 try:
                                     price = int(price_attr)
                                     if price > 0:
+                                        self.selectors.hit("price", selector)
                                         break
                                 except ValueError:
                                     pass
@@ -90,8 +105,12 @@ class FarPostParser(BaseParser):
                             if price_text:
                                 price = int(re.sub(r"\D", "", price_text) or 0)
                                 if price > 0:
+                                    self.selectors.hit("price", selector)
                                     break
                     
+                    if price == 0:
+                        self.selectors.miss("price")
+                    
                     address = ""
                     address_selectors = [
                         '.bull-item__annotation',
@@ -100,14 +119,18 @@ class FarPostParser(BaseParser):
                         '[itemprop="address"]',
                     ]
                     
-                    for selector in address_selectors:
+                    for selector in self.selectors.order("address", address_selectors):
                         address_el = await row.query_selector(selector)
                         if address_el:
                             address_text = await address_el.inner_text()
                             if address_text:
                                 address = address_text.strip()
+                                self.selectors.hit("address", selector)
                                 break
                     
+                    if not address:
+                        self.selectors.miss("address")
+                    
                     if not address and a:
                         link_text = await a.inner_text()
                         if link_text and ',' in link_text:
@@ -135,7 +158,7 @@ class FarPostParser(BaseParser):
                         r"(\d+[\.,]?\d*)\s*м2",
                     ]
                     
-                    for selector in area_selectors:
+                    for selector in self.selectors.order("area", area_selectors):
                         area_el = await row.query_selector(selector)
                         if area_el:
                             area_text = await area_el.inner_text()
@@ -146,9 +169,11 @@ class FarPostParser(BaseParser):
                                         area = float(area_match.group(1).replace(',', '.'))
                                         break
                                 if area > 0:
+                                    self.selectors.hit("area", selector)
                                     break
                     
                     if area == 0.0:
+                        self.selectors.miss("area")
                         card_text = await row.inner_text()
                         for pattern in area_patterns:
                             area_match = re.search(pattern, card_text, re.IGNORECASE)
@@ -211,6 +236,8 @@ class FarPostParser(BaseParser):
             except Exception:
                 pass
         
+        if rows and not items:
+            raise PageLoadError(f"страница {page}: ни одна из {len(rows)} карточек не распознана")
         return items
 
     async def parse_listing_page(self, url: str) -> Optional[Listing]:
@@ -0,0 +1,148 @@
+"""
+Разбиение поисковой выдачи источника на независимые шарды.
+
+Сайты отдают не больше ``page_cap`` страниц по одному поисковому запросу,
+поэтому выдачу режем фильтрами (комнаты, ценовые диапазоны) так, чтобы
+каждый шард помещался в бюджет страниц. Размер шардов берется из
+наблюденного числа результатов (счетчик на первой странице или итог
+прошлого обхода), которое сохраняется между запусками.
+"""
+
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field, replace
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from base_parser import BaseParser
+from config import Config
+
+
+@dataclass
+class CrawlUnit:
+    source: str
+    parser_cls: Type[BaseParser]
+    filters: Dict[str, int] = field(default_factory=dict)
+    max_pages: int = 10
+    expected: Optional[int] = None
+    base_url: Optional[str] = None
+    host: str = ""
+    city: str = ""
+    category: str = ""
+
+    @property
+    def key(self) -> str:
+        filters = ",".join(f"{k}={v}" for k, v in sorted(self.filters.items()))
+        return f"{self.source}|{self.city}|{self.category}|{filters}"
+
+    def with_filters(self, **filters) -> "CrawlUnit":
+        return replace(self, filters=dict(self.filters, **filters), expected=None)
+
+
+Probe = Callable[[CrawlUnit], Awaitable[Optional[int]]]
+
+
+class ShardPlanner:
+
+    def __init__(
+        self,
+        config: Config,
+        rooms_values: Optional[Tuple[int, ...]] = None,
+        min_price_band: int = 1000,
+        max_depth: int = 8,
+        counts_ttl_hours: int = 72,
+    ):
+        self.config = config
+        # По умолчанию - весь допустимый диапазон комнат из конфига:
+        # объявления вне шардов по комнатам не попали бы ни в один шард
+        self.rooms_values = rooms_values or tuple(range(config.min_rooms, config.max_rooms + 1))
+        self.min_price_band = min_price_band
+        self.max_depth = max_depth
+        self.counts_ttl_seconds = counts_ttl_hours * 3600
+        self.path = os.path.join(config.stats_dir, "shard_counts.json")
+        self.counts = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.counts, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def capacity(self, parser_cls: Type[BaseParser], max_pages: int) -> int:
+        return min(max_pages, parser_cls.page_cap) * parser_cls.page_size
+
+    def observed_count(self, unit: CrawlUnit) -> Optional[int]:
+        entry = self.counts.get(unit.key)
+        if not entry or time.time() - entry["updated"] > self.counts_ttl_seconds:
+            return None
+        return entry["count"]
+
+    def record_count(self, unit: CrawlUnit, count: int) -> None:
+        self.counts[unit.key] = {"count": count, "updated": time.time()}
+
+    def record_crawl(self, unit: CrawlUnit, crawl_stats: dict) -> None:
+        """
+        Запоминает итог обхода шарда. Если выдача не закончилась к концу
+        бюджета страниц, шард усечен - в следующий раз его нужно дробить.
+        """
+        count = crawl_stats["raw"]
+        if not crawl_stats["exhausted"]:
+            count = max(count, self.capacity(unit.parser_cls, unit.max_pages) + 1)
+        self.record_count(unit, count)
+
+    async def plan(self, unit: CrawlUnit, probe: Optional[Probe] = None) -> List[CrawlUnit]:
+        """Разбивает единицу обхода (вся выдача города/категории) на шарды."""
+        dimensions = unit.parser_cls.filter_params
+        roots = [unit]
+        if "rooms" in dimensions:
+            roots = [unit.with_filters(rooms=r) for r in self.rooms_values]
+
+        units: List[CrawlUnit] = []
+        for root in roots:
+            if "min_price" in dimensions and "max_price" in dimensions:
+                root = root.with_filters(min_price=self.config.min_price, max_price=self.config.max_price)
+                units.extend(await self._split(root, probe, depth=0))
+            else:
+                root.expected = await self._count(root, probe)
+                units.append(root)
+
+        self.save()
+        print(f"[planner] {unit.source}/{unit.city}/{unit.category}: {len(units)} шардов")
+        return units
+
+    async def _count(self, unit: CrawlUnit, probe: Optional[Probe]) -> Optional[int]:
+        count = self.observed_count(unit)
+        if count is None and probe:
+            count = await probe(unit)
+            if count is not None:
+                self.record_count(unit, count)
+        return count
+
+    async def _split(self, unit: CrawlUnit, probe: Optional[Probe], depth: int) -> List[CrawlUnit]:
+        unit.expected = await self._count(unit, probe)
+        if unit.expected == 0:
+            return []
+
+        low, high = unit.filters["min_price"], unit.filters["max_price"]
+        fits = unit.expected is not None and unit.expected <= self.capacity(unit.parser_cls, unit.max_pages)
+        if unit.expected is None or fits or depth >= self.max_depth or high - low <= self.min_price_band:
+            return [unit]
+
+        # Цены распределены примерно логнормально - делим диапазон
+        # по среднему геометрическому, а не пополам
+        middle = int(math.sqrt(max(low, 1) * high))
+        middle = min(max(middle, low + 1), high - 1)
+        shards = []
+        for band_low, band_high in ((low, middle), (middle + 1, high)):
+            child = unit.with_filters(min_price=band_low, max_price=band_high)
+            shards.extend(await self._split(child, probe, depth + 1))
+        return shards
@@ -0,0 +1,205 @@
+"""
+План обхода из реестра источников и его выполнение пулом воркеров.
+"""
+
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Type
+
+from base_parser import BaseParser
+from config import Config
+from models import Listing
+from planner.partitioner import CrawlUnit, ShardPlanner
+from planner.sources import SOURCES, load_parser, registered_scopes, resolve_url
+
+
+class LazyProbe:
+    """
+    Считает результаты шарда по счетчику выдачи. Браузер открывается
+    только при первом вызове - если все размеры шардов известны из
+    прошлых запусков, планирование обходится без сети.
+    """
+
+    def __init__(self, parser_cls: Type[BaseParser], config: Config):
+        self.parser_cls = parser_cls
+        self.config = config
+        self.parser: Optional[BaseParser] = None
+
+    async def __call__(self, unit: CrawlUnit) -> Optional[int]:
+        if self.parser is None:
+            self.parser = await self.parser_cls(self.config).__aenter__()
+        self.parser.base_url = unit.base_url
+        self.parser.filters = unit.filters
+        count = await self.parser.count_results()
+        print(f"[planner] {unit.key}: {count if count is not None else '?'} объявлений")
+        return count
+
+    async def close(self) -> None:
+        if self.parser is not None:
+            await self.parser.__aexit__(None, None, None)
+            self.parser = None
+
+
+async def build_plan(
+    config: Config,
+    sources: Optional[Iterable[str]] = None,
+    max_pages: Optional[int] = None,
+    planner: Optional[ShardPlanner] = None,
+) -> List[CrawlUnit]:
+    """
+    Разворачивает реестр в единицы обхода: включенные источники × города
+    × категории. Если передан planner, каждая единица режется на шарды.
+    """
+    units: List[CrawlUnit] = []
+    for source in sources if sources is not None else config.enabled_sources:
+        spec = SOURCES.get(source)
+        if not spec:
+            print(f"[planner] Неизвестный источник: {source}")
+            continue
+
+        parser_cls = load_parser(spec)
+        probe = LazyProbe(parser_cls, config) if planner else None
+        try:
+            for city in config.enabled_cities:
+                for category in config.enabled_categories:
+                    base_url = resolve_url(spec, city, category)
+                    if not base_url:
+                        continue
+                    unit = CrawlUnit(
+                        source=source,
+                        parser_cls=parser_cls,
+                        max_pages=max_pages or spec.max_pages,
+                        base_url=base_url,
+                        host=spec.host,
+                        city=city,
+                        category=category,
+                    )
+                    if planner:
+                        units.extend(await planner.plan(unit, probe=probe))
+                    else:
+                        units.append(unit)
+        finally:
+            if probe:
+                await probe.close()
+    return units
+
+
+class _HostQueue:
+    """Очередь единиц обхода с ограничением одновременных обходов хоста."""
+
+    def __init__(self, units: List[CrawlUnit]):
+        self.pending: Dict[str, Deque[CrawlUnit]] = {}
+        for unit in units:
+            self.pending.setdefault(unit.host, deque()).append(unit)
+        self.active: Dict[str, int] = {host: 0 for host in self.pending}
+        self.limits = {
+            spec.host: spec.max_concurrency for spec in SOURCES.values()
+        }
+        self.condition = asyncio.Condition()
+
+    def _take(self) -> Optional[CrawlUnit]:
+        # Берем хост с наименьшей текущей нагрузкой, у которого есть свободный слот
+        candidates = [
+            host for host, queue in self.pending.items()
+            if queue and self.active[host] < self.limits.get(host, 1)
+        ]
+        if not candidates:
+            return None
+        host = min(candidates, key=lambda h: self.active[h])
+        self.active[host] += 1
+        return self.pending[host].popleft()
+
+    async def get(self) -> Optional[CrawlUnit]:
+        async with self.condition:
+            while True:
+                unit = self._take()
+                if unit:
+                    return unit
+                if not any(self.pending.values()):
+                    return None
+                await self.condition.wait()
+
+    async def done(self, unit: CrawlUnit) -> None:
+        async with self.condition:
+            self.active[unit.host] -= 1
+            self.condition.notify_all()
+
+
+async def run_units(
+    units: List[CrawlUnit],
+    config: Config,
+    workers: int,
+    planner: Optional[ShardPlanner] = None,
+    on_page: Optional[Callable[[List[Listing]], None]] = None,
+    complete: Optional[Dict[str, bool]] = None,
+) -> List[Listing]:
+    """
+    Обходит единицы пулом из ``workers`` воркеров с учетом лимита
+    одновременных обходов на хост. Каждый воркер держит по одному
+    открытому парсеру на источник со своим профилем сессии и
+    переключает в нем URL и фильтры между единицами.
+    ``on_page`` получает объявления каждой страницы по мере обхода.
+    ``complete`` заполняется по источникам: True, если все единицы
+    источника дошли до конца выдачи без ошибок, что-то нашли и покрыли
+    все зарегистрированные города и категории источника (обход с узкими
+    ENABLED_CITIES/ENABLED_CATEGORIES не видит остальную выдачу) - только
+    после такого обхода пропавшие объявления можно снимать с публикации.
+    """
+    queue = _HostQueue(units)
+    results: List[Listing] = []
+    status = complete if complete is not None else {}
+    raw: Dict[str, int] = {}
+    for unit in units:
+        status[unit.source] = True
+        raw[unit.source] = 0
+
+    async def worker(worker_id: int) -> None:
+        parsers: Dict[str, BaseParser] = {}
+        try:
+            while True:
+                unit = await queue.get()
+                if unit is None:
+                    return
+                try:
+                    parser = parsers.get(unit.source)
+                    if parser is None:
+                        parser = unit.parser_cls(config, profile_name=f"{unit.source}-{worker_id}")
+                        parser.on_page = on_page
+                        await parser.__aenter__()
+                        parsers[unit.source] = parser
+                    parser.base_url = unit.base_url
+                    parser.filters = unit.filters
+                    print(f"[worker-{worker_id}] {unit.key}")
+                    listings = await parser.parse_all(max_pages=unit.max_pages)
+                    results.extend(listings)
+                    stats = parser.crawl_stats
+                    raw[unit.source] += stats["raw"]
+                    if not stats["exhausted"] or stats["errors"]:
+                        status[unit.source] = False
+                    if planner:
+                        planner.record_crawl(unit, stats)
+                except Exception as e:
+                    status[unit.source] = False
+                    print(f"[worker-{worker_id}] Ошибка {unit.key}: {str(e)[:100]}")
+                finally:
+                    await queue.done(unit)
+        finally:
+            for parser in parsers.values():
+                try:
+                    await parser.__aexit__(None, None, None)
+                except Exception:
+                    pass
+
+    await asyncio.gather(*(worker(i) for i in range(max(1, min(workers, len(units))))))
+    for source, found in raw.items():
+        if not found:
+            status[source] = False
+        covered = {(unit.city, unit.category) for unit in units if unit.source == source}
+        missing = registered_scopes(SOURCES[source]) - covered if source in SOURCES else set()
+        if missing:
+            status[source] = False
+            print(f"[planner] {source}: обход неполный, не обходились {sorted(missing)}")
+
+    if planner:
+        planner.save()
+    return results
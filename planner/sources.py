@@ -0,0 +1,84 @@
+"""
+Декларативный реестр источников: источник × город × категория -> URL выдачи.
+
+Модули парсеров подключаются лениво, только для включенных источников.
+"""
+
+import importlib
+from dataclasses import dataclass, field
+from typing import Dict, Set, Tuple, Type
+
+from base_parser import BaseParser
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    name: str
+    parser: str  # "module:Class"
+    host: str
+    # категория -> шаблон URL выдачи, {city} - слаг города на сайте
+    url_templates: Dict[str, str] = field(default_factory=dict)
+    max_pages: int = 10
+    # одновременных обходов одного хоста
+    max_concurrency: int = 2
+    # объявления, не виденные дольше окна, снимаются с публикации
+    # (CRUDOffer.deactivate_stale); окно - несколько полных обходов
+    crawl_window_hours: int = 72
+
+
+SOURCES: Dict[str, SourceSpec] = {
+    "avito": SourceSpec(
+        name="avito",
+        parser="parsers.avito:AvitoParser",
+        host="www.avito.ru",
+        url_templates={
+            "rent_long": "https://www.avito.ru/{city}/kvartiry/sdam/na_dlitelnyy_srok-ASgBAgICAkSSA8gQ8AeQUg",
+        },
+    ),
+    "farpost": SourceSpec(
+        name="farpost",
+        parser="parsers.farpost:FarPostParser",
+        host="www.farpost.ru",
+        url_templates={
+            "rent_long": "https://www.farpost.ru/{city}/realty/rent_flats/",
+        },
+    ),
+    "cian": SourceSpec(
+        name="cian",
+        parser="parsers.cian:CianParser",
+        host="cian.ru",
+        url_templates={
+            "rent_long": "https://{city}.cian.ru/snyat-kvartiru/",
+        },
+        max_concurrency=1,
+    ),
+}
+
+# город -> слаг города на каждом источнике
+CITIES: Dict[str, Dict[str, str]] = {
+    "vladivostok": {"avito": "vladivostok", "farpost": "vladivostok", "cian": "vladivostok"},
+    "khabarovsk": {"avito": "habarovsk", "farpost": "khabarovsk", "cian": "habarovsk"},
+}
+
+
+def load_parser(spec: SourceSpec) -> Type[BaseParser]:
+    module_name, class_name = spec.parser.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def resolve_url(spec: SourceSpec, city: str, category: str) -> str:
+    template = spec.url_templates.get(category)
+    city_slug = CITIES.get(city, {}).get(spec.name)
+    if not template or not city_slug:
+        return ""
+    return template.format(city=city_slug)
+
+
+def registered_scopes(spec: SourceSpec) -> Set[Tuple[str, str]]:
+    """Все пары (город, категория) источника, для которых есть URL выдачи."""
+    return {
+        (city, category)
+        for city in CITIES
+        for category in spec.url_templates
+        if resolve_url(spec, city, category)
+    }
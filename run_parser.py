@@ -17,33 +17,66 @@ if sys.platform == "win32":
         asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from config import Config
 from models import Listing
-from database.database import init_db, AsyncSessionLocal
+from database.database import startup_db, AsyncSessionLocal
 from database.crud import CRUDOffer, CRUDProduct
+from database.bulk_loader import aiter_listings, copy_load
+from database.spool_drainer import SpoolDrainer
 from deduplication.deduplicator import Deduplicator
+from planner.partitioner import ShardPlanner
+from planner.scheduler import build_plan, run_units
+from planner.sources import SOURCES
+from utils.spool import Spool, SpoolReader
 
-from parsers.avito import AvitoParser
-from parsers.farpost import FarPostParser
-from parsers.cian import CianParser
 
+COPY_THRESHOLD = 20000
+# Ошибок загрузки спула подряд, после которых сегменты оставляются на диске
+SPOOL_MAX_FAILURES = 5
 
-async def run_parser(parser_cls, config: Config, max_pages: int) -> list[Listing]:
-    parser_name = parser_cls.__name__.replace("Parser", "")
-    print(f"\n[{parser_name}] Запуск парсера...")
+
+async def run_crawl(config: Config, max_pages: int, on_page=None, complete=None) -> list[Listing]:
+    # run_parser.py по умолчанию обходит все зарегистрированные источники,
+    # ENABLED_SOURCES сужает список
+    sources = config.enabled_sources if os.getenv("ENABLED_SOURCES") else list(SOURCES)
+    planner = ShardPlanner(config) if config.shard_search else None
+    units = await build_plan(config, sources=sources, max_pages=max_pages, planner=planner)
+    print(f"[Парсинг] Единиц обхода: {len(units)}, воркеров: {config.max_concurrent_requests}")
+    return await run_units(
+        units, config, workers=config.max_concurrent_requests, planner=planner, on_page=on_page,
+        complete=complete,
+    )
+
+
+async def run_crawl_spooled(config: Config, max_pages: int, drain: bool = True, complete=None) -> list[Listing]:
+    """
+    Обход со спулом: страницы пишутся в сегменты на диске, загрузчик
+    параллельно переносит закрытые сегменты в БД. Медленная или
+    недоступная БД не тормозит обход и не теряет объявления - незагруженные
+    сегменты догрузит следующий запуск или scripts/drain_spool.py.
+    """
+    spool = Spool(config.spool_dir)
+    if not drain:
+        try:
+            return await run_crawl(config, max_pages, on_page=spool.append, complete=complete)
+        finally:
+            spool.close()
+            print(f"[Спул] Записано: {spool.written}, сегментов ждут загрузки: {len(spool.sealed_segments())}")
+
+    drainer = SpoolDrainer(spool)
+    stop = asyncio.Event()
+    drain_task = asyncio.create_task(drainer.run(stop, max_failures=SPOOL_MAX_FAILURES))
     try:
-        async with parser_cls(config) as parser:
-            listings = await parser.parse_all(max_pages=max_pages)
-            print(f"[{parser_name}] Завершено: найдено {len(listings)} объявлений")
-            return listings
-    except Exception as e:
-        import traceback
-        print(f"[{parser_name}] ОШИБКА: {str(e)}")
-        print(f"[{parser_name}] Детали ошибки:")
-        traceback.print_exc()
-        return []
+        listings = await run_crawl(config, max_pages, on_page=spool.append, complete=complete)
+    finally:
+        spool.close()
+        stop.set()
+    stats = await drain_task
+    print(f"[Спул] Записано: {spool.written} | Загружено сегментов: {stats['segments']} | "
+          f"Новых: {stats['inserted']} | Изменилось: {stats['changed']} | Ошибок: {stats['errors']}")
+    return listings
 
 
 def deduplicate_listings(listings: list[Listing], use_address: bool = False) -> list[Listing]:
@@ -94,7 +127,8 @@ def deduplicate_listings(listings: list[Listing], use_address: bool = False) ->
     return unique_listings
 
 
-async def save_to_database(listings: list[Listing], deduplicate: bool = True, use_address_dedup: bool = False) -> None:
+async def save_to_database(listings: list[Listing], deduplicate: bool = True, use_address_dedup: bool = False) -> int:
+    """Returns: число объявлений, которые не удалось сохранить."""
     print(f"\n[БД] Сохранение {len(listings)} объявлений в базу данных...")
     
     # Дедупликация перед сохранением
@@ -103,47 +137,38 @@ async def save_to_database(listings: list[Listing], deduplicate: bool = True, us
         listings = deduplicate_listings(listings, use_address=use_address_dedup)
         print(f"[Дедупликация] После дедупликации: {len(listings)} объявлений")
     
+    if len(listings) >= COPY_THRESHOLD:
+        # Большие объемы дешевле грузить через COPY и одно слияние
+        stats = await copy_load(aiter_listings(listings))
+        print(f"[БД] Готово (COPY): Новых {stats['inserted']}, Изменилось {stats['changed']}, Без изменений {stats['unchanged']}")
+        return 0
+    
     async with AsyncSessionLocal() as db:
-        saved_count = 0
-        skipped_count = 0
+        inserted_count = 0
+        updated_count = 0
         error_count = 0
+        batch_size = 1000
         
-        for i, listing in enumerate(listings, 1):
+        # Объявления сохраняются БЕЗ product_id (дедупликация создаст продукты и свяжет их),
+        # у уже известных URL обновляются цена, заголовок и дата парсинга
+        for start in range(0, len(listings), batch_size):
+            batch = listings[start:start + batch_size]
             try:
-                # Проверяем, есть ли уже такое объявление в БД по URL
-                existing = await CRUDOffer.get_by_url(db, listing.url)
-                if existing:
-                    skipped_count += 1
-                    if i % 50 == 0:
-                        print(f"[БД] Обработано: {i}/{len(listings)} | Сохранено: {saved_count} | Пропущено: {skipped_count} | Ошибок: {error_count}")
-                    continue
-                
-                # Сохраняем объявление БЕЗ product_id (дедупликация создаст продукты и свяжет их)
-                offer = await CRUDOffer.create(db, listing, product_id=None)
-                saved_count += 1
-                
-                # Логируем первые несколько адресов для проверки
-                if saved_count <= 5:
-                    print(f"[БД] Сохранено объявление #{saved_count}:")
-                    print(f"  URL: {listing.url[:60]}...")
-                    print(f"  Адрес в listing: '{listing.address[:80] if listing.address else '(пусто)'}'")
-                    print(f"  Адрес в offer: '{offer.address[:80] if offer.address else '(пусто)'}'")
-                    print(f"  Цена: {listing.price}, Комнат: {listing.rooms}, Площадь: {listing.area}")
-                
-                if i % 50 == 0:
-                    print(f"[БД] Обработано: {i}/{len(listings)} | Сохранено: {saved_count} | Пропущено: {skipped_count} | Ошибок: {error_count}")
-                
+                for stats in await CRUDOffer.bulk_upsert(db, batch, batch_size=batch_size):
+                    inserted_count += stats["inserted"]
+                    updated_count += stats["updated"]
             except Exception as e:
-                error_count += 1
-                if error_count <= 3:  # Показываем первые 3 ошибки
-                    import traceback
-                    print(f"[БД] Ошибка при сохранении объявления {i}: {str(e)[:100]}")
-                    if error_count == 1:
-                        traceback.print_exc()
+                error_count += len(batch)
+                import traceback
+                print(f"[БД] Ошибка при сохранении пакета {start + 1}-{start + len(batch)}: {str(e)[:100]}")
+                traceback.print_exc()
                 await db.rollback()
                 continue
+            
+            print(f"[БД] Обработано: {start + len(batch)}/{len(listings)} | Новых: {inserted_count} | Обновлено: {updated_count} | Ошибок: {error_count}")
         
-        print(f"[БД] Готово: Сохранено {saved_count}, Пропущено {skipped_count}, Ошибок {error_count}")
+        print(f"[БД] Готово: Новых {inserted_count}, Обновлено {updated_count}, Ошибок {error_count}")
+        return error_count
 
 
 async def run_deduplication() -> None:
@@ -160,52 +185,76 @@ async def run_deduplication() -> None:
         print(f"[Дедупликация] Завершено: Обработано {stats['processed']}, Новых продуктов {stats['new_products']}, Объединено {stats['merged']}")
 
 
+async def run_deactivation(sources: set[str], started_at: datetime) -> None:
+    """
+    Для источников, полностью обойденных в этом запуске (все города и
+    категории источника, все единицы дошли до конца выдачи без ошибок),
+    запоминает обход и снимает с
+    публикации объявления, не виденные ни в нем, ни в окне обхода.
+    Источники с лимитом страниц или упавшими единицами не трогаются.
+    """
+    print(f"\n[Актуальность] Снятие пропавших объявлений...")
+    async with AsyncSessionLocal() as db:
+        for source in sorted(sources):
+            spec = SOURCES.get(source)
+            if spec is None:
+                continue
+            await CRUDOffer.record_complete_crawl(db, source, started_at)
+            removed = await CRUDOffer.deactivate_stale(db, source, timedelta(hours=spec.crawl_window_hours))
+            await db.commit()
+            print(f"[Актуальность] {source}: снято с публикации {removed} (окно {spec.crawl_window_hours} ч)")
+
+
 async def main():
     print("=" * 80)
     print("СТАРТ ПАРСИНГА")
     print("=" * 80)
     
-    print("\n[Инициализация] Подключение к базе данных...")
-    await init_db()
-    print("[Инициализация] База данных готова")
-    
     config = Config.from_env()
     max_pages = 10
     
+    print("\n[Инициализация] Подключение к базе данных...")
+    db_ready = True
+    try:
+        await startup_db(prewarm=0)
+        print("[Инициализация] База данных готова")
+    except RuntimeError:
+        raise
+    except Exception as e:
+        # Со спулом обход не зависит от БД - объявления дождутся ее на диске
+        if not config.spool_dir:
+            raise
+        db_ready = False
+        print(f"[Инициализация] База данных недоступна, объявления останутся в спуле: {str(e)[:100]}")
+    
     print(f"\n[Парсинг] Запуск парсеров ({max_pages} страниц с каждого сайта)...")
     print("-" * 80)
     
-    tasks = [
-        run_parser(AvitoParser, config, max_pages),
-        run_parser(FarPostParser, config, max_pages),
-        run_parser(CianParser, config, max_pages),
-    ]
-    
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    all_listings = []
-    parser_names = ["Avito", "FarPost", "CIAN"]
-    for i, result in enumerate(results):
-        if isinstance(result, Exception):
-            import traceback
-            print(f"\n[ОШИБКА] {parser_names[i]}: {result}")
-            print(f"[ОШИБКА] {parser_names[i]} Детали:")
-            traceback.print_exception(type(result), result, result.__traceback__)
-        elif isinstance(result, list):
-            all_listings.extend(result)
-        else:
-            print(f"[ПРЕДУПРЕЖДЕНИЕ] {parser_names[i]}: Неожиданный тип результата: {type(result)}")
+    started_at = datetime.now()
+    complete: dict[str, bool] = {}
+    if config.spool_dir:
+        all_listings = await run_crawl_spooled(config, max_pages, drain=db_ready, complete=complete)
+    else:
+        all_listings = await run_crawl(config, max_pages, complete=complete)
     
     print("-" * 80)
     print(f"\n[Итого] Всего собрано объявлений: {len(all_listings)}")
     
-    if all_listings:
+    saved = True
+    if all_listings and not config.spool_dir:
         # Дедупликация перед сохранением
         # use_address_dedup=True - использовать адрес для дедупликации (медленнее, но надежнее)
         # use_address_dedup=False - использовать только URL (быстрее)
-        await save_to_database(all_listings, deduplicate=True, use_address_dedup=False)
+        saved = await save_to_database(all_listings, deduplicate=True, use_address_dedup=False) == 0
     
-    await run_deduplication()
+    if db_ready:
+        # last_seen должен быть записан до снятия: все пакеты сохранены,
+        # со спулом - все сегменты загружены
+        if saved and not (config.spool_dir and SpoolReader(config.spool_dir).sealed_segments()):
+            complete_sources = {source for source, ok in complete.items() if ok}
+            if complete_sources:
+                await run_deactivation(complete_sources, started_at)
+        await run_deduplication()
     
     print("\n" + "=" * 80)
     print("ПАРСИНГ ЗАВЕРШЕН")
@@ -0,0 +1,80 @@
+"""
+Аналитика по Parquet-снимкам вне рабочей БД.
+
+    python scripts/analytics.py export [--since 2024-01-01]
+    python scripts/analytics.py report median_rent|source_coverage|time_on_market
+    python scripts/analytics.py sql "SELECT district, count(*) FROM products GROUP BY 1"
+
+export читает Postgres (реплику, если есть) и дописывает новые дни в
+ANALYTICS_DIR; report и sql работают только с файлами через DuckDB.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+from typing import List
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from analytics.export import ANALYTICS_DIR
+
+
+def print_table(columns: List[str], rows: List[tuple]) -> None:
+    cells = [[("" if v is None else str(v)) for v in row] for row in rows]
+    widths = [max([len(c)] + [len(row[i]) for row in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+    print(f"({len(rows)} строк)")
+
+
+async def run_export(args) -> None:
+    from analytics.export import export
+
+    print("=" * 80)
+    print("ВЫГРУЗКА СНИМКОВ ДЛЯ АНАЛИТИКИ")
+    print("=" * 80)
+    totals = await export(args.data_dir, since=args.since)
+    for table, rows in totals.items():
+        print(f"  {table:<22} {rows:>10} строк")
+    print("=" * 80)
+
+
+def run_query(args) -> None:
+    from analytics.reports import AnalyticsDB
+
+    db = AnalyticsDB(args.data_dir)
+    try:
+        columns, rows = db.report(args.name) if args.command == "report" else db.query(args.query)
+        print_table(columns, rows)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from analytics.reports import REPORTS
+
+    parser = argparse.ArgumentParser(description="Аналитика по Parquet-снимкам")
+    parser.add_argument("--data-dir", default=ANALYTICS_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="выгрузить новые дни из БД")
+    export_parser.add_argument("--since", type=date.fromisoformat, default=None)
+
+    report_parser = commands.add_parser("report", help="готовый отчет")
+    report_parser.add_argument("name", choices=sorted(REPORTS))
+
+    sql_parser = commands.add_parser("sql", help="произвольный запрос DuckDB")
+    sql_parser.add_argument("query")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        if sys.platform == "win32":
+            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+        asyncio.run(run_export(args))
+    else:
+        run_query(args)
@@ -0,0 +1,121 @@
+"""
+Бенчмарк записи: синтетические объявления источника "bench" загружаются
+через CRUDOffer.bulk_upsert и COPY (BulkLoader), затем повторный проход
+с измененными ценами. Печатает скорость (строк/с) и число индексов на
+offers/products - запустите до и после миграции индексов для сравнения.
+
+Запускайте на отдельной базе: объявления bench удаляются в конце
+(секция offers_bench), но попадают в stats_counters и историю цен.
+
+    python scripts/bench_ingest.py --rows 50000 [--mode both|upsert|copy]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+
+from models import Listing
+from database.bulk_loader import aiter_listings, copy_load
+from database.crud import CRUDOffer
+from database.database import AsyncSessionLocal
+
+SOURCE = "bench"
+
+INDEX_COUNT_SQL = """
+SELECT c.relname, count(*)
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indrelid
+WHERE c.relname IN ('offers', 'products')
+GROUP BY c.relname
+"""
+
+
+def make_listings(count: int, offset: int, seed: int) -> List[Listing]:
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [
+        Listing(
+            external_id=str(offset + i),
+            title=f"{rng.randint(1, 4)}-комн. квартира, {rng.randint(25, 120)} м²",
+            price=rng.randint(15, 150) * 1000,
+            url=f"https://bench.local/{offset + i}",
+            source=SOURCE,
+            address=f"Владивосток, ул. Тестовая, {rng.randint(1, 200)}",
+            area=float(rng.randint(25, 120)),
+            rooms=rng.randint(1, 4),
+            property_type="Квартира",
+            parsed_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+async def run_upsert(listings: List[Listing]) -> float:
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await CRUDOffer.bulk_upsert(db, listings, batch_size=1000)
+    return time.perf_counter() - started
+
+
+async def run_copy(listings: List[Listing]) -> float:
+    started = time.perf_counter()
+    await copy_load(aiter_listings(listings))
+    return time.perf_counter() - started
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as db:
+        partition = CRUDOffer.partition_name(SOURCE)
+        exists = (await db.execute(text("SELECT to_regclass(:name)"), {"name": partition})).scalar_one()
+        if exists:
+            await db.execute(text(f"ALTER TABLE offers DETACH PARTITION {partition}"))
+            await db.execute(text(f"DROP TABLE {partition}"))
+        await db.commit()
+
+
+def report(name: str, rows: int, seconds: float) -> None:
+    print(f"  {name:<28} {rows:>8} строк за {seconds:7.2f} с  ({rows / seconds:,.0f} строк/с)")
+
+
+async def main(args):
+    print("=" * 80)
+    print("БЕНЧМАРК ЗАПИСИ")
+    print("=" * 80)
+
+    async with AsyncSessionLocal() as db:
+        counts = dict((await db.execute(text(INDEX_COUNT_SQL))).all())
+    print(f"Индексов: offers={counts.get('offers', 0)}, products={counts.get('products', 0)}")
+
+    await cleanup()
+    modes = ["upsert", "copy"] if args.mode == "both" else [args.mode]
+    try:
+        for index, mode in enumerate(modes):
+            offset = index * args.rows
+            loader = run_upsert if mode == "upsert" else run_copy
+            # Первый проход - вставка, второй - те же URL с новыми ценами
+            report(f"{mode}: вставка", args.rows, await loader(make_listings(args.rows, offset, seed=1)))
+            report(f"{mode}: обновление", args.rows, await loader(make_listings(args.rows, offset, seed=2)))
+    finally:
+        await cleanup()
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Скорость записи объявлений в offers")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--mode", choices=["both", "upsert", "copy"], default="both")
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,144 @@
+"""
+Микробенчмарк горячих запросов CRUD: накладные расходы на вызов при
+построении оператора заново (как раньше) и с заранее построенными
+операторами с bind-параметрами.
+
+Без --db считается только работа Python до отправки запроса: построение
+выражения и ключ кэша компиляции SQLAlchemy. С --db запросы еще и
+выполняются - видно и время подготовленных операторов asyncpg
+(DB_STATEMENT_CACHE_SIZE, DB_PGBOUNCER).
+
+    python scripts/bench_queries.py [--iterations 5000] [--db]
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select, func, or_
+from sqlalchemy.orm import selectinload
+
+from database.crud import (
+    CRUDOffer, CRUDProduct, OFFER_BY_URL, OFFERS_COUNT_BY_SOURCE, OFFERS_UNASSIGNED, PRODUCT_BY_ID,
+)
+from database.database import AsyncSessionLocal
+from database.models import Offer, Product
+
+SEARCH_FILTERS = {"query": "Светланская", "min_price": 20000, "max_price": 60000, "rooms": 2}
+
+
+def legacy_search(query: str, min_price: int, max_price: int, rooms: int, limit: int = 20):
+    """Поиск в виде до кэширования: выражение строится на каждый вызов."""
+    ts_query = func.websearch_to_tsquery("russian", query)
+    pattern = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+    rank = func.ts_rank_cd(Product.search_vector, ts_query)
+    return (
+        select(Product, rank)
+        .where(
+            or_(
+                Product.search_vector.op("@@")(ts_query),
+                Product.canonical_address.ilike(pattern, escape="\\"),
+            ),
+            Product.min_price >= min_price,
+            Product.min_price <= max_price,
+            Product.rooms == rooms,
+        )
+        .order_by(rank.desc(), Product.min_price.asc(), Product.id.asc())
+        .limit(limit)
+        .offset(0)
+    )
+
+
+def cached_search(**filters):
+    shape, params = CRUDProduct.search_params(**filters)
+    params.update(limit=20, offset=0)
+    return CRUDProduct._search_statement(shape, False, False), params
+
+
+# Имя -> (старое построение, новое построение); каждое возвращает (оператор, параметры)
+CASES: Dict[str, Tuple[Callable, Callable]] = {
+    "get_by_id": (
+        lambda: (select(Product).options(selectinload(Product.offers)).where(Product.id == 1), {}),
+        lambda: (PRODUCT_BY_ID, {"product_id": 1}),
+    ),
+    "get_by_url": (
+        lambda: (select(Offer).where(Offer.url == "https://example.com/1"), {}),
+        lambda: (OFFER_BY_URL, {
+            "url_fp": CRUDOffer.url_fingerprint("https://example.com/1"), "url": "https://example.com/1",
+        }),
+    ),
+    "get_unassigned": (
+        lambda: (select(Offer).where(Offer.product_id.is_(None)).limit(100), {}),
+        lambda: (OFFERS_UNASSIGNED, {"limit": 100}),
+    ),
+    "count_by_source": (
+        lambda: (select(Offer.website_name, func.count(Offer.id)).group_by(Offer.website_name), {}),
+        lambda: (OFFERS_COUNT_BY_SOURCE, {}),
+    ),
+    "search": (
+        lambda: (legacy_search(**SEARCH_FILTERS), {}),
+        lambda: cached_search(**SEARCH_FILTERS),
+    ),
+}
+
+
+def bench_build(build: Callable, iterations: int) -> float:
+    """Микросекунд на вызов: оператор + ключ кэша компиляции."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        stmt, _params = build()
+        stmt._generate_cache_key()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def bench_execute(build: Callable, iterations: int) -> float:
+    """Микросекунд на выполненный запрос, включая обмен с БД."""
+    async with AsyncSessionLocal() as db:
+        stmt, params = build()
+        await db.execute(stmt, params)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            stmt, params = build()
+            (await db.execute(stmt, params)).all()
+        elapsed = time.perf_counter() - started
+        await db.rollback()
+    return elapsed / iterations * 1e6
+
+
+def report(name: str, legacy: float, cached: float) -> None:
+    print(f"  {name:<18} {legacy:9.1f} мкс -> {cached:9.1f} мкс  (x{legacy / cached:.1f})")
+
+
+async def main(args):
+    print("=" * 80)
+    print("БЕНЧМАРК ГОРЯЧИХ ЗАПРОСОВ")
+    print("=" * 80)
+
+    print(f"\n[Построение + ключ кэша, {args.iterations} вызовов]")
+    for name, (legacy, cached) in CASES.items():
+        report(name, bench_build(legacy, args.iterations), bench_build(cached, args.iterations))
+
+    if args.db:
+        iterations = max(1, args.iterations // 10)
+        print(f"\n[Выполнение в БД, {iterations} запросов]")
+        for name, (legacy, cached) in CASES.items():
+            report(name, await bench_execute(legacy, iterations), await bench_execute(cached, iterations))
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Накладные расходы горячих запросов CRUD")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--db", action="store_true", help="выполнять запросы в БД")
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,72 @@
+"""
+Долгоживущий Chromium для парсеров.
+
+Запускает браузер один раз и держит его, пока процесс не остановят.
+Парсеры подключаются к нему по CDP, если задан BROWSER_ENDPOINT:
+
+    python scripts/browser_server.py
+    BROWSER_ENDPOINT=http://127.0.0.1:9222 python run_parser.py
+
+Каждый запуск парсера создает в браузере собственный контекст и при
+завершении закрывает только его.
+"""
+
+import asyncio
+import signal
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from playwright.async_api import async_playwright
+
+from config import Config
+from base_parser import BROWSER_ARGS
+
+
+async def main():
+    config = Config.from_env()
+    host = config.browser_server_host
+    port = config.browser_server_port
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(
+            headless=True,
+            args=BROWSER_ARGS + [
+                f"--remote-debugging-address={host}",
+                f"--remote-debugging-port={port}",
+            ],
+            timeout=60000
+        )
+        print(f"[browser-server] Chromium {browser.version} готов")
+        print(f"[browser-server] BROWSER_ENDPOINT=http://{host}:{port}")
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+
+        disconnected = asyncio.Event()
+        browser.on("disconnected", lambda _: disconnected.set())
+
+        await asyncio.wait(
+            [asyncio.create_task(stop.wait()), asyncio.create_task(disconnected.wait())],
+            return_when=asyncio.FIRST_COMPLETED
+        )
+        if browser.is_connected():
+            await browser.close()
+        print("[browser-server] Остановлен")
+
+
+if __name__ == "__main__":
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
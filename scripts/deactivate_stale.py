@@ -0,0 +1,52 @@
+"""
+Снятие с публикации объявлений, пропавших с источников: не виденные
+дольше окна обхода источника (SourceSpec.crawl_window_hours) и в
+последнем полном обходе (source_crawls) получают is_active = false.
+Сводку затронутых продуктов пересчитывает триггер offers. run_parser.py
+делает то же после полного обхода источника.
+
+    python scripts/deactivate_stale.py [--source avito] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.crud import CRUDOffer
+from database.database import AsyncSessionLocal
+from planner.sources import SOURCES
+
+
+async def main(args):
+    print("=" * 80)
+    print("СНЯТИЕ ПРОПАВШИХ ОБЪЯВЛЕНИЙ")
+    print("=" * 80)
+
+    async with AsyncSessionLocal() as db:
+        for source in args.source or list(SOURCES):
+            spec = SOURCES[source]
+            window = timedelta(hours=spec.crawl_window_hours)
+            if args.dry_run:
+                stale = await CRUDOffer.count_stale(db, source, window)
+                print(f"[{source}] Будет снято с публикации: {stale} (окно {spec.crawl_window_hours} ч)")
+                continue
+            removed = await CRUDOffer.deactivate_stale(db, source, window)
+            await db.commit()
+            print(f"[{source}] Снято с публикации: {removed} (окно {spec.crawl_window_hours} ч)")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Снятие с публикации объявлений, пропавших с источников")
+    parser.add_argument("--source", action="append", choices=list(SOURCES), help="источник (можно несколько)")
+    parser.add_argument("--dry-run", action="store_true")
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(parser.parse_args()))
@@ -5,7 +5,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from database.database import init_db, AsyncSessionLocal
+from database.database import startup_db, AsyncSessionLocal
 from deduplication.deduplicator import Deduplicator
 
 
@@ -15,7 +15,7 @@ async def main():
     print("=" * 80)
     
     print("\n[Инициализация] Подключение к базе данных...")
-    await init_db()
+    await startup_db(prewarm=0)
     print("[Инициализация] База данных готова")
     
     deduplicator = Deduplicator(
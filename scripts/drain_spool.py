@@ -0,0 +1,54 @@
+"""
+Загрузка сегментов дискового спула в БД - после простоя БД или для
+отдельного процесса-загрузчика рядом с краулером.
+
+    python scripts/drain_spool.py [--dir spool] [--follow]
+
+--follow - не завершаться, ждать новые сегменты (Ctrl+C - остановка).
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from database.database import startup_db
+from database.spool_drainer import SpoolDrainer
+from utils.spool import SpoolReader
+
+
+async def main(args):
+    print("=" * 80)
+    print("ЗАГРУЗКА СПУЛА")
+    print("=" * 80)
+
+    await startup_db(prewarm=0)
+    # Только чтение: открытые сегменты работающего краулера не трогаются
+    spool = SpoolReader(args.dir)
+    print(f"Сегментов в {args.dir}: {len(spool.sealed_segments())} ({spool.pending_bytes() / 1024 / 1024:.1f} МБ)")
+
+    stop = asyncio.Event() if args.follow else None
+    stats = await SpoolDrainer(spool).run(stop)
+
+    print(f"Сегментов загружено: {stats['segments']}, пропущено (уже в БД): {stats['skipped']}, "
+          f"в карантине: {stats['quarantined']}")
+    print(f"Строк: {stats['records']} | Новых: {stats['inserted']} | Изменилось: {stats['changed']}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Загрузка дискового спула объявлений в БД")
+    parser.add_argument("--dir", default=os.getenv("SPOOL_DIR", "spool"))
+    parser.add_argument("--follow", action="store_true")
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,175 @@
+"""
+Отчет по индексам: неиспользуемые (idx_scan = 0) и избыточные
+(дубликаты и индексы, ключ которых - префикс другого индекса той же
+таблицы и того же типа) с размерами.
+
+Индексы секций суммируются в индекс секционированной таблицы.
+Счетчики pg_stat_user_indexes копятся с последнего сброса статистики -
+перед выводами по неиспользуемым индексам дайте базе поработать под
+обычной нагрузкой.
+
+    python scripts/index_advisor.py [--min-size-kb 0]
+"""
+
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+
+from database.database import AsyncSessionLocal
+
+INDEXES_SQL = """
+WITH leaf AS (
+    SELECT
+        COALESCE(pg_partition_root(s.indexrelid), s.indexrelid) AS root,
+        s.idx_scan,
+        pg_relation_size(s.indexrelid) AS size
+    FROM pg_stat_user_indexes s
+    WHERE s.schemaname = 'public'
+)
+SELECT
+    tc.relname AS table_name,
+    ic.relname AS index_name,
+    sum(leaf.idx_scan) AS scans,
+    sum(leaf.size) AS size,
+    i.indisunique AS is_unique,
+    i.indisprimary AS is_primary,
+    i.indkey::text AS columns,
+    i.indclass::text AS opclasses,
+    (i.indpred IS NOT NULL OR i.indexprs IS NOT NULL) AS is_special,
+    am.amname AS method,
+    pg_get_indexdef(leaf.root) AS definition
+FROM leaf
+JOIN pg_index i ON i.indexrelid = leaf.root
+JOIN pg_class ic ON ic.oid = leaf.root
+JOIN pg_class tc ON tc.oid = i.indrelid
+JOIN pg_am am ON am.oid = ic.relam
+GROUP BY tc.relname, ic.relname, i.indisunique, i.indisprimary, i.indkey,
+         i.indclass, i.indpred, i.indexprs, am.amname, leaf.root
+ORDER BY tc.relname, ic.relname
+"""
+
+STATS_RESET_SQL = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+
+
+@dataclass
+class IndexInfo:
+    table_name: str
+    index_name: str
+    scans: int
+    size: int
+    is_unique: bool
+    is_primary: bool
+    columns: Tuple[str, ...]
+    opclasses: Tuple[str, ...]
+    is_special: bool
+    method: str
+    definition: str
+
+    def covers(self, other: "IndexInfo") -> bool:
+        """Ключ other - префикс ключа этого индекса (other можно удалить)."""
+        if other is self or other.table_name != self.table_name:
+            return False
+        if other.is_unique or other.is_primary or other.is_special or self.is_special:
+            return False
+        if other.method != "btree" or self.method != "btree":
+            return other.method == self.method and other.columns == self.columns \
+                and other.opclasses == self.opclasses
+        size = len(other.columns)
+        return self.columns[:size] == other.columns and self.opclasses[:size] == other.opclasses
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def find_redundant(indexes: List[IndexInfo]) -> List[Tuple[IndexInfo, IndexInfo]]:
+    redundant = []
+    for index in indexes:
+        for other in indexes:
+            # Для точных дубликатов оставляем индекс с меньшим именем
+            if other.covers(index) and not (
+                index.columns == other.columns and index.index_name < other.index_name
+                and not (other.is_unique or other.is_primary)
+            ):
+                redundant.append((index, other))
+                break
+    return redundant
+
+
+async def main(args):
+    print("=" * 80)
+    print("АНАЛИЗ ИНДЕКСОВ")
+    print("=" * 80)
+
+    async with AsyncSessionLocal() as db:
+        stats_reset = (await db.execute(text(STATS_RESET_SQL))).scalar_one_or_none()
+        rows = (await db.execute(text(INDEXES_SQL))).all()
+
+    indexes = [
+        IndexInfo(
+            table_name=row.table_name,
+            index_name=row.index_name,
+            scans=int(row.scans or 0),
+            size=int(row.size or 0),
+            is_unique=row.is_unique,
+            is_primary=row.is_primary,
+            columns=tuple(row.columns.split()),
+            opclasses=tuple(row.opclasses.split()),
+            is_special=row.is_special,
+            method=row.method,
+            definition=row.definition,
+        )
+        for row in rows
+    ]
+    min_size = args.min_size_kb * 1024
+
+    print(f"Статистика с: {stats_reset or 'создания базы'}")
+    print(f"Индексов: {len(indexes)}, всего {format_size(sum(i.size for i in indexes))}")
+
+    print("\n[Избыточные]")
+    redundant = find_redundant(indexes)
+    for index, covering in redundant:
+        if index.size >= min_size:
+            print(f"  {index.table_name}.{index.index_name} ({format_size(index.size)}, сканов {index.scans})")
+            print(f"    покрыт {covering.index_name}: {covering.definition}")
+    if not redundant:
+        print("  нет")
+
+    print("\n[Неиспользуемые]")
+    redundant_names = {index.index_name for index, _ in redundant}
+    unused = [
+        i for i in indexes
+        if i.scans == 0 and not (i.is_unique or i.is_primary)
+        and i.index_name not in redundant_names and i.size >= min_size
+    ]
+    for index in sorted(unused, key=lambda i: -i.size):
+        print(f"  {index.table_name}.{index.index_name} ({format_size(index.size)})")
+        print(f"    {index.definition}")
+    if not unused:
+        print("  нет")
+
+    reclaim = sum(i.size for i, _ in redundant) + sum(i.size for i in unused)
+    print(f"\nМожно освободить: {format_size(reclaim)}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Отчет по неиспользуемым и избыточным индексам")
+    parser.add_argument("--min-size-kb", type=int, default=0)
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""
+Массовая загрузка сохраненных объявлений (JSON, NDJSON[.gz|.zst] или
+Parquet из utils.storage) в БД через COPY - для бэкфиллов и повторного
+разбора архивов. Файлы читаются потоково.
+
+    python scripts/load_listings.py output/listings_20240101_120000.ndjson.gz ...
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator, List
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import Listing
+from database.bulk_loader import copy_load
+from utils.storage import iter_listings
+
+
+async def iter_files(paths: List[str]) -> AsyncIterator[Listing]:
+    for path in paths:
+        print(f"[Загрузка] Чтение {path}...")
+        for listing in iter_listings(path):
+            yield listing
+
+
+async def main(paths: List[str]):
+    print("=" * 80)
+    print("МАССОВАЯ ЗАГРУЗКА ОБЪЯВЛЕНИЙ")
+    print("=" * 80)
+
+    stats = await copy_load(iter_files(paths))
+
+    print(f"Загружено в staging: {stats['staged']}")
+    print(f"Новых объявлений: {stats['inserted']}")
+    print(f"Изменилось: {stats['changed']}")
+    print(f"Без изменений: {stats['unchanged']}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""
+Удаление устаревших месячных секций offers и offer_price_history.
+Секция отсоединяется и удаляется целиком (DETACH + DROP) - без DELETE
+по строкам и последующего VACUUM. Секции offers - по месяцу first_seen:
+секция, где еще есть активные объявления, не удаляется.
+
+    python scripts/retention.py --offers-months 12 --history-months 24 [--dry-run]
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.crud import CRUDStats
+from database.database import AsyncSessionLocal
+
+MONTH_SUFFIX = re.compile(r"_(\d{4})(\d{2})$")
+
+LEAF_PARTITIONS_SQL = """
+WITH RECURSIVE tree AS (
+    SELECT inhrelid, inhparent FROM pg_inherits WHERE inhparent = CAST(:root AS regclass)
+    UNION ALL
+    SELECT i.inhrelid, i.inhparent FROM pg_inherits i JOIN tree t ON i.inhparent = t.inhrelid
+)
+SELECT c.relname, p.relname
+FROM tree t
+JOIN pg_class c ON c.oid = t.inhrelid
+JOIN pg_class p ON p.oid = t.inhparent
+WHERE c.relkind = 'r'
+ORDER BY c.relname
+"""
+
+ORPHAN_PRODUCTS_SQL = """
+DELETE FROM products p
+WHERE NOT EXISTS (SELECT 1 FROM offers o WHERE o.product_id = p.id)
+RETURNING p.district, p.rooms
+"""
+
+SUMMARY_SQL = """
+UPDATE products p SET
+    min_price = s.min_price,
+    offers_count = s.offers_count,
+    sources = s.sources,
+    last_seen = s.last_seen
+FROM (
+    SELECT
+        product_id,
+        coalesce(min(price) FILTER (WHERE is_active), min(price)) AS min_price,
+        (count(*) FILTER (WHERE is_active))::integer AS offers_count,
+        coalesce(
+            array_agg(DISTINCT website_name ORDER BY website_name) FILTER (WHERE is_active), '{}'
+        ) AS sources,
+        max(last_seen) AS last_seen
+    FROM offers
+    WHERE product_id IS NOT NULL
+    GROUP BY product_id
+) s
+WHERE s.product_id = p.id
+  AND (p.min_price, p.offers_count, p.sources, p.last_seen)
+      IS DISTINCT FROM (s.min_price, s.offers_count, s.sources, s.last_seen)
+"""
+
+
+def cutoff_month(months: int) -> date:
+    today = date.today()
+    total = today.year * 12 + today.month - 1 - months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+async def expired_partitions(db: AsyncSession, root: str, cutoff: date) -> List[Tuple[str, str]]:
+    expired = []
+    for name, parent in (await db.execute(text(LEAF_PARTITIONS_SQL), {"root": root})).all():
+        match = MONTH_SUFFIX.search(name)
+        if match and date(int(match.group(1)), int(match.group(2)), 1) < cutoff:
+            expired.append((name, parent))
+    return expired
+
+
+async def drop_expired(db: AsyncSession, root: str, months: int, dry_run: bool) -> int:
+    cutoff = cutoff_month(months)
+    expired = await expired_partitions(db, root, cutoff)
+    print(f"[{root}] Секций старше {cutoff:%Y-%m}: {len(expired)}")
+    dropped = 0
+    for name, parent in expired:
+        # Секции offers удаляются только без активных объявлений: снятые
+        # уже вычтены из stats_counters в CRUDOffer.deactivate_stale
+        if root == "offers" and (await db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name} WHERE is_active)"))).scalar_one():
+            print(f"[{root}]   пропуск {name}: есть активные объявления")
+            continue
+        print(f"[{root}]   {'(dry-run) ' if dry_run else ''}удаление {name}")
+        dropped += 1
+        if not dry_run:
+            await db.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name}"))
+            await db.execute(text(f"DROP TABLE {name}"))
+    return dropped
+
+
+async def main(args):
+    print("=" * 80)
+    print("УДАЛЕНИЕ УСТАРЕВШИХ СЕКЦИЙ")
+    print("=" * 80)
+
+    async with AsyncSessionLocal() as db:
+        dropped_offers = await drop_expired(db, "offers", args.offers_months, args.dry_run)
+        await drop_expired(db, "offer_price_history", args.history_months, args.dry_run)
+
+        if dropped_offers and not args.dry_run:
+            # Продукты, у которых не осталось объявлений, и сводка
+            # остальных: DROP секции не вызывает триггеры offers
+            orphans = (await db.execute(text(ORPHAN_PRODUCTS_SQL))).all()
+            await CRUDStats.add(db, CRUDStats.product_deltas(orphans, sign=-1))
+            print(f"[products] Удалено продуктов без объявлений: {len(orphans)}")
+            refreshed = await db.execute(text(SUMMARY_SQL))
+            print(f"[products] Обновлена сводка продуктов: {refreshed.rowcount}")
+
+        await db.commit()
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Удаление устаревших секций offers и истории цен")
+    parser.add_argument("--offers-months", type=int, default=12)
+    parser.add_argument("--history-months", type=int, default=24)
+    parser.add_argument("--dry-run", action="store_true")
+
+    if sys.platform == "win32":
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    asyncio.run(main(parser.parse_args()))
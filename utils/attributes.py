@@ -0,0 +1,64 @@
+"""
+Атрибуты объявления для JSONB-колонки attrs: этаж из полей парсера и
+признаки из заголовка и описания (мебель, животные, дети, балкон).
+
+Значения - числа и bool, чтобы фильтры API выражались одним условием
+включения attrs @> '{...}' по GIN-индексу products.attrs.
+"""
+
+import re
+from typing import Dict, Optional, Pattern, Tuple
+
+from models import Listing
+
+# Признак -> (шаблон "да", шаблон "нет"); "нет" проверяется первым:
+# "без животных" не должно совпасть как "животн"
+TEXT_FLAGS: Dict[str, Tuple[Optional[Pattern], Optional[Pattern]]] = {
+    "furniture": (
+        re.compile(r"с мебелью|меблирован|мебель и техник"),
+        re.compile(r"без мебели"),
+    ),
+    "pets_allowed": (
+        re.compile(r"(можно|разрешен\w*|допускаются)\s+(с\s+)?(домашн\w+\s+)?(животн|питомц)"),
+        re.compile(r"без (домашних )?(животных|питомцев)|(нельзя|запрещен\w*)\s+(с\s+)?(домашн\w+\s+)?(животн|питомц)"),
+    ),
+    "children_allowed": (
+        re.compile(r"можно с детьми|с детьми можно|семье с детьми"),
+        re.compile(r"без детей"),
+    ),
+    "balcony": (
+        re.compile(r"балкон|лоджи"),
+        re.compile(r"без балкона"),
+    ),
+}
+
+
+def text_flags(text: str) -> Dict[str, bool]:
+    flags = {}
+    text = text.lower()
+    for name, (positive, negative) in TEXT_FLAGS.items():
+        if negative and negative.search(text):
+            flags[name] = False
+        elif positive and positive.search(text):
+            flags[name] = True
+    return flags
+
+
+def extract_attributes(listing: Listing) -> dict:
+    """Атрибуты объявления; отсутствующие признаки не попадают в словарь."""
+    attrs = {}
+    if listing.floor is not None:
+        attrs["floor"] = listing.floor
+    if listing.total_floors is not None:
+        attrs["total_floors"] = listing.total_floors
+    if listing.floor is not None and listing.total_floors:
+        attrs["first_floor"] = listing.floor == 1
+        attrs["last_floor"] = listing.floor == listing.total_floors
+
+    attrs.update(text_flags(" ".join(filter(None, (listing.title, listing.description)))))
+    return attrs
+
+
+def attribute_filter(**values) -> dict:
+    """Фильтр по атрибутам для условия attrs @> ...; None - без ограничения."""
+    return {name: value for name, value in values.items() if value is not None}
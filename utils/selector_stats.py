@@ -0,0 +1,146 @@
+"""
+Статистика попаданий CSS-селекторов и адаптивный порядок цепочек.
+"""
+
+import json
+import os
+import uuid
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: без блокировки, как и в спуле
+    fcntl = None
+
+
+# Один запуск процесса: все парсеры источника (по одному на воркер)
+# сохраняют статистику в рамках одного запуска
+RUN_ID = uuid.uuid4().hex
+
+
+class SelectorRegistry:
+    """
+    Хранит для каждого поля источника (card, link, price, ...) счет
+    попаданий селекторов и выдает цепочку в порядке убывания счета,
+    чтобы в типичном случае хватало одного запроса к странице.
+
+    Счет - сумма попаданий с экспоненциальным затуханием между запусками,
+    поэтому общие запасные селекторы ("a", "h3"), которые срабатывают только
+    после промаха более точных, остаются в конце цепочки. При равном счете
+    сохраняется исходный порядок из кода парсера.
+
+    Затухание применяется один раз за запуск (run_id), сколько бы воркеров
+    ни сохраняли статистику источника; попадания воркеров суммируются.
+
+    Если доля успешных извлечений поля за запуск резко падает относительно
+    накопленной, save() печатает предупреждение - обычно это смена верстки.
+    """
+
+    def __init__(
+        self,
+        stats_dir: str,
+        source: str,
+        decay: float = 0.8,
+        drop_threshold: float = 0.3,
+        min_attempts: int = 20,
+        run_id: Optional[str] = None,
+    ):
+        self.source = source
+        self.run_id = run_id or RUN_ID
+        self.path = os.path.join(stats_dir, f"selectors_{source}.json")
+        self.decay = decay
+        self.drop_threshold = drop_threshold
+        self.min_attempts = min_attempts
+        self.stats = self._load()
+        self.run_hits: Dict[str, Dict[str, int]] = {}
+        self.run_misses: Dict[str, int] = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def order(self, field: str, selectors: List[str]) -> List[str]:
+        scores = self.stats.get(field, {}).get("selectors", {})
+        run_hits = self.run_hits.get(field, {})
+        return sorted(
+            selectors,
+            key=lambda s: -(scores.get(s, 0.0) + run_hits.get(s, 0))
+        )
+
+    def hit(self, field: str, selector: str) -> None:
+        field_hits = self.run_hits.setdefault(field, {})
+        field_hits[selector] = field_hits.get(selector, 0) + 1
+
+    def miss(self, field: str) -> None:
+        self.run_misses[field] = self.run_misses.get(field, 0) + 1
+
+    def save(self) -> List[str]:
+        """
+        Сливает статистику запуска с сохраненной и возвращает список полей,
+        у которых резко упала доля попаданий.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Чтение-слияние-запись под блокировкой: воркеры и параллельные
+        # запуски того же источника не теряют попадания друг друга
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            return self._merge()
+
+    def _merge(self) -> List[str]:
+        stats = self._load()
+        drifted = []
+
+        for field in set(self.run_hits) | set(self.run_misses):
+            hits = self.run_hits.get(field, {})
+            hit_count = sum(hits.values())
+            attempts = hit_count + self.run_misses.get(field, 0)
+            if attempts == 0:
+                continue
+
+            entry = stats.setdefault(field, {"selectors": {}, "hit_rate": None})
+            scores = entry["selectors"]
+            run = entry.get("run") or {}
+            if run.get("id") != self.run_id:
+                # Первое сохранение поля в этом запуске: затухание прошлых
+                # запусков, доля попаданий до запуска - база для сравнения
+                for selector in list(scores):
+                    scores[selector] = round(scores[selector] * self.decay, 3)
+                run = {"id": self.run_id, "hits": 0, "attempts": 0, "base_rate": entry.get("hit_rate")}
+                entry["run"] = run
+            for selector, count in hits.items():
+                scores[selector] = scores.get(selector, 0.0) + count
+            run["hits"] += hit_count
+            run["attempts"] += attempts
+
+            run_rate = run["hits"] / run["attempts"]
+            previous_rate = run["base_rate"]
+            if (
+                previous_rate is not None
+                and run["attempts"] >= self.min_attempts
+                and previous_rate - run_rate >= self.drop_threshold
+            ):
+                drifted.append(field)
+                print(
+                    f"[{self.source}] ⚠ Поле '{field}': доля попаданий селекторов упала "
+                    f"с {previous_rate:.0%} до {run_rate:.0%} - возможно, изменилась верстка"
+                )
+
+            if previous_rate is None:
+                entry["hit_rate"] = round(run_rate, 3)
+            else:
+                entry["hit_rate"] = round(previous_rate * self.decay + run_rate * (1 - self.decay), 3)
+
+        tmp_path = f"{self.path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+        self.stats = stats
+        self.run_hits = {}
+        self.run_misses = {}
+        return drifted
@@ -0,0 +1,97 @@
+"""
+Постоянный профиль браузера для источника: cookies/localStorage и дисковый кэш.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Optional
+
+
+class SessionStore:
+    """
+    Хранит профиль источника в каталоге ``<profiles_dir>/<source>``:
+
+        user_data/    - каталог профиля Chromium (cookies, дисковый HTTP-кэш)
+        state.json    - снимок storage_state (cookies + localStorage)
+        meta.json     - время создания профиля и счетчик блокировок
+
+    Профиль живет ``ttl_hours`` часов. Если источник начал блокировать
+    (``max_blocks`` ответов 403/429 или капч подряд), профиль помечается
+    недействительным и удаляется перед следующим запуском.
+    """
+
+    def __init__(self, profiles_dir: str, source: str, ttl_hours: int = 24, max_blocks: int = 3):
+        self.root = os.path.join(profiles_dir, source)
+        self.user_data_dir = os.path.join(self.root, "user_data")
+        self.state_path = os.path.join(self.root, "state.json")
+        self.meta_path = os.path.join(self.root, "meta.json")
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_blocks = max_blocks
+        self.meta = self._load_meta()
+
+    def _load_meta(self) -> dict:
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_meta(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def is_fresh(self) -> bool:
+        created_at = self.meta.get("created_at")
+        if not created_at or self.meta.get("invalid"):
+            return False
+        return time.time() - created_at < self.ttl_seconds
+
+    def prepare(self) -> bool:
+        """
+        Готовит профиль к запуску. Просроченный или заблокированный профиль
+        удаляется целиком. Возвращает True, если профиль "теплый".
+        """
+        if self.meta and not self.is_fresh():
+            self.invalidate()
+        warm = self.is_fresh()
+        if not warm:
+            self.meta = {"created_at": time.time(), "blocks": 0}
+        os.makedirs(self.user_data_dir, exist_ok=True)
+        self._save_meta()
+        return warm
+
+    def get_state_path(self) -> Optional[str]:
+        if self.is_fresh() and os.path.exists(self.state_path):
+            return self.state_path
+        return None
+
+    def load_cookies(self) -> list:
+        state_path = self.get_state_path()
+        if not state_path:
+            return []
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("cookies", [])
+        except (OSError, ValueError):
+            return []
+
+    def mark_blocked(self) -> None:
+        self.meta["blocks"] = self.meta.get("blocks", 0) + 1
+        if self.meta["blocks"] >= self.max_blocks:
+            # Каталог занят запущенным браузером - удаляем при следующем prepare()
+            self.meta["invalid"] = True
+        self._save_meta()
+
+    def mark_ok(self) -> None:
+        if self.meta.get("blocks") and not self.meta.get("invalid"):
+            self.meta["blocks"] = 0
+            self._save_meta()
+
+    def invalidate(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.meta = {}
@@ -0,0 +1,234 @@
+"""
+Дисковый спул объявлений: краулер дописывает страницы в сегменты NDJSON
+и не зависит от доступности и скорости БД, загрузку в offers выполняет
+SpoolDrainer (database/spool_drainer.py).
+
+Сегмент пишется в <имя>.ndjson.open и после ротации (по размеру или
+возрасту) переименовывается в <имя>.ndjson - загрузчик берет только
+закрытые сегменты. Имена начинаются с времени создания, сортировка по
+имени - порядок записи. fsync выполняется пачками: не чаще одного на
+fsync_records строк или fsync_seconds секунд; после сбоя теряется не
+больше этого окна. fsync и закрытие сегмента выполняет отдельный поток
+спула: append вызывается в цикле событий краулера, и сброс на диск не
+должен останавливать воркеров.
+
+Открытый сегмент держит эксклюзивную блокировку (flock) писателя.
+Восстановление после сбоя закрывает только сегменты без блокировки -
+то есть брошенные умершим процессом; загрузчики читают каталог через
+SpoolReader и сегменты не восстанавливают никогда.
+"""
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from models import Listing
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: открытый писателем файл нельзя переименовать, восстановление
+    # пропускает такие сегменты по PermissionError
+    fcntl = None
+
+SEGMENT_SUFFIX = ".ndjson"
+OPEN_SUFFIX = ".ndjson.open"
+# Сегмент создается под этим именем и блокируется до переименования в
+# .ndjson.open - восстановление не увидит его без блокировки
+NEW_SUFFIX = ".ndjson.new"
+
+
+def segment_name(path: Path) -> str:
+    return path.name[:-len(SEGMENT_SUFFIX)]
+
+
+def _try_lock(f) -> bool:
+    """Эксклюзивная блокировка без ожидания; False - файл держит другой процесс."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class SpoolReader:
+    """Только чтение каталога спула: закрытые сегменты, без восстановления."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def sealed_segments(self) -> List[Path]:
+        return sorted(self.directory.glob("*" + SEGMENT_SUFFIX))
+
+    def pending_bytes(self) -> int:
+        total = 0
+        for path in self.sealed_segments():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+class Spool(SpoolReader):
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 32 * 1024 * 1024,
+        segment_max_seconds: float = 60.0,
+        fsync_records: int = 500,
+        fsync_seconds: float = 1.0,
+    ):
+        super().__init__(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_seconds = segment_max_seconds
+        self.fsync_records = fsync_records
+        self.fsync_seconds = fsync_seconds
+        self.written = 0
+
+        self._file = None
+        self._path: Optional[Path] = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._unsynced = 0
+        self._synced_at = 0.0
+        # Один поток: fsync и закрытия сегментов выполняются по порядку
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool-io")
+        self._io_pending: List[Future] = []
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    def _recover(self) -> None:
+        """
+        Закрывает сегменты, брошенные открытыми после сбоя; неполная
+        последняя строка отбрасывается. Сегменты под блокировкой живого
+        писателя не трогаются.
+        """
+        for path in sorted(self.directory.glob("*" + OPEN_SUFFIX)):
+            try:
+                f = open(path, "r+b")
+            except FileNotFoundError:
+                continue
+            try:
+                if not _try_lock(f):
+                    continue
+                data = f.read()
+                end = data.rfind(b"\n") + 1
+                if 0 < end < len(data):
+                    f.truncate(end)
+                    os.fsync(f.fileno())
+                if fcntl is None:
+                    # Windows не переименовывает открытые файлы
+                    f.close()
+                # Переименование под блокировкой: писатель не закроет
+                # тот же сегмент одновременно
+                if end == 0:
+                    path.unlink()
+                    continue
+                sealed = path.with_name(path.name[:-len(OPEN_SUFFIX)] + SEGMENT_SUFFIX)
+                os.replace(path, sealed)
+            except PermissionError:
+                # Windows: сегмент открыт живым писателем
+                continue
+            finally:
+                f.close()
+            print(f"[Спул] Восстановлен сегмент {sealed.name}")
+
+    def _open_segment(self) -> None:
+        name = f"{datetime.now():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        self._path = self.directory / (name + OPEN_SUFFIX)
+        if fcntl is None:
+            self._file = open(self._path, "ab")
+        else:
+            new_path = self.directory / (name + NEW_SUFFIX)
+            self._file = open(new_path, "ab")
+            _try_lock(self._file)
+            os.replace(new_path, self._path)
+        self._size = 0
+        self._opened_at = time.monotonic()
+        self._synced_at = self._opened_at
+
+    def _submit(self, fn, *args) -> None:
+        self._io_pending = [future for future in self._io_pending if not future.done()]
+        self._io_pending.append(self._io.submit(fn, *args))
+
+    def _sync(self) -> None:
+        # Буфер сбрасывается в ОС здесь, fsync - в потоке спула; пока
+        # предыдущий fsync идет, новый не ставится - он покроет и эти строки
+        self._file.flush()
+        if not any(not future.done() for future in self._io_pending):
+            self._submit(os.fsync, self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    @staticmethod
+    def _seal(file, path: Path, size: int) -> None:
+        os.fsync(file.fileno())
+        if fcntl is None:
+            file.close()
+        # С flock переименование и удаление - до close, пока сегмент под блокировкой
+        if size == 0:
+            path.unlink()
+        else:
+            os.replace(path, path.with_name(path.name[:-len(OPEN_SUFFIX)] + SEGMENT_SUFFIX))
+        file.close()
+
+    def append(self, listings: Iterable[Listing]) -> int:
+        if self._file is None:
+            self._open_segment()
+
+        count = 0
+        for listing in listings:
+            line = (json.dumps(listing.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+            self._file.write(line)
+            self._size += len(line)
+            count += 1
+        self._unsynced += count
+        self.written += count
+
+        now = time.monotonic()
+        if self._unsynced >= self.fsync_records or now - self._synced_at >= self.fsync_seconds:
+            self._sync()
+        if self._size >= self.segment_max_bytes or now - self._opened_at >= self.segment_max_seconds:
+            self.rotate()
+        return count
+
+    def rotate(self) -> Optional[Path]:
+        """
+        Закрывает текущий сегмент и делает его доступным загрузчику.
+        Закрытие выполняется в потоке спула: возвращенный путь появляется
+        после fsync; close() дожидается всех закрытий.
+        """
+        if self._file is None:
+            return None
+        self._file.flush()
+        self._submit(self._seal, self._file, self._path, self._size)
+        sealed = None
+        if self._size:
+            sealed = self._path.with_name(self._path.name[:-len(OPEN_SUFFIX)] + SEGMENT_SUFFIX)
+        self._file = None
+        return sealed
+
+    def close(self) -> None:
+        self.rotate()
+        pending, self._io_pending = self._io_pending, []
+        for future in pending:
+            future.result()
+
+    def pending_bytes(self) -> int:
+        return super().pending_bytes() + self._size
+
+    def __enter__(self) -> "Spool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,9 +1,193 @@
 import csv
+import gzip
+import io
 import json
 import os
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 from models import Listing
 
+# Необязательные зависимости: zstd-сжатие NDJSON и Parquet
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+LISTING_FIELDS = [
+    "external_id",
+    "title",
+    "price",
+    "url",
+    "address",
+    "area",
+    "rooms",
+    "property_type",
+    "source",
+    "parsed_at",
+    "description",
+    "floor",
+    "total_floors",
+    "images",
+    "district",
+]
+
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _require(module, name: str):
+    if module is None:
+        raise RuntimeError(f"Для этого формата нужен пакет {name}: pip install {name}")
+    return module
+
+
+def _open_text(path: str, mode: str):
+    """Текстовый файл с сжатием по расширению (.gz, .zst); mode - "r", "w" или "a"."""
+    if path.endswith(".gz"):
+        # Дозапись в gzip - новый member, читается как один поток
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        zstd = _require(zstandard, "zstandard")
+        raw = open(path, mode + "b")
+        if mode == "r":
+            stream = zstd.ZstdDecompressor().stream_reader(raw, closefd=True, read_across_frames=True)
+        else:
+            stream = zstd.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8", newline="" if mode != "r" else None)
+
+
+class NDJSONWriter:
+    """
+    Потоковая запись объявлений в NDJSON, по строке на объявление.
+    Страницы дописываются по мере обхода, в памяти не копятся;
+    append=True продолжает существующий файл.
+    """
+
+    def __init__(self, path: str, append: bool = True):
+        self.path = path
+        self.written = 0
+        self._file = _open_text(path, "a" if append else "w")
+
+    def write(self, listings: Iterable[Listing]) -> int:
+        count = 0
+        for listing in listings:
+            self._file.write(json.dumps(listing.to_dict(), ensure_ascii=False))
+            self._file.write("\n")
+            count += 1
+        self._file.flush()
+        self.written += count
+        return count
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "NDJSONWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _parquet_schema():
+    _require(pa, "pyarrow")
+    return pa.schema([
+        ("external_id", pa.string()),
+        ("title", pa.string()),
+        ("price", pa.int64()),
+        ("url", pa.string()),
+        ("address", pa.string()),
+        ("area", pa.float64()),
+        ("rooms", pa.int32()),
+        ("property_type", pa.string()),
+        ("source", pa.string()),
+        ("parsed_at", pa.timestamp("us")),
+        ("description", pa.string()),
+        ("floor", pa.int32()),
+        ("total_floors", pa.int32()),
+        ("images", pa.list_(pa.string())),
+        ("district", pa.string()),
+    ])
+
+
+class ParquetWriter:
+    """
+    Потоковая запись объявлений в Parquet: объявления буферизуются
+    до row_group_size и сбрасываются группой строк. Parquet нельзя
+    дописать после close - файл открыт на все время обхода.
+    """
+
+    def __init__(self, path: str, row_group_size: int = 10_000, compression: str = "zstd"):
+        self.path = path
+        self.row_group_size = row_group_size
+        self.written = 0
+        self.schema = _parquet_schema()
+        self._buffer: List[Listing] = []
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, listings: Iterable[Listing]) -> int:
+        count = 0
+        for listing in listings:
+            self._buffer.append(listing)
+            count += 1
+            if len(self._buffer) >= self.row_group_size:
+                self._flush()
+        self.written += count
+        return count
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        columns = {name: [getattr(l, name) for l in self._buffer] for name in self.schema.names}
+        columns["images"] = [images or [] for images in columns["images"]]
+        self._writer.write_table(pa.table(columns, schema=self.schema))
+        self._buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_ndjson(path: str) -> Iterator[Listing]:
+    with _open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield Listing.from_dict(json.loads(line))
+
+
+def iter_parquet(path: str, batch_size: int = 10_000) -> Iterator[Listing]:
+    parquet_file = _require(pq, "pyarrow").ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        for row in batch.to_pylist():
+            yield Listing.from_dict(row)
+
+
+def iter_json(path: str) -> Iterator[Listing]:
+    with open(path, "r", encoding="utf-8") as f:
+        for item in json.load(f):
+            yield Listing.from_dict(item)
+
+
+def iter_listings(path: str) -> Iterator[Listing]:
+    """Объявления из файла любого формата Storage по расширению."""
+    if path.endswith(".parquet"):
+        return iter_parquet(path)
+    if path.endswith(".json"):
+        return iter_json(path)
+    return iter_ndjson(path)
+
+
 class Storage:
     def __init__(self, output_dir: str):
         self.output_dir = output_dir
@@ -15,36 +199,20 @@ class Storage:
             json.dump([l.to_dict() for l in listings], f, ensure_ascii=False, indent=2)
         return path
 
-    def save_csv(self, listings: List[Listing], filename: str) -> str:
+    def save_csv(self, listings: Iterable[Listing], filename: str) -> str:
         path = os.path.join(self.output_dir, filename)
-        if not listings:
-            headers = [
-                "external_id",
-                "title",
-                "price",
-                "url",
-                "address",
-                "area",
-                "rooms",
-                "property_type",
-                "source",
-                "parsed_at",
-                "description",
-                "floor",
-                "total_floors",
-                "images",
-            ]
-            with open(path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-            return path
-
         with open(path, "w", encoding="utf-8", newline="") as f:
-            dicts = [l.to_dict() for l in listings]
-            for d in dicts:
-                if isinstance(d.get("images"), list):
-                    d["images"] = ",".join(d["images"])
-            writer = csv.DictWriter(f, fieldnames=dicts[0].keys())
+            writer = csv.DictWriter(f, fieldnames=LISTING_FIELDS)
             writer.writeheader()
-            writer.writerows(dicts)
+            for listing in listings:
+                row = listing.to_dict()
+                row["images"] = ",".join(row["images"])
+                writer.writerow(row)
         return path
+
+    def open_ndjson(self, filename: str, compression: Optional[str] = None, append: bool = True) -> NDJSONWriter:
+        """compression: None, "gzip" или "zstd" - расширение добавляется к имени."""
+        return NDJSONWriter(os.path.join(self.output_dir, filename + COMPRESSION_SUFFIXES[compression]), append)
+
+    def open_parquet(self, filename: str, row_group_size: int = 10_000) -> ParquetWriter:
+        return ParquetWriter(os.path.join(self.output_dir, filename), row_group_size)